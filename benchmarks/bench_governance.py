@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Benchmark del motor de reglas de gobernanza
+
+Genera inventarios sintéticos y mide recursos analizados por segundo.
+
+Uso:
+    python -m benchmarks.bench_governance [--size 100000] [--seed 42]
+"""
+import argparse
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from src.services.governance_service import GovernanceService
+
+
+def synthetic_iam(rng: random.Random) -> Dict[str, Any]:
+    """Política IAM sintética"""
+    return {
+        "service_accounts": [f"sa-{i}" for i in range(rng.randint(0, 15))],
+        "bindings": {
+            f"user-{i}@example.com": [f"roles/r{j}" for j in range(rng.randint(1, 8))]
+            for i in range(rng.randint(1, 20))
+        },
+        "uses_custom_roles": rng.random() < 0.5,
+        "audit_logging_enabled": rng.random() < 0.7,
+    }
+
+
+def synthetic_storage(rng: random.Random) -> Dict[str, Any]:
+    """Bucket sintético"""
+    return {
+        "encryption_enabled": rng.random() < 0.9,
+        "versioning_enabled": rng.random() < 0.6,
+        "lifecycle_policy": {"rules": []} if rng.random() < 0.5 else None,
+        "is_public": rng.random() < 0.05,
+        "audit_logging_enabled": rng.random() < 0.7,
+    }
+
+
+def synthetic_gke(rng: random.Random) -> Dict[str, Any]:
+    """Cluster GKE sintético"""
+    return {
+        "rbac_enabled": rng.random() < 0.95,
+        "network_policy_enabled": rng.random() < 0.6,
+        "pod_security_policy_enabled": rng.random() < 0.5,
+        "resource_quotas_configured": rng.random() < 0.5,
+        "audit_logging_enabled": rng.random() < 0.7,
+    }
+
+
+def synthetic_instance(rng: random.Random) -> Dict[str, Any]:
+    """Instancia de Compute Engine sintética"""
+    environment = rng.choice(["prod", "staging", "dev"])
+    return {
+        "name": f"vm-{rng.getrandbits(32):08x}",
+        "managed_image": rng.random() < 0.8,
+        "monitoring_enabled": rng.random() < 0.7,
+        "labels": {"env": environment} if rng.random() < 0.6 else {},
+        "environment": environment,
+        "preemptible": rng.random() < 0.3,
+        "startup_script": "#!/bin/sh" if rng.random() < 0.5 else None,
+        "shutdown_script": "#!/bin/sh" if rng.random() < 0.5 else None,
+    }
+
+
+GENERATORS: Dict[str, Callable[[random.Random], Dict[str, Any]]] = {
+    "iam": synthetic_iam,
+    "storage": synthetic_storage,
+    "gke": synthetic_gke,
+}
+
+
+def run(size: int, seed: int) -> List[Dict[str, Any]]:
+    """Ejecutar el benchmark para cada tipo de recurso"""
+    rng = random.Random(seed)
+    results = []
+    for resource_type, generate in GENERATORS.items():
+        inventory = [generate(rng) for _ in range(size)]
+        start = time.perf_counter()
+        analyses = GovernanceService.analyze_many(resource_type, inventory)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "resource_type": resource_type,
+            "resources": len(analyses),
+            "seconds": elapsed,
+            "resources_per_second": len(analyses) / elapsed,
+        })
+
+    # Compute se analiza como una sola flota por columnas
+    fleet = [synthetic_instance(rng) for _ in range(size)]
+    start = time.perf_counter()
+    analysis = GovernanceService.analyze("compute", {"instances": fleet})
+    elapsed = time.perf_counter() - start
+    results.append({
+        "resource_type": "compute",
+        "resources": analysis["fleet"]["total_instances"],
+        "seconds": elapsed,
+        "resources_per_second": size / elapsed,
+    })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000, help="Recursos sintéticos por tipo")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria")
+    args = parser.parse_args()
+
+    print(f"{'tipo':<10}{'recursos':>12}{'segundos':>12}{'recursos/s':>14}")
+    for row in run(args.size, args.seed):
+        print(
+            f"{row['resource_type']:<10}{row['resources']:>12}"
+            f"{row['seconds']:>12.3f}{row['resources_per_second']:>14,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
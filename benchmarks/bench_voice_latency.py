@@ -0,0 +1,577 @@
+#!/usr/bin/env python
+"""
+Latencia boca-oído del bucle de voz (record/replay)
+
+Reproduce un corpus de frases WAV a través del código real del cliente
+(`voice_client`) contra la app FastAPI servida por uvicorn. Solo se
+sustituyen el micrófono y el altavoz (dispositivo de réplica con la interfaz
+de sounddevice) y los clientes de GCP, que responden con latencias sacadas de
+un perfil configurable. Escenarios:
+
+- converse: captura en ring buffer, VAD del cliente, codificación y /converse
+- stream: audio por el WebSocket /stream (fin de frase detectado por Speech)
+  y respuesta por oraciones de /query/stream, como hace el cliente con websockets
+- query: solo /query/stream con la transcripción ya hecha (sin captura)
+
+Para cada frase se mide, en ms desde que el usuario deja de hablar: fin de
+frase detectado, fin de la subida, STT, LLM, TTS y primera muestra de audio
+de la respuesta. Al final se resumen p50/p95/p99 de cada etapa. En `stream`
+la subida ocurre mientras se habla y en `query` las etapas de captura y STT
+valen 0.
+
+El micrófono se alimenta más rápido que en tiempo real y la espera del fin de
+frase se calcula en tiempo de audio (muestras); el resto de etapas es tiempo
+de reloj. La latencia del buffer del dispositivo de salida real no está incluida.
+
+Uso:
+    python -m benchmarks.bench_voice_latency [--scenario converse|stream|query]
+        [--corpus DIR] [--synthetic 20] [--profile typical|fast|slow|perfil.json]
+        [--upload-format opus|flac|wav] [--warm-caches] [--json resultados.json] [--verbose]
+"""
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import socket
+import sys
+import threading
+import time
+import wave
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from google.cloud import speech_v1
+
+from src.config import settings
+from src.services import gcp_service, model_registry
+from src.services.gcp_service import GCPService
+
+SAMPLE_RATE = 16000
+
+# Latencias por etapa: (mediana, p95) en ms; cada llamada se muestrea de una log-normal.
+# "endpoint" es el silencio (tiempo de audio) que Speech en streaming espera antes del fin de frase.
+PROFILES: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "fast": {"stt": (250, 400), "llm": (600, 1000), "tts": (150, 250), "storage": (50, 100), "endpoint": (400, 600)},
+    "typical": {"stt": (600, 1100), "llm": (1500, 3000), "tts": (350, 700), "storage": (120, 300), "endpoint": (700, 1100)},
+    "slow": {"stt": (1200, 2500), "llm": (3500, 7000), "tts": (800, 1600), "storage": (300, 800), "endpoint": (1000, 1600)},
+}
+
+SCENARIOS = ("converse", "stream", "query")
+
+# Etapas de la línea de tiempo, en orden
+STAGES = ("vad_end", "upload", "stt", "llm", "tts", "first_audio")
+
+# Esperas máximas por frase (s)
+TURN_TIMEOUT = 60
+# Silencio máximo tras la frase antes de dar la captura por fallida (s)
+MAX_TRAILING_SILENCE = 30
+# Volumen medio a partir del cual el reconocimiento en streaming simulado oye voz (como el VAD del cliente)
+STREAM_VOICE_THRESHOLD = 0.012
+
+
+class LatencyProfile:
+    """Muestreo reproducible de latencias por etapa"""
+
+    def __init__(self, stages: Dict[str, Tuple[float, float]], seed: int = 42):
+        self.stages = stages
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+
+    def sample(self, stage: str) -> float:
+        """Latencia en segundos; sigma tal que p95 = mediana * e^(1.645 sigma)"""
+        median, p95 = self.stages[stage]
+        sigma = math.log(max(p95, median) / median) / 1.645 if median > 0 else 0.0
+        with self.lock:
+            z = self.rng.standard_normal()
+        return median * math.exp(sigma * z) / 1000.0
+
+    def wait(self, stage: str) -> None:
+        time.sleep(self.sample(stage))
+
+
+class StageClock:
+    """Instantes de inicio y fin de cada llamada upstream del turno en curso"""
+
+    def __init__(self):
+        self.marks: Dict[str, Tuple[float, float]] = {}
+
+    def reset(self) -> None:
+        self.marks = {}
+
+    def timed(self, stage: str, profile: LatencyProfile) -> None:
+        start = time.perf_counter()
+        profile.wait(stage)
+        self.marks[stage] = (start, time.perf_counter())
+
+
+class StubSpeechClient:
+    """SpeechClient con la latencia del perfil; transcribe lo que indique el harness"""
+
+    def __init__(self, profile: LatencyProfile, clock: StageClock):
+        self.profile = profile
+        self.clock = clock
+        self.reset("")
+
+    def reset(self, transcript: str) -> None:
+        """Preparar la siguiente frase"""
+        self.transcript = transcript
+        self.streamed_bytes = 0
+        self.endpoint_ms = 0.0
+        self.endpoint_at = 0.0
+
+    def recognize(self, config: Any, audio: Any) -> Any:
+        self.clock.timed("stt", self.profile)
+        alternative = SimpleNamespace(transcript=self.transcript)
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative])])
+
+    @staticmethod
+    def _response(transcript: str, is_final: bool) -> Any:
+        result = SimpleNamespace(is_final=is_final, alternatives=[SimpleNamespace(transcript=transcript)])
+        return SimpleNamespace(
+            speech_event_type=speech_v1.StreamingRecognizeResponse.SpeechEventType.SPEECH_EVENT_UNSPECIFIED,
+            results=[result],
+        )
+
+    def streaming_recognize(self, config: Any, requests: Any) -> Any:
+        """
+        Reconocimiento `single_utterance` simulado
+
+        Oye el audio real que llega por el WebSocket: emite un parcial por
+        segundo de voz y, tras el silencio "endpoint" del perfil (en muestras),
+        el fin de frase y el resultado final con la latencia de "stt".
+        """
+        endpoint = int(self.profile.sample("endpoint") * SAMPLE_RATE)
+        heard = voiced = last_voiced = 0
+        next_interim = SAMPLE_RATE
+        words = self.transcript.split()
+        for request in requests:
+            chunk = np.frombuffer(request.audio_content, dtype="<i2")
+            self.streamed_bytes += len(request.audio_content)
+            heard += len(chunk)
+            if len(chunk) and np.abs(chunk, dtype=np.float32).mean() / 32768.0 >= STREAM_VOICE_THRESHOLD:
+                voiced += len(chunk)
+                last_voiced = heard
+                if voiced >= next_interim:
+                    next_interim += SAMPLE_RATE
+                    yield self._response(" ".join(words[:voiced // SAMPLE_RATE]), is_final=False)
+            elif voiced and heard - last_voiced >= endpoint:
+                break
+        else:
+            return  # El cliente cerró el audio sin que se detectara el fin de frase
+
+        self.endpoint_ms = (heard - last_voiced) * 1000 / SAMPLE_RATE
+        self.endpoint_at = time.perf_counter()
+        yield SimpleNamespace(
+            speech_event_type=speech_v1.StreamingRecognizeResponse.SpeechEventType.END_OF_SINGLE_UTTERANCE,
+            results=[],
+        )
+        self.clock.timed("stt", self.profile)
+        yield self._response(self.transcript, is_final=True)
+
+
+class StubTTSClient:
+    """TextToSpeechClient que devuelve siempre el mismo MP3 corto"""
+
+    def __init__(self, profile: LatencyProfile, clock: StageClock, audio: bytes):
+        self.profile = profile
+        self.clock = clock
+        self.audio = audio
+
+    def synthesize_speech(self, input: Any, voice: Any, audio_config: Any) -> Any:
+        self.clock.timed("tts", self.profile)
+        return SimpleNamespace(audio_content=self.audio)
+
+
+class StubModel:
+    """GenerativeModel con la latencia del perfil (respuesta completa)"""
+
+    def __init__(self, profile: LatencyProfile, clock: StageClock):
+        self.profile = profile
+        self.clock = clock
+
+    def generate_content(self, prompt: str, stream: bool = False) -> Any:
+        self.clock.timed("llm", self.profile)
+        text = f"Respuesta simulada a: {prompt}."
+        return iter([SimpleNamespace(text=text)]) if stream else SimpleNamespace(text=text)
+
+
+class StubModels(model_registry.ModelRegistry):
+    """Registro con los perfiles reales y un modelo simulado"""
+
+    def __init__(self, model: StubModel):
+        super().__init__()
+        self.model = model
+
+    def get(self, name: str) -> StubModel:
+        self.profile(name)
+        return self.model
+
+    def warm(self) -> None:
+        pass
+
+
+def stub_gcp_service(profile: LatencyProfile, clock: StageClock, tts_audio: bytes) -> GCPService:
+    """GCPService real con clientes simulados (sin credenciales ni red)"""
+    service = GCPService.__new__(GCPService)
+    service.project_id = settings.gcp_project_id
+    service.region = settings.gcp_region
+    service.models = StubModels(StubModel(profile, clock))
+    service.storage_client = None
+    service.speech_client = StubSpeechClient(profile, clock)
+    service.tts_client = StubTTSClient(profile, clock, tts_audio)
+
+    def upload_to_storage(bucket_name: str, file_path: str, data: bytes) -> str:
+        profile.wait("storage")
+        return f"gs://{bucket_name}/{file_path}"
+
+    service.upload_to_storage = upload_to_storage
+    return service
+
+
+class _ReplayInput:
+    """InputStream que entrega la frase cargada (y después silencio) al callback"""
+
+    def __init__(self, device: "ReplayDevice", samplerate: int, blocksize: int, callback: Any, **_: Any):
+        self.device = device
+        self.blocksize = blocksize
+        self.callback = callback
+        self.limit = len(device.samples) + MAX_TRAILING_SILENCE * samplerate
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._feed, daemon=True)
+
+    def _feed(self) -> None:
+        samples = self.device.samples
+        block = np.zeros((self.blocksize, 1), dtype=np.int16)
+        for offset in range(0, self.limit, self.blocksize):
+            if self.stopped.is_set():
+                return
+            chunk = samples[offset:offset + self.blocksize]
+            block[:len(chunk), 0] = chunk
+            block[len(chunk):, 0] = 0
+            self.callback(block, self.blocksize, None, None)
+            time.sleep(0)  # Ceder el GIL al hilo que espera el fin de la frase
+
+    def __enter__(self) -> "_ReplayInput":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stopped.set()
+        self.thread.join()
+        self.device.capture_closed_at = time.perf_counter()
+
+
+class _ReplayOutput:
+    """OutputStream que consume el callback al ritmo real y anota la primera muestra audible"""
+
+    def __init__(self, device: "ReplayDevice", samplerate: int, blocksize: int, callback: Any, **_: Any):
+        self.device = device
+        self.period = blocksize / samplerate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.closed = threading.Event()
+
+    def start(self) -> None:
+        threading.Thread(target=self._play, daemon=True).start()
+
+    def _play(self) -> None:
+        out = np.zeros((self.blocksize, 1), dtype=np.int16)
+        deadline = time.perf_counter()
+        while not self.closed.is_set():
+            self.callback(out, self.blocksize, None, None)
+            if out.any() and not self.device.first_audio.is_set():
+                self.device.first_audio_at = time.perf_counter()
+                self.device.first_audio.set()
+            deadline += self.period
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    def close(self) -> None:
+        self.closed.set()
+
+
+class ReplayDevice:
+    """Micrófono y altavoz de réplica con la parte de la API de sounddevice que usa el cliente"""
+
+    def __init__(self):
+        self.samples = np.zeros(0, dtype=np.int16)
+        self.capture_closed_at = 0.0
+        self.first_audio_at = 0.0
+        self.first_audio = threading.Event()
+
+    def load(self, samples: np.ndarray) -> None:
+        """Preparar la siguiente frase"""
+        self.samples = samples
+        self.first_audio.clear()
+
+    def InputStream(self, samplerate: int, callback: Any, blocksize: int, **kwargs: Any) -> _ReplayInput:
+        return _ReplayInput(self, samplerate, blocksize, callback, **kwargs)
+
+    def OutputStream(self, samplerate: int, blocksize: int, callback: Any, **kwargs: Any) -> _ReplayOutput:
+        return _ReplayOutput(self, samplerate, blocksize, callback, **kwargs)
+
+
+def load_wav(path: str) -> np.ndarray:
+    """WAV PCM de 16 bits a int16 mono de 16 kHz (mezcla e interpolación lineal si hace falta)"""
+    with wave.open(path, "rb") as reader:
+        if reader.getsampwidth() != 2:
+            raise ValueError(f"{path}: se requiere PCM de 16 bits")
+        channels, rate = reader.getnchannels(), reader.getframerate()
+        samples = np.frombuffer(reader.readframes(reader.getnframes()), dtype="<i2")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return np.asarray(samples, dtype=np.int16)
+
+
+def synthetic_utterance(rng: np.random.Generator) -> np.ndarray:
+    """Frase sintética: ruido de fondo, 1.5-3.5 s de "voz" armónica modulada por sílabas"""
+    lead = rng.normal(0, 60, int(0.3 * SAMPLE_RATE))
+    t = np.arange(int(rng.uniform(1.5, 3.5) * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = rng.uniform(110, 220)
+    voice = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 5))
+    syllables = 0.6 + 0.4 * np.sin(2 * np.pi * rng.uniform(3, 5) * t)
+    speech = 5000 * voice * syllables + rng.normal(0, 200, len(t))
+    return np.clip(np.concatenate([lead, speech]), -32768, 32767).astype(np.int16)
+
+
+def load_corpus(corpus: Optional[str], synthetic: int, seed: int) -> List[Tuple[str, np.ndarray]]:
+    """Frases del directorio (*.wav, en orden) o sintéticas"""
+    if corpus:
+        names = sorted(name for name in os.listdir(corpus) if name.lower().endswith(".wav"))
+        if not names:
+            raise SystemExit(f"❌ No hay archivos .wav en {corpus}")
+        return [(os.path.splitext(name)[0], load_wav(os.path.join(corpus, name))) for name in names]
+    rng = np.random.default_rng(seed)
+    return [(f"sintetica-{i:03d}", synthetic_utterance(rng)) for i in range(synthetic)]
+
+
+def tts_mp3(sf: Any, seconds: float = 0.6, sample_rate: int = 24000) -> bytes:
+    """MP3 corto que el reproductor del cliente decodifica de verdad"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    buffer = io.BytesIO()
+    sf.write(buffer, (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), sample_rate,
+             format="MP3", subtype="MPEG_LAYER_III")
+    return buffer.getvalue()
+
+
+def load_client(device: ReplayDevice) -> Any:
+    """Importar voice_client con el dispositivo de réplica en lugar de la tarjeta de sonido"""
+    sys.modules.setdefault("sounddevice", device)  # type: ignore[arg-type]
+    import voice_client
+
+    voice_client.sd = device
+    if voice_client.sf is None:
+        raise SystemExit("❌ El harness necesita soundfile (libsndfile >= 1.1) para decodificar MP3: pip install -r requirements-client.txt")
+    return voice_client
+
+
+def start_server() -> Tuple[Any, str]:
+    """Servir la app en un puerto libre de localhost"""
+    import uvicorn
+
+    from src.main import app
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.perf_counter() + 10
+    while not server.started:
+        if time.perf_counter() > deadline:
+            raise SystemExit("❌ El servidor no arrancó")
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}/api/v1/voice"
+
+
+def capture(
+    client: Any,
+    device: ReplayDevice,
+    speech: StubSpeechClient,
+    scenario: str,
+) -> Tuple[Optional[Tuple[str, Any]], float, float, Dict[str, Any]]:
+    """
+    Capturar la frase cargada como lo hace el cliente en cada escenario
+
+    Returns:
+        Turno para process_audio_thread (None si falló), ms de audio entre el fin
+        de la voz y el fin de frase detectado, instante de reloj de esa detección
+        y datos de la subida
+    """
+    if scenario == "converse":
+        upload = client.record_audio_continuous(sample_rate=SAMPLE_RATE)
+        if upload is None:
+            return None, 0.0, 0.0, {"error": "el VAD no detectó la frase"}
+        recorder = client._recorder
+        vad_ms = (recorder.written - recorder.last_voiced) * 1000 / SAMPLE_RATE
+        return ("audio", upload), vad_ms, device.capture_closed_at, {"upload_bytes": len(upload[1]), "format": upload[0]}
+    if scenario == "stream":
+        text = client.stream_utterance(sample_rate=SAMPLE_RATE)
+        if not text:
+            return None, 0.0, 0.0, {"error": "el stream no devolvió transcripción"}
+        return ("text", text), speech.endpoint_ms, speech.endpoint_at, {"upload_bytes": speech.streamed_bytes, "format": "pcm"}
+    return ("text", speech.transcript), 0.0, time.perf_counter(), {"upload_bytes": 0, "format": "texto"}
+
+
+def replay(
+    client: Any,
+    device: ReplayDevice,
+    speech: StubSpeechClient,
+    clock: StageClock,
+    name: str,
+    samples: np.ndarray,
+    scenario: str = "converse",
+) -> Dict[str, Any]:
+    """Una frase por el bucle completo; línea de tiempo en ms desde el fin de la voz"""
+    device.load(samples)
+    clock.reset()
+    speech.reset(f"consulta de prueba {name}")
+
+    item, vad_ms, captured_at, upload = capture(client, device, speech, scenario)
+    if item is None:
+        return {"name": name, **upload}
+
+    # Igual que main(): la frase nueva reemplaza la respuesta pendiente
+    client.player.interrupt()
+    client.response_queue.put(item)
+    if not device.first_audio.wait(TURN_TIMEOUT):
+        return {"name": name, "error": "sin audio de respuesta"}
+    client.player.idle.wait(TURN_TIMEOUT)
+    time.sleep(client.AudioPlayer.ECHO_TAIL)  # Que el eco no cuente como barge-in de la siguiente
+
+    def at(instant: float) -> float:
+        return vad_ms + (instant - captured_at) * 1000
+
+    marks = clock.marks
+    upstream = ("llm", "tts") if scenario == "query" else ("stt", "llm", "tts")
+    if not all(stage in marks for stage in upstream):
+        return {"name": name, "error": f"etapas sin llamada upstream: {sorted(marks)}"}
+    timeline = {
+        "vad_end": vad_ms,
+        "upload": at(marks["stt"][0]) if "stt" in marks else vad_ms,
+        "stt": at(marks["stt"][1]) if "stt" in marks else vad_ms,
+        "llm": at(marks["llm"][1]),
+        "tts": at(marks["tts"][1]),
+        "first_audio": at(device.first_audio_at),
+    }
+    return {"name": name, **upload, "timeline": timeline}
+
+
+def stage_durations(timeline: Dict[str, float]) -> Dict[str, float]:
+    """Duración de cada etapa (diferencia con la anterior) y total boca-oído"""
+    durations, previous = {}, 0.0
+    for stage in STAGES:
+        durations[stage] = timeline[stage] - previous
+        previous = timeline[stage]
+    durations["mouth_to_ear"] = timeline["first_audio"]
+    return durations
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99 por etapa sobre las frases completadas"""
+    rows = [stage_durations(r["timeline"]) for r in results if "timeline" in r]
+    if not rows:
+        return {}
+    return {
+        stage: {
+            f"p{q}": float(np.percentile([row[stage] for row in rows], q))
+            for q in (50, 95, 99)
+        }
+        for stage in rows[0]
+    }
+
+
+def run(args: argparse.Namespace, out: Any) -> Dict[str, Any]:
+    """Preparar servidor, stubs y cliente y reproducir el corpus"""
+    stages = PROFILES.get(args.profile)
+    if stages is None:
+        with open(args.profile, encoding="utf-8") as f:
+            stages = {stage: tuple(values) for stage, values in json.load(f).items()}
+    stages = {"endpoint": PROFILES["typical"]["endpoint"], **stages}
+    profile = LatencyProfile(stages, args.seed)
+    clock = StageClock()
+    corpus = load_corpus(args.corpus, args.synthetic, args.seed)
+
+    device = ReplayDevice()
+    client = load_client(device)
+    if args.scenario == "stream" and client.ws_connect is None:
+        raise SystemExit("❌ El escenario stream necesita websockets: pip install -r requirements-client.txt")
+    client.UPLOAD_FORMAT = args.upload_format
+    service = stub_gcp_service(profile, clock, tts_mp3(client.sf))
+    gcp_service._gcp_service = service
+    settings.gcp_warmup_enabled = False
+    if not args.warm_caches:
+        # Cada frase recorre el camino frío completo
+        settings.llm_cache_enabled = False
+        settings.semantic_cache_enabled = False
+        settings.tts_cache_enabled = False
+
+    server, client.API = start_server()
+    client.WS_API = client.API.replace("http://", "ws://", 1)
+    processor = threading.Thread(target=client.process_audio_thread, daemon=True)
+    processor.start()
+    results = []
+    try:
+        for name, samples in corpus:
+            result = replay(client, device, service.speech_client, clock, name, samples, args.scenario)
+            results.append(result)
+            print_result(result, out)
+    finally:
+        client.response_queue.put(None)
+        server.should_exit = True
+    return {
+        "scenario": args.scenario,
+        "profile": stages,
+        "upload_format": args.upload_format,
+        "results": results,
+        "summary": summarize(results),
+    }
+
+
+def print_result(result: Dict[str, Any], out: Any) -> None:
+    if "error" in result:
+        print(f"{result['name']:<24}❌ {result['error']}", file=out, flush=True)
+        return
+    cells = "".join(f"{result['timeline'][stage]:>12.0f}" for stage in STAGES)
+    print(f"{result['name']:<24}{result['upload_bytes'] / 1024:>9.1f}{cells}", file=out, flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="converse", choices=SCENARIOS, help="Camino del cliente a reproducir")
+    parser.add_argument("--corpus", help="Directorio con frases WAV (PCM 16 bits)")
+    parser.add_argument("--synthetic", type=int, default=20, help="Frases sintéticas si no hay corpus")
+    parser.add_argument("--profile", default="typical", help=f"{', '.join(PROFILES)} o JSON {{etapa: [mediana_ms, p95_ms]}}")
+    parser.add_argument("--upload-format", default="opus", choices=("opus", "flac", "wav"), help="Códec de subida del cliente")
+    parser.add_argument("--warm-caches", action="store_true", help="No desactivar las cachés de LLM, semántica y TTS")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria")
+    parser.add_argument("--json", help="Guardar resultados y resumen en este archivo")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida del cliente")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    print(f"{'frase':<24}{'KB':>9}" + "".join(f"{stage:>12}" for stage in STAGES), file=out)
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+        logging.getLogger("src").setLevel(logging.WARNING)
+    try:
+        report = run(args, out)
+    finally:
+        sys.stdout = out
+
+    print(f"\n{'etapa (ms)':<24}{'p50':>12}{'p95':>12}{'p99':>12}")
+    for stage, quantiles in report["summary"].items():
+        print(f"{stage:<24}" + "".join(f"{quantiles[q]:>12.0f}" for q in ("p50", "p95", "p99")))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -52,15 +52,71 @@ class Settings(BaseSettings):
     # Configuración de Voice (Google Cloud Speech-to-Text)
     speech_to_text_enabled: bool = True
     text_to_speech_enabled: bool = True
+    # Normalizar WAV antes de reconocer: 16 kHz mono y sin silencio al principio y al final
+    audio_normalize_enabled: bool = os.getenv("AUDIO_NORMALIZE_ENABLED", "True").lower() == "true"
+    audio_trim_threshold_dbfs: float = float(os.getenv("AUDIO_TRIM_THRESHOLD_DBFS", "-45"))
+    audio_trim_padding_ms: int = int(os.getenv("AUDIO_TRIM_PADDING_MS", "300"))
 
     # Configuración de IA (VertexAI)
     # Modelos disponibles: gemini-2.0-flash, gemini-1.5-flash, gemini-1.0-pro, text-bison
     vertex_ai_model: str = os.getenv("VERTEX_AI_MODEL", "gemini-2.0-flash")
     vertex_ai_temperature: float = float(os.getenv("VERTEX_AI_TEMPERATURE", "0.7"))
     vertex_ai_max_tokens: int = int(os.getenv("VERTEX_AI_MAX_TOKENS", "1024"))
+    vertex_ai_json_temperature: float = float(os.getenv("VERTEX_AI_JSON_TEMPERATURE", "0.2"))
+    # Las respuestas JSON (p. ej. análisis por lotes) necesitan más salida que las de voz
+    vertex_ai_json_max_tokens: int = int(os.getenv("VERTEX_AI_JSON_MAX_TOKENS", "8192"))
+
+    # Precalentar clientes GCP al arrancar (/ready espera a que termine)
+    gcp_warmup_enabled: bool = os.getenv("GCP_WARMUP_ENABLED", "True").lower() == "true"
+    # Reintentos del precalentamiento fallido (0 = sin límite) con espera exponencial
+    gcp_warmup_max_attempts: int = int(os.getenv("GCP_WARMUP_MAX_ATTEMPTS", "0"))
+    gcp_warmup_backoff_seconds: float = float(os.getenv("GCP_WARMUP_BACKOFF_SECONDS", "1"))
+    gcp_warmup_max_backoff_seconds: float = float(os.getenv("GCP_WARMUP_MAX_BACKOFF_SECONDS", "60"))
+
+    # Concurrencia hacia GCP (fachada asíncrona)
+    gcp_executor_workers: int = int(os.getenv("GCP_EXECUTOR_WORKERS", "32"))
+    gcp_concurrency_speech: int = int(os.getenv("GCP_CONCURRENCY_SPEECH", "16"))
+    gcp_concurrency_tts: int = int(os.getenv("GCP_CONCURRENCY_TTS", "16"))
+    gcp_concurrency_llm: int = int(os.getenv("GCP_CONCURRENCY_LLM", "8"))
+    gcp_concurrency_storage: int = int(os.getenv("GCP_CONCURRENCY_STORAGE", "16"))
 
     # Configuración de almacenamiento
     storage_bucket: str = os.getenv("STORAGE_BUCKET", "devops-assistant-storage")
+    # Lecturas por fragmentos: memoria máxima por descarga en streaming
+    storage_chunk_bytes: int = int(os.getenv("STORAGE_CHUNK_BYTES", str(1024 * 1024)))
+    # Directorio de los archivos temporales mapeados en memoria (vacío: el del sistema)
+    storage_spill_dir: str = os.getenv("STORAGE_SPILL_DIR", "")
+
+    # Cola de subidas a Storage en segundo plano
+    upload_queue_maxsize: int = int(os.getenv("UPLOAD_QUEUE_MAXSIZE", "1000"))
+    upload_workers: int = int(os.getenv("UPLOAD_WORKERS", "4"))
+    upload_batch_size: int = int(os.getenv("UPLOAD_BATCH_SIZE", "8"))  # Objetos por lote de cada worker
+    upload_max_retries: int = int(os.getenv("UPLOAD_MAX_RETRIES", "3"))
+    upload_backoff_base: float = float(os.getenv("UPLOAD_BACKOFF_BASE", "0.5"))
+    upload_overflow_policy: str = os.getenv("UPLOAD_OVERFLOW_POLICY", "spill")  # spill o drop
+    upload_spill_dir: str = os.getenv("UPLOAD_SPILL_DIR", "/tmp/devops-assistant/uploads")
+    upload_drain_timeout: float = float(os.getenv("UPLOAD_DRAIN_TIMEOUT", "10"))
+
+    # Reporte de cumplimiento a escala de flota
+    governance_workers: int = int(os.getenv("GOVERNANCE_WORKERS", str(os.cpu_count() or 2)))
+    governance_chunk_size: int = int(os.getenv("GOVERNANCE_CHUNK_SIZE", "500"))
+    governance_parallel_threshold: int = int(os.getenv("GOVERNANCE_PARALLEL_THRESHOLD", "5000"))
+
+    # Análisis incremental de gobernanza (caché por huella e historial de cambios)
+    governance_incremental_enabled: bool = os.getenv("GOVERNANCE_INCREMENTAL_ENABLED", "True").lower() == "true"
+    governance_cache_max_entries: int = int(os.getenv("GOVERNANCE_CACHE_MAX_ENTRIES", "200000"))
+    governance_changes_max: int = int(os.getenv("GOVERNANCE_CHANGES_MAX", "10000"))
+
+    # Análisis de gobernanza con IA por lotes (solo recursos que las reglas no resuelven)
+    governance_ai_batch_tokens: int = int(os.getenv("GOVERNANCE_AI_BATCH_TOKENS", "8000"))
+    governance_ai_batch_max_resources: int = int(os.getenv("GOVERNANCE_AI_BATCH_MAX_RESOURCES", "25"))
+    governance_ai_reply_tokens: int = int(os.getenv("GOVERNANCE_AI_REPLY_TOKENS", "200"))
+    governance_ai_concurrency: int = int(os.getenv("GOVERNANCE_AI_CONCURRENCY", "4"))
+
+    # Ingesta de exportaciones de Cloud Asset Inventory
+    asset_inventory_chunk_bytes: int = int(os.getenv("ASSET_INVENTORY_CHUNK_BYTES", str(8 * 1024 * 1024)))
+    # Si se define, las exportaciones se leen de <raíz>/<bucket>/<ruta> en disco (desarrollo y pruebas)
+    asset_inventory_local_root: str = os.getenv("ASSET_INVENTORY_LOCAL_ROOT", "")
 
     # Configuración de base de datos
     database_url: Optional[str] = os.getenv("DATABASE_URL", None)
@@ -68,6 +124,21 @@ class Settings(BaseSettings):
     # Configuración de caché
     redis_url: Optional[str] = os.getenv("REDIS_URL", None)
     cache_ttl: int = 3600  # 1 hora
+    llm_cache_enabled: bool = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    llm_cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    # Caché semántica de preguntas de voz (paráfrasis de la misma pregunta)
+    semantic_cache_enabled: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "True").lower() == "true"
+    semantic_cache_max_entries: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))
+    semantic_cache_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.65"))
+    semantic_cache_dimensions: int = int(os.getenv("SEMANTIC_CACHE_DIMENSIONS", "4096"))
+    # Paquete de respuestas frecuentes precalculadas (vacío: deshabilitado)
+    faq_pack_path: str = os.getenv("FAQ_PACK_PATH", "")
+    faq_pack_threshold: float = float(os.getenv("FAQ_PACK_THRESHOLD", "0.65"))
+    faq_pack_check_interval: float = float(os.getenv("FAQ_PACK_CHECK_INTERVAL", "30"))
+    tts_cache_enabled: bool = os.getenv("TTS_CACHE_ENABLED", "True").lower() == "true"
+    tts_cache_memory_bytes: int = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+    tts_cache_disk_bytes: int = int(os.getenv("TTS_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+    tts_cache_dir: str = os.getenv("TTS_CACHE_DIR", "/tmp/devops-assistant/tts")
 
 
 settings = Settings()
@@ -4,10 +4,16 @@ Punto de entrada de la aplicación FastAPI
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 
 from src.routers import voice, governance, health, recommendations
+from src.services.async_gcp_service import shutdown_async_gcp_service
+from src.services.compliance_report import shutdown_process_pool
+from src.services.faq_pack import get_faq_pack_store
+from src.services.gcp_service import stop_gcp_warmup, warm_up_gcp_service
+from src.services.upload_queue import get_upload_queue, shutdown_upload_queue
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -33,9 +39,21 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info(f"🚀 Iniciando {APP_NAME} v{APP_VERSION}")
     logger.info(f"GCP Project: {GCP_PROJECT}")
+    if settings.gcp_warmup_enabled:
+        # En segundo plano para no bloquear /health; /ready espera a que termine
+        asyncio.get_running_loop().run_in_executor(None, warm_up_gcp_service)
+    get_upload_queue().start()
+    # Mapear el paquete de respuestas frecuentes antes de recibir consultas
+    await asyncio.get_running_loop().run_in_executor(None, get_faq_pack_store().reload)
+    get_faq_pack_store().start()
     yield
     # Shutdown
     logger.info("🛑 Cerrando aplicación")
+    stop_gcp_warmup()
+    await asyncio.get_running_loop().run_in_executor(None, get_faq_pack_store().stop)
+    await asyncio.get_running_loop().run_in_executor(None, shutdown_upload_queue)
+    shutdown_async_gcp_service()
+    shutdown_process_pool()
 
 
 # Crear instancia de FastAPI
@@ -1,24 +1,56 @@
 """
 Router para análisis de gobernanza
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional, Union
+import json
 import logging
+import tempfile
 
+from src.config import settings
+from src.services.asset_inventory import analyze_export
+from src.services.compliance_report import iter_ndjson, stream_compliance_report
+from src.services.governance_ai import review_governance
+from src.services.governance_incremental import get_incremental_analyzer
+from src.services.iam_index import get_iam_index_registry
 from src.services.governance_service import GovernanceService
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Cuerpo NDJSON que se mantiene en memoria antes de volcarse a disco
+NDJSON_SPOOL_BYTES = 4 * 1024 * 1024
+NDJSON_READ_BYTES = 64 * 1024
+
 
 class GovernanceAnalysisRequest(BaseModel):
     """Solicitud de análisis de gobernanza"""
     resource_type: str  # iam, storage, gke, compute
     resource_data: Dict[str, Any]
+    resource_id: Optional[str] = None  # Identificador estable para el historial de cambios
     include_recommendations: bool = True
 
 
+class AssetInventoryRequest(BaseModel):
+    """Solicitud de análisis de una exportación de Cloud Asset Inventory"""
+    object_path: Union[str, List[str]]  # Varias rutas: p. ej. exportaciones RESOURCE e IAM_POLICY separadas
+    include_results: bool = True  # False: solo errores, agregados y resumen
+
+
+class AIReviewResource(BaseModel):
+    """Recurso de una revisión con IA"""
+    resource_type: str
+    resource_data: Dict[str, Any]
+    resource_id: Optional[str] = None
+
+
+class AIReviewRequest(BaseModel):
+    """Solicitud de revisión de gobernanza con IA por lotes"""
+    resources: List[AIReviewResource]
+
+
 class GovernanceAnalysisResponse(BaseModel):
     """Respuesta de análisis de gobernanza"""
     resource_type: str
@@ -26,6 +58,10 @@ class GovernanceAnalysisResponse(BaseModel):
     findings: list
     compliance_score: int
     recommendations: Optional[list] = None
+    instances: Optional[list] = None  # Solo compute: hallazgos por instancia
+    fleet: Optional[Dict[str, Any]] = None  # Solo compute: agregados de la flota
+    fingerprint: Optional[str] = None
+    iam_index: Optional[Dict[str, Any]] = None  # Solo iam: índice referenciado por los hallazgos
 
 
 @router.post("/analyze", response_model=GovernanceAnalysisResponse)
@@ -42,18 +78,18 @@ async def analyze_governance(request: GovernanceAnalysisRequest):
     try:
         resource_type = request.resource_type.lower()
         
-        if resource_type == "iam":
-            analysis = GovernanceService.analyze_iam_governance(request.resource_data)
-        elif resource_type == "storage":
-            analysis = GovernanceService.analyze_storage_governance(request.resource_data)
-        elif resource_type == "gke":
-            analysis = GovernanceService.analyze_gke_governance(request.resource_data)
-        else:
+        if resource_type not in GovernanceService.supported_resource_types():
             raise HTTPException(
                 status_code=400,
                 detail=f"Tipo de recurso no soportado: {resource_type}"
             )
         
+        if settings.governance_incremental_enabled:
+            analysis = get_incremental_analyzer().analyze(
+                resource_type, request.resource_data, request.resource_id
+            )
+        else:
+            analysis = GovernanceService.analyze(resource_type, request.resource_data)
         response = GovernanceAnalysisResponse(**analysis)
         
         if request.include_recommendations:
@@ -69,6 +105,22 @@ async def analyze_governance(request: GovernanceAnalysisRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/ai-review")
+async def ai_review_governance(request: AIReviewRequest):
+    """
+    Analizar recursos con reglas y revisar con IA solo los que lo necesitan
+
+    Los recursos con hallazgos graves o riesgo medio se envían a Gemini en
+    lotes (varios por prompt); el resto queda resuelto por las reglas con
+    `ai_review` nulo. `llm_calls` indica cuántos prompts se hicieron.
+    """
+    try:
+        return await review_governance(resource.model_dump() for resource in request.resources)
+    except Exception as e:
+        logger.error(f"Error en revisión de gobernanza con IA: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/best-practices/{resource_type}")
 async def get_best_practices(resource_type: str):
     """
@@ -99,6 +151,56 @@ async def get_best_practices(resource_type: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/asset-inventory")
+async def analyze_asset_inventory(request: AssetInventoryRequest):
+    """
+    Analizar una exportación NDJSON de Cloud Asset Inventory guardada en Storage
+
+    Solo se leen objetos del bucket configurado (STORAGE_BUCKET). La exportación se descarga por fragmentos y se analiza en streaming.
+    Responde NDJSON con el mismo formato que /compliance-report/stream; el
+    `summary` final incluye la fuente y los contadores de ingesta.
+    """
+    async def lines() -> AsyncIterator[str]:
+        try:
+            async for record in analyze_export(request.object_path):
+                if not request.include_results and record["type"] == "result":
+                    continue
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Error al analizar exportación de activos: {str(e)}")
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/iam-index/{index_id}/principals")
+async def resolve_iam_principals(index_id: str, ids: str):
+    """
+    Resolver IDs de principales de un hallazgo IAM a nombres y roles
+
+    Ejemplo: /iam-index/<index_id>/principals?ids=3,17,42
+    """
+    index = get_iam_index_registry().get(index_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Índice IAM no encontrado o expirado")
+    try:
+        principal_ids = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros separados por comas")
+    return {"index_id": index_id, "principals": index.describe(principal_ids)}
+
+
+@router.get("/changes")
+async def get_governance_changes(since: int = 0):
+    """
+    Cambios de hallazgos desde una revisión
+
+    Solo se registran los recursos analizados con `resource_id`. Si `truncated`
+    es verdadero, el historial ya no contiene todos los cambios desde `since`.
+    """
+    return get_incremental_analyzer().changes_since(since)
+
+
 @router.post("/compliance-report")
 async def generate_compliance_report(resources: Dict[str, Dict[str, Any]]):
     """
@@ -122,15 +224,11 @@ async def generate_compliance_report(resources: Dict[str, Dict[str, Any]]):
         total_score = 0
         risk_levels = []
         
+        supported = GovernanceService.supported_resource_types()
         for resource_type, resource_data in resources.items():
-            if resource_type.lower() == "iam":
-                analysis = GovernanceService.analyze_iam_governance(resource_data)
-            elif resource_type.lower() == "storage":
-                analysis = GovernanceService.analyze_storage_governance(resource_data)
-            elif resource_type.lower() == "gke":
-                analysis = GovernanceService.analyze_gke_governance(resource_data)
-            else:
+            if resource_type.lower() not in supported:
                 continue
+            analysis = GovernanceService.analyze(resource_type.lower(), resource_data)
             
             report["analyses"].append(analysis)
             total_score += analysis["compliance_score"]
@@ -152,3 +250,61 @@ async def generate_compliance_report(resources: Dict[str, Dict[str, Any]]):
     except Exception as e:
         logger.error(f"Error al generar reporte: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/compliance-report/stream")
+async def stream_fleet_compliance_report(request: Request):
+    """
+    Generar reporte de cumplimiento para un inventario completo
+
+    Acepta una lista JSON o un cuerpo NDJSON (Content-Type: application/x-ndjson)
+    de recursos tipados:
+    {"resource_type": "storage", "resource_id": "bucket-1", "resource_data": {...}}
+
+    Responde NDJSON: un registro `result` (o `error`) por recurso, un registro
+    `aggregate` con los totales acumulados tras cada bloque y un `summary` final.
+    """
+    content_type = request.headers.get("content-type", "")
+    spool = None
+    if "ndjson" in content_type:
+        # El cuerpo se vuelca a un archivo temporal (en disco si es grande) antes
+        # de responder: Starlette no permite leer el cuerpo mientras se transmite
+        spool = tempfile.SpooledTemporaryFile(max_size=NDJSON_SPOOL_BYTES)
+        async for data in request.stream():
+            spool.write(data)
+        spool.seek(0)
+        resources = iter_ndjson(_iter_spool(spool))
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cuerpo JSON inválido")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Se esperaba una lista de recursos")
+        resources = _iter_list(body)
+
+    async def lines() -> AsyncIterator[str]:
+        try:
+            async for record in stream_compliance_report(resources):
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Error al generar reporte: {str(e)}")
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            if spool is not None:
+                spool.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _iter_spool(spool) -> AsyncIterator[bytes]:
+    while True:
+        data = spool.read(NDJSON_READ_BYTES)
+        if not data:
+            return
+        yield data
+
+
+async def _iter_list(items: list) -> AsyncIterator[Dict[str, Any]]:
+    for item in items:
+        yield item if isinstance(item, dict) else {"_parse_error": "Cada recurso debe ser un objeto JSON"}
@@ -1,9 +1,16 @@
 """
 Router para health checks
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 from datetime import datetime
 
+from src.config import settings
+from src.services.cache_service import get_audio_cache, get_llm_cache, get_semantic_cache
+from src.services.faq_pack import get_faq_pack_store
+from src.services.gcp_service import get_warmup_state
+from src.services.governance_incremental import get_incremental_analyzer
+from src.services.upload_queue import get_upload_queue
+
 router = APIRouter()
 
 
@@ -18,9 +25,43 @@ async def health_check():
 
 
 @router.get("/ready")
-async def readiness_check():
-    """Readiness check endpoint"""
+async def readiness_check(response: Response):
+    """
+    Readiness check endpoint
+
+    Retorna 503 hasta que los clientes GCP terminen de precalentarse.
+    """
+    warmup = get_warmup_state()
+    if settings.gcp_warmup_enabled and warmup["status"] != "ready":
+        response.status_code = 503
+        return {
+            "status": "not_ready",
+            "warmup": warmup,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
     return {
         "status": "ready",
         "timestamp": datetime.utcnow().isoformat(),
     }
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Contadores de aciertos/fallos de las cachés"""
+    return {
+        "llm": get_llm_cache().stats(),
+        "semantic": get_semantic_cache().stats(),
+        "faq": get_faq_pack_store().stats(),
+        "tts": get_audio_cache().stats(),
+        "governance": get_incremental_analyzer().stats(),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+@router.get("/uploads/stats")
+async def upload_stats():
+    """Profundidad, latencia y contadores de la cola de subidas a Storage"""
+    return {
+        "uploads": get_upload_queue().stats(),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
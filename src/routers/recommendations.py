@@ -6,7 +6,8 @@ from pydantic import BaseModel
 from typing import List
 import logging
 
-from src.services.gcp_service import get_gcp_service
+from src.services.async_gcp_service import get_async_gcp_service
+from src.services.model_registry import JSON
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -41,7 +42,7 @@ async def get_devops_recommendations(request: RecommendationRequest):
     - reliability: Confiabilidad
     """
     try:
-        gcp_service = get_gcp_service()
+        gcp_service = get_async_gcp_service()
         
         prompt = f"""
         Como experto en DevOps, proporciona recomendaciones específicas para:
@@ -60,7 +61,7 @@ async def get_devops_recommendations(request: RecommendationRequest):
         Responde SOLO con JSON válido.
         """
         
-        response_text = gcp_service.get_ai_recommendation(prompt)
+        response_text = await gcp_service.get_ai_recommendation(prompt, profile=JSON)
         
         # Parsear respuesta
         import json
@@ -156,7 +157,7 @@ async def infrastructure_assessment(infrastructure_config: dict):
     Evaluar configuración de infraestructura completa
     """
     try:
-        gcp_service = get_gcp_service()
+        gcp_service = get_async_gcp_service()
         
         prompt = f"""
         Evalúa la siguiente configuración de infraestructura y proporciona un assessment:
@@ -173,7 +174,7 @@ async def infrastructure_assessment(infrastructure_config: dict):
         Responde en formato JSON estructurado.
         """
         
-        response_text = gcp_service.get_ai_recommendation(prompt)
+        response_text = await gcp_service.get_ai_recommendation(prompt, profile=JSON)
         
         import json
         try:
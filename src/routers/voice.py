@@ -1,17 +1,38 @@
 """
 Router para procesamiento de voz
 """
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import quote
+import asyncio
+import base64
+import json
 import logging
 from datetime import datetime
 
-from src.services.gcp_service import get_gcp_service
+from src.services.async_gcp_service import get_async_gcp_service
+from src.services.faq_pack import get_faq_pack_store
+from src.services.upload_queue import get_upload_queue
 from src.config import settings
+from src.utils.audio_format import AudioFormat, UnsupportedAudioFormat, detect_audio_format
+from src.utils.transcription import clean_transcription
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Prefijo de los audios que se pueden reproducir vía /archive: solo la voz
+# sintetizada, direccionada por contenido. Las grabaciones de los usuarios
+# (audios/input/) y las respuestas (audios/responses/) tienen nombres con
+# marca de tiempo fáciles de adivinar y no se exponen.
+ARCHIVE_PREFIX = "audios/synthesized/"
+
+# Tamaño máximo (ya codificado) de cada header X-* de las respuestas audio/mpeg.
+# Proxies y servidores suelen limitar el total de headers a 4-8 KB; el texto
+# completo está en la forma JSON o NDJSON del endpoint.
+MAX_HEADER_VALUE = 1024
+
 
 class VoiceQuery(BaseModel):
     """Modelo para consulta de voz"""
@@ -31,12 +52,81 @@ class AudioTranscriptionResponse(BaseModel):
     confidence: float = 0.95
 
 
+class ConverseResponse(BaseModel):
+    """Respuesta de conversación completa (STT → IA → TTS)"""
+    transcript: str
+    response: str
+    audio_base64: Optional[str] = None
+    format: str = "mp3"
+    storage_path: Optional[str] = None
+
+
+def _accepts_audio(request: Request) -> bool:
+    """Indica si el header Accept prefiere audio/mpeg sobre JSON"""
+    preferences = {}
+    for part in request.headers.get("accept", "").split(","):
+        media_type, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        preferences[media_type.strip().lower()] = quality
+
+    audio_quality = preferences.get("audio/mpeg", preferences.get("audio/*", 0.0))
+    json_quality = preferences.get("application/json", preferences.get("*/*", 0.0))
+    return audio_quality > 0 and audio_quality >= json_quality
+
+
+def _detect_upload_format(content: bytes) -> AudioFormat:
+    """Formato del audio subido; 415 si Speech-to-Text no puede decodificarlo"""
+    try:
+        return detect_audio_format(content)
+    except UnsupportedAudioFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+
+def _audio_response(audio_content: bytes, metadata: Dict[str, Optional[str]]) -> Response:
+    """
+    Respuesta binaria audio/mpeg con los metadatos en headers X-*
+
+    Los valores se codifican como URL (percent-encoding) porque los headers
+    HTTP no admiten caracteres fuera de latin-1. Los valores None se omiten.
+    Un valor que codificado supera MAX_HEADER_VALUE se recorta y se marca con
+    `X-<nombre>-Truncated: true`; el texto completo se obtiene pidiendo JSON.
+    """
+    headers = {}
+    for name, value in metadata.items():
+        if value is None:
+            continue
+        encoded = quote(value, safe=" /:")
+        if len(encoded) > MAX_HEADER_VALUE:
+            encoded = _truncate_encoded(value, MAX_HEADER_VALUE)
+            headers[f"X-{name}-Truncated"] = "true"
+        headers[f"X-{name}"] = encoded
+    return Response(content=audio_content, media_type="audio/mpeg", headers=headers)
+
+
+def _truncate_encoded(value: str, limit: int) -> str:
+    """Prefijo más largo de `value` cuya codificación cabe en `limit` bytes (sin partir caracteres)"""
+    size = 0
+    for i, char in enumerate(value):
+        size += len(quote(char, safe=" /:"))
+        if size > limit:
+            return quote(value[:i], safe=" /:")
+    return quote(value, safe=" /:")
+
+
 @router.post("/transcribe", response_model=AudioTranscriptionResponse)
 async def transcribe_audio(file: UploadFile = File(...)):
     """
     Transcribir archivo de audio a texto
     
-    - Soporta formatos: WAV, OGG, FLAC, MP3
+    - Soporta formatos: WAV (PCM 16 bits), OGG (Opus), WebM (Opus), FLAC, MP3
+    - El formato y la frecuencia de muestreo se detectan de la cabecera
     """
     try:
         # Leer contenido del archivo
@@ -44,33 +134,37 @@ async def transcribe_audio(file: UploadFile = File(...)):
         
         if not content:
             raise HTTPException(status_code=400, detail="Archivo vacío")
+        audio_format = _detect_upload_format(content)
         
-        gcp_service = get_gcp_service()
+        gcp_service = get_async_gcp_service()
         
-        # Guardar audio de entrada en Storage
+        # Archivar audio de entrada en Storage (en segundo plano)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        input_path = f"audios/input/{timestamp}_input.wav"
-        gcp_service.upload_to_storage(settings.storage_bucket, input_path, content)
-        logger.info(f"📦 Audio guardado: {input_path}")
+        input_path = f"audios/input/{timestamp}_input.{audio_format.container}"
+        get_upload_queue().enqueue(settings.storage_bucket, input_path, content)
+        logger.info(f"📦 Audio encolado: {input_path}")
         
         # Transcribir usando GCP
-        transcript = gcp_service.transcribe_audio(content)
+        transcript = await gcp_service.transcribe_audio(content, audio_format=audio_format)
         
         return AudioTranscriptionResponse(
             transcript=transcript,
             confidence=0.95,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en transcripción: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/synthesize")
-async def synthesize_speech(request: SynthesizeRequest):
+async def synthesize_speech(request: SynthesizeRequest, http_request: Request):
     """
     Sintetizar texto a voz
     
-    Retorna audio MP3
+    Retorna audio MP3: JSON con base64 por defecto, o los bytes crudos si
+    el cliente envía `Accept: audio/mpeg` (metadatos en headers X-*).
     """
     try:
         if not request.text or len(request.text) == 0:
@@ -79,22 +173,25 @@ async def synthesize_speech(request: SynthesizeRequest):
         if len(request.text) > 5000:
             raise HTTPException(status_code=400, detail="Texto muy largo (máximo 5000 caracteres)")
         
-        gcp_service = get_gcp_service()
+        gcp_service = get_async_gcp_service()
         
-        # Sintetizar usando GCP
-        audio_content = gcp_service.synthesize_speech(request.text, request.language_code)
+        # Sintetizar y archivar en Storage (se reutiliza el audio cacheado)
+        synthesis = await gcp_service.synthesize_and_archive(
+            request.text, request.language_code, settings.storage_bucket
+        )
+        logger.info(f"📦 Audio sintetizado encolado: {synthesis['storage_path']}")
         
-        # Guardar audio sintetizado en Storage
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_path = f"audios/synthesized/{timestamp}_output.mp3"
-        gcp_service.upload_to_storage(settings.storage_bucket, output_path, audio_content)
-        logger.info(f"📦 Audio sintetizado guardado: {output_path}")
+        if _accepts_audio(http_request):
+            return _audio_response(synthesis["audio"], {
+                "Text": request.text,
+                "Storage-Path": synthesis["storage_path"],
+            })
         
         return {
-            "audio_base64": __import__("base64").b64encode(audio_content).decode("utf-8"),
+            "audio_base64": base64.b64encode(synthesis["audio"]).decode("utf-8"),
             "format": "mp3",
             "text": request.text,
-            "storage_path": f"gs://{settings.storage_bucket}/{output_path}",
+            "storage_path": synthesis["storage_path"],
         }
     except Exception as e:
         logger.error(f"Error en síntesis de voz: {str(e)}")
@@ -102,32 +199,319 @@ async def synthesize_speech(request: SynthesizeRequest):
 
 
 @router.post("/query")
-async def voice_query(query: VoiceQuery):
+async def voice_query(query: VoiceQuery, http_request: Request):
     """
     Realizar consulta de voz y obtener respuesta de IA
+    
+    Con `Accept: audio/mpeg` retorna el MP3 crudo con la consulta y la
+    respuesta en los headers X-Query y X-Response-Text.
     """
     try:
-        gcp_service = get_gcp_service()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Preguntas frecuentes: respuesta y audio precalculados, sin llamadas a GCP
+        faq = get_faq_pack_store().lookup(query.query, query.language_code)
+        if faq is not None:
+            logger.info(f"⚡ Respuesta desde paquete FAQ: {faq.question}")
+            if _accepts_audio(http_request):
+                return _audio_response(faq.audio, {
+                    "Query": query.query,
+                    "Response-Text": faq.answer,
+                    "Source": "faq",
+                })
+            return {
+                "query": query.query,
+                "response": faq.answer,
+                "audio_base64": base64.b64encode(faq.audio).decode("utf-8"),
+                "format": "mp3",
+                "storage_path": None,
+                "source": "faq",
+            }
+
+        gcp_service = get_async_gcp_service()
         
         # Generar recomendación IA
-        response = gcp_service.get_ai_recommendation(query.query)
+        response = await gcp_service.get_ai_recommendation(query.query)
         
-        # Sintetizar respuesta a voz
-        audio_content = gcp_service.synthesize_speech(response, query.language_code)
+        # Sintetizar respuesta a voz y archivarla en Storage
+        synthesis = await gcp_service.synthesize_and_archive(
+            response, query.language_code, settings.storage_bucket
+        )
+        logger.info(f"📦 Respuesta encolada: {synthesis['storage_path']}")
         
-        # Guardar respuesta de audio en Storage
-        response_path = f"audios/responses/{timestamp}_response.mp3"
-        gcp_service.upload_to_storage(settings.storage_bucket, response_path, audio_content)
-        logger.info(f"📦 Respuesta guardada: {response_path}")
+        if _accepts_audio(http_request):
+            return _audio_response(synthesis["audio"], {
+                "Query": query.query,
+                "Response-Text": response,
+                "Storage-Path": synthesis["storage_path"],
+            })
         
         return {
             "query": query.query,
             "response": response,
-            "audio_base64": __import__("base64").b64encode(audio_content).decode("utf-8"),
+            "audio_base64": base64.b64encode(synthesis["audio"]).decode("utf-8"),
             "format": "mp3",
-            "storage_path": f"gs://{settings.storage_bucket}/{response_path}",
+            "storage_path": synthesis["storage_path"],
         }
     except Exception as e:
         logger.error(f"Error en consulta de voz: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/query/stream")
+async def voice_query_stream(query: VoiceQuery):
+    """
+    Consulta de voz con respuesta en streaming (NDJSON)
+
+    La respuesta de Gemini se corta por oraciones y cada oración se sintetiza
+    en cuanto está completa, mientras el modelo sigue generando. Cada línea es:
+    - {"type": "sentence", "index", "text", "audio_base64"} por oración
+    - {"type": "done", "response", "format", "storage_path"} al final
+    - {"type": "error", "detail"} si falla a mitad de stream
+    """
+    gcp_service = get_async_gcp_service()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    faq = get_faq_pack_store().lookup(query.query, query.language_code)
+
+    async def faq_answer() -> AsyncIterator[str]:
+        # Respuesta precalculada: una sola oración con el audio completo
+        yield json.dumps({
+            "type": "sentence",
+            "index": 0,
+            "text": faq.answer,
+            "audio_base64": base64.b64encode(faq.audio).decode("utf-8"),
+        }, ensure_ascii=False) + "\n"
+        yield json.dumps({
+            "type": "done",
+            "response": faq.answer,
+            "format": "mp3",
+            "storage_path": None,
+            "source": "faq",
+        }, ensure_ascii=False) + "\n"
+
+    async def pipeline() -> AsyncIterator[str]:
+        syntheses: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue()
+
+        async def produce() -> None:
+            try:
+                async for sentence in gcp_service.stream_ai_recommendation(query.query):
+                    tts = asyncio.ensure_future(
+                        gcp_service.synthesize_speech(sentence, query.language_code)
+                    )
+                    await syntheses.put((sentence, tts))
+            finally:
+                await syntheses.put(None)
+
+        producer = asyncio.ensure_future(produce())
+        sentences = []
+        audio_chunks = []
+        try:
+            while True:
+                item = await syntheses.get()
+                if item is None:
+                    break
+                sentence, tts = item
+                audio_content = await tts
+                sentences.append(sentence)
+                audio_chunks.append(audio_content)
+                yield json.dumps({
+                    "type": "sentence",
+                    "index": len(sentences) - 1,
+                    "text": sentence,
+                    "audio_base64": base64.b64encode(audio_content).decode("utf-8"),
+                }, ensure_ascii=False) + "\n"
+            await producer
+
+            # Archivar respuesta de audio completa en Storage (en segundo plano)
+            response_path = f"audios/responses/{timestamp}_response.mp3"
+            get_upload_queue().enqueue(settings.storage_bucket, response_path, b"".join(audio_chunks))
+            logger.info(f"📦 Respuesta encolada: {response_path}")
+
+            yield json.dumps({
+                "type": "done",
+                "response": " ".join(sentences),
+                "format": "mp3",
+                "storage_path": f"gs://{settings.storage_bucket}/{response_path}",
+            }, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Error en consulta de voz streaming: {str(e)}")
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            producer.cancel()
+
+    if faq is not None:
+        logger.info(f"⚡ Respuesta desde paquete FAQ: {faq.question}")
+        return StreamingResponse(faq_answer(), media_type="application/x-ndjson")
+    return StreamingResponse(pipeline(), media_type="application/x-ndjson")
+
+
+@router.post("/converse", response_model=ConverseResponse)
+async def voice_converse(
+    http_request: Request,
+    file: UploadFile = File(...),
+    language_code: str = Form("es-ES"),
+):
+    """
+    Turno de conversación completo en una sola petición
+
+    Recibe el audio del usuario y ejecuta en el servidor
+    Speech-to-Text → Gemini → Text-to-Speech.
+    Si no se reconoce voz, retorna transcripción y respuesta vacías sin audio.
+    Con `Accept: audio/mpeg` retorna el MP3 crudo con la transcripción y la
+    respuesta en los headers X-Transcript y X-Response-Text.
+    """
+    try:
+        content = await file.read()
+
+        if not content:
+            raise HTTPException(status_code=400, detail="Archivo vacío")
+        audio_format = _detect_upload_format(content)
+
+        gcp_service = get_async_gcp_service()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # Archivar audio de entrada (en segundo plano) y transcribir
+        input_path = f"audios/input/{timestamp}_input.{audio_format.container}"
+        get_upload_queue().enqueue(settings.storage_bucket, input_path, content)
+        transcript = await gcp_service.transcribe_audio(content, language_code, audio_format)
+
+        query = clean_transcription(transcript)
+        if len(query) < 2:
+            return ConverseResponse(transcript=transcript, response="")
+
+        faq = get_faq_pack_store().lookup(query, language_code)
+        if faq is not None:
+            logger.info(f"⚡ Respuesta desde paquete FAQ: {faq.question}")
+            response = faq.answer
+            synthesis = {"audio": faq.audio, "storage_path": None}
+        else:
+            response = await gcp_service.get_ai_recommendation(query)
+            synthesis = await gcp_service.synthesize_and_archive(
+                response, language_code, settings.storage_bucket
+            )
+            logger.info(f"📦 Conversación encolada: {input_path}, {synthesis['storage_path']}")
+
+        if _accepts_audio(http_request):
+            return _audio_response(synthesis["audio"], {
+                "Transcript": query,
+                "Response-Text": response,
+                "Storage-Path": synthesis["storage_path"],
+            })
+
+        return ConverseResponse(
+            transcript=query,
+            response=response,
+            audio_base64=base64.b64encode(synthesis["audio"]).decode("utf-8"),
+            storage_path=synthesis["storage_path"],
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en conversación de voz: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpretar un header Range de un solo rango de bytes
+
+    Returns:
+        (inicio, fin exclusivo) o None si no hay header
+
+    Raises:
+        HTTPException: 416 si el rango no es satisfacible
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    first, _, last = spec.partition("-")
+    try:
+        if unit.strip() != "bytes" or "," in spec:
+            raise ValueError(header)
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        else:
+            # Sufijo: los últimos N bytes
+            start, end = max(0, size - int(last)), size
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Rango inválido", headers={"Content-Range": f"bytes */{size}"})
+    end = min(end, size)
+    if start >= end:
+        raise HTTPException(status_code=416, detail="Rango no satisfacible", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+@router.get("/archive/{file_path:path}")
+async def get_archived_audio(file_path: str, http_request: Request):
+    """
+    Reproducir un audio sintetizado archivado en Storage con soporte de rangos (HTTP Range)
+
+    El audio se transmite por fragmentos desde Storage: solo se descarga el
+    rango pedido y la memoria queda acotada por el tamaño de fragmento.
+    """
+    if not file_path.startswith(ARCHIVE_PREFIX) or ".." in file_path.split("/"):
+        raise HTTPException(status_code=404, detail="Audio no encontrado")
+
+    gcp_service = get_async_gcp_service()
+    try:
+        info = await gcp_service.get_storage_object_info(settings.storage_bucket, file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Audio no encontrado")
+    except Exception as e:
+        logger.error(f"Error al leer audio archivado: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    size = info["size"]
+    byte_range = _parse_range(http_request.headers.get("range"), size)
+    start, end = byte_range or (0, size)
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start)}
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+
+    return StreamingResponse(
+        gcp_service.iter_download(settings.storage_bucket, file_path, start=start, end=end),
+        status_code=206 if byte_range else 200,
+        media_type=info["content_type"] or "audio/mpeg",
+        headers=headers,
+    )
+
+
+@router.websocket("/stream")
+async def stream_transcription(websocket: WebSocket, language_code: str = "es-ES", sample_rate: int = 16000):
+    """
+    Transcripción en streaming por WebSocket
+
+    Protocolo:
+    - Cliente → servidor: frames binarios PCM LINEAR16 mono; texto "EOS" para cerrar el audio
+    - Servidor → cliente: JSON `interim`/`final` con la transcripción parcial,
+      `end_of_speech` cuando Speech-to-Text detecta el fin de la frase
+      y `done` con la transcripción completa antes de cerrar
+    """
+    await websocket.accept()
+    gcp_service = get_async_gcp_service()
+
+    async def receive_frames() -> AsyncIterator[bytes]:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                yield message["bytes"]
+            elif message.get("text") == "EOS":
+                return
+
+    try:
+        finals = []
+        async for event in gcp_service.streaming_transcribe(receive_frames(), language_code, sample_rate):
+            if event["type"] == "final":
+                finals.append(event["transcript"])
+            await websocket.send_json(event)
+
+        transcript = clean_transcription(" ".join(finals))
+        await websocket.send_json({"type": "done", "transcript": transcript})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("🔌 Cliente desconectado del stream de voz")
+    except Exception as e:
+        logger.error(f"Error en transcripción streaming: {str(e)}")
+        await websocket.close(code=1011, reason=str(e)[:120])
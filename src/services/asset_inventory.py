@@ -0,0 +1,336 @@
+"""
+Ingesta de exportaciones de Cloud Asset Inventory
+
+Procesa una exportación NDJSON (a menudo de varios GB) guardada en Storage
+como un pipeline de generadores: descarga por fragmentos → líneas → activos
+→ recursos tipados (iam, storage, gke, compute) → análisis → agregados. La
+memoria queda acotada por el tamaño de fragmento y de bloque de análisis.
+
+Las exportaciones escriben RESOURCE e IAM_POLICY como líneas (o exportaciones)
+separadas; los activos que necesitan ambas partes se combinan por `name`
+antes de evaluarse, así que se pueden pasar varias rutas en un mismo análisis.
+
+Para pruebas y desarrollo, `LocalObjectStore` sustituye al bucket por un
+directorio local con la estructura <raíz>/<bucket>/<ruta>.
+
+Uso:
+    python -m src.services.asset_inventory exports/resources.json [exports/iam.json ...] [--bucket B] [--local-root DIR] [--summary-only]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence, Union
+
+from src.config import settings
+from src.services.compliance_report import iter_ndjson, stream_compliance_report
+
+# Fuente de fragmentos de un objeto: (bucket, ruta, tamaño de fragmento) -> bytes
+ChunkSource = Callable[[str, str, int], AsyncIterator[bytes]]
+
+PUBLIC_MEMBERS = frozenset({"allUsers", "allAuthenticatedUsers"})
+IAM_POLICY_ASSET_TYPES = frozenset({
+    "cloudresourcemanager.googleapis.com/Project",
+    "cloudresourcemanager.googleapis.com/Folder",
+    "cloudresourcemanager.googleapis.com/Organization",
+})
+# Activos cuyo análisis usa el recurso y su política IAM a la vez
+MERGED_ASSET_TYPES = frozenset({"storage.googleapis.com/Bucket"})
+# Licencias de imágenes públicas de Google (proyectos *-cloud)
+MANAGED_IMAGE_LICENSE = re.compile(r"/projects/[a-z0-9-]+-cloud/global/licenses/")
+
+
+class LocalObjectStore:
+    """Sustituto de Cloud Storage sobre el sistema de archivos local"""
+
+    def __init__(self, root: str):
+        """
+        Inicializar almacén
+
+        Args:
+            root: Directorio raíz; los objetos se leen de <root>/<bucket>/<ruta>
+        """
+        self.root = root
+
+    def object_path(self, bucket_name: str, file_path: str) -> str:
+        """
+        Ruta local de un objeto
+
+        Raises:
+            ValueError: Si el bucket o la ruta salen de la raíz (absolutas o con `..`)
+        """
+        for part in (bucket_name, file_path):
+            if not part or os.path.isabs(part) or ".." in re.split(r"[/\\]", part):
+                raise ValueError(f"Ruta de objeto no válida: {part!r}")
+        return os.path.join(self.root, bucket_name, file_path)
+
+    async def iter_chunks(self, bucket_name: str, file_path: str, chunk_size: int) -> AsyncIterator[bytes]:
+        """Leer un objeto por fragmentos sin bloquear el event loop"""
+        path = self.object_path(bucket_name, file_path)
+        f = await asyncio.to_thread(open, path, "rb")
+        try:
+            while True:
+                chunk = await asyncio.to_thread(f.read, chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            f.close()
+
+
+def _bindings_by_principal(policy: Dict[str, Any]) -> Dict[str, list]:
+    principals: Dict[str, list] = {}
+    for binding in policy.get("bindings") or ():
+        for member in binding.get("members") or ():
+            principals.setdefault(member, []).append(binding.get("role"))
+    return principals
+
+
+def map_iam_policy(asset: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Política IAM de proyecto, carpeta u organización"""
+    policy = asset.get("iam_policy")
+    if not policy:
+        return None
+    bindings = _bindings_by_principal(policy)
+    roles = {binding.get("role") or "" for binding in policy.get("bindings") or ()}
+    return {
+        "service_accounts": sorted(m for m in bindings if m.startswith("serviceAccount:")),
+        "bindings": bindings,
+        "uses_custom_roles": any(role.startswith(("projects/", "organizations/")) for role in roles),
+        "audit_logging_enabled": bool(policy.get("auditConfigs") or policy.get("audit_configs")),
+    }
+
+
+def map_bucket(asset: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Bucket de Cloud Storage"""
+    data = (asset.get("resource") or {}).get("data")
+    if data is None:
+        return None
+    bindings = (asset.get("iam_policy") or {}).get("bindings") or ()
+    return {
+        # Cloud Storage cifra siempre en reposo (con claves de Google o CMEK)
+        "encryption_enabled": True,
+        "versioning_enabled": bool((data.get("versioning") or {}).get("enabled")),
+        "lifecycle_policy": (data.get("lifecycle") or {}).get("rule") or None,
+        "is_public": any(PUBLIC_MEMBERS.intersection(b.get("members") or ()) for b in bindings),
+        "audit_logging_enabled": bool((data.get("logging") or {}).get("logBucket")),
+    }
+
+
+def map_cluster(asset: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Cluster de GKE (las cuotas por namespace no aparecen en la exportación)"""
+    data = (asset.get("resource") or {}).get("data")
+    if data is None:
+        return None
+    logging_components = ((data.get("loggingConfig") or {}).get("componentConfig") or {}).get("enableComponents")
+    return {
+        "rbac_enabled": not (data.get("legacyAbac") or {}).get("enabled", False),
+        "network_policy_enabled": bool((data.get("networkPolicy") or {}).get("enabled"))
+        or (data.get("networkConfig") or {}).get("datapathProvider") == "ADVANCED_DATAPATH",
+        "pod_security_policy_enabled": bool((data.get("podSecurityPolicyConfig") or {}).get("enabled")),
+        "audit_logging_enabled": bool(logging_components)
+        or data.get("loggingService", "none") not in ("", "none"),
+    }
+
+
+def map_instance(asset: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Instancia de Compute Engine"""
+    data = (asset.get("resource") or {}).get("data")
+    if data is None:
+        return None
+    labels = data.get("labels") or {}
+    metadata = {item.get("key"): item.get("value") for item in (data.get("metadata") or {}).get("items") or ()}
+    scheduling = data.get("scheduling") or {}
+    licenses = (license for disk in data.get("disks") or () for license in disk.get("licenses") or ())
+    return {
+        "name": data.get("name") or asset.get("name"),
+        "managed_image": any(MANAGED_IMAGE_LICENSE.search(license) for license in licenses),
+        "monitoring_enabled": "goog-ops-agent-policy" in labels
+        or str(metadata.get("google-monitoring-enabled", "")).lower() == "true",
+        "labels": labels,
+        "environment": labels.get("env") or labels.get("environment"),
+        "preemptible": bool(scheduling.get("preemptible")) or scheduling.get("provisioningModel") == "SPOT",
+        "startup_script": metadata.get("startup-script") or metadata.get("startup-script-url"),
+        "shutdown_script": metadata.get("shutdown-script") or metadata.get("shutdown-script-url"),
+    }
+
+
+def _asset_type(asset: Dict[str, Any]) -> Optional[str]:
+    return asset.get("asset_type") or asset.get("assetType")
+
+
+# asset_type -> (tipo de recurso, función de mapeo)
+ASSET_MAPPERS: Dict[str, tuple] = {
+    **{asset_type: ("iam", map_iam_policy) for asset_type in IAM_POLICY_ASSET_TYPES},
+    "storage.googleapis.com/Bucket": ("storage", map_bucket),
+    "container.googleapis.com/Cluster": ("gke", map_cluster),
+    "compute.googleapis.com/Instance": ("compute", map_instance),
+}
+
+
+def map_asset(asset: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convertir un activo de la exportación al recurso tipado que espera GovernanceService
+
+    Returns:
+        {"resource_type", "resource_id", "resource_data"} o None si el activo no se analiza
+    """
+    mapper = ASSET_MAPPERS.get(_asset_type(asset))
+    if mapper is None:
+        return None
+    resource_type, convert = mapper
+    resource_data = convert(asset)
+    if resource_data is None:
+        return None
+    return {"resource_type": resource_type, "resource_id": asset.get("name"), "resource_data": resource_data}
+
+
+class IngestionStats:
+    """Contadores de la ingesta"""
+
+    def __init__(self):
+        self.bytes = 0
+        self.assets = 0
+        self.mapped = 0
+        self.skipped = 0
+        self.merged = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "bytes": self.bytes,
+            "assets": self.assets,
+            "mapped": self.mapped,
+            "skipped": self.skipped,
+            "merged": self.merged,
+        }
+
+
+async def _count_bytes(chunks: AsyncIterator[bytes], stats: IngestionStats) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        stats.bytes += len(chunk)
+        yield chunk
+
+
+async def _chain_chunks(
+    source: ChunkSource, bucket_name: str, file_paths: Sequence[str], chunk_size: int, stats: IngestionStats
+) -> AsyncIterator[bytes]:
+    for file_path in file_paths:
+        async for chunk in _count_bytes(source(bucket_name, file_path, chunk_size), stats):
+            yield chunk
+        # Separar la última línea de una exportación de la primera de la siguiente
+        yield b"\n"
+
+
+def _is_partial(asset: Dict[str, Any]) -> bool:
+    """Activo de MERGED_ASSET_TYPES al que le falta el recurso o la política IAM"""
+    return (
+        _asset_type(asset) in MERGED_ASSET_TYPES
+        and asset.get("name") is not None
+        and not (asset.get("resource") and asset.get("iam_policy"))
+    )
+
+
+async def _typed_resources(assets: AsyncIterator[Dict[str, Any]], stats: IngestionStats) -> AsyncIterator[Dict[str, Any]]:
+    def typed(asset: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        resource = map_asset(asset)
+        if resource is None:
+            stats.skipped += 1
+        else:
+            stats.mapped += 1
+        return resource
+
+    # Partes RESOURCE / IAM_POLICY a la espera de su complemento (acotado por el número de buckets)
+    partial: Dict[str, Dict[str, Any]] = {}
+    async for asset in assets:
+        stats.assets += 1
+        if "_parse_error" in asset:
+            yield asset
+            continue
+        if _is_partial(asset):
+            other = partial.pop(asset["name"], None)
+            if other is None:
+                partial[asset["name"]] = asset
+                continue
+            asset = {**other, **{key: value for key, value in asset.items() if value}}
+            stats.merged += 1
+        resource = typed(asset)
+        if resource is not None:
+            yield resource
+
+    # Sin complemento en la exportación: se evalúa con la parte disponible
+    for asset in partial.values():
+        resource = typed(asset)
+        if resource is not None:
+            yield resource
+
+
+def default_source() -> ChunkSource:
+    """Fuente configurada: directorio local si `asset_inventory_local_root` está definido, si no Cloud Storage"""
+    if settings.asset_inventory_local_root:
+        return LocalObjectStore(settings.asset_inventory_local_root).iter_chunks
+    from src.services.async_gcp_service import get_async_gcp_service
+
+    return get_async_gcp_service().iter_download
+
+
+async def analyze_export(
+    file_path: Union[str, Sequence[str]],
+    bucket_name: Optional[str] = None,
+    source: Optional[ChunkSource] = None,
+    chunk_size: Optional[int] = None,
+    **report_options: Any,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Analizar la gobernanza de una exportación de Cloud Asset Inventory
+
+    Args:
+        file_path: Ruta del objeto NDJSON en el bucket, o varias (p. ej. las
+            exportaciones RESOURCE e IAM_POLICY) que se analizan como una sola
+        bucket_name: Bucket (por defecto `storage_bucket`)
+        source: Fuente de fragmentos (por defecto la configurada)
+        chunk_size: Bytes por fragmento descargado
+        **report_options: Opciones de stream_compliance_report
+
+    Yields:
+        Registros del reporte de cumplimiento; el `summary` final incluye `ingestion`
+    """
+    file_paths = [file_path] if isinstance(file_path, str) else list(file_path)
+    bucket_name = bucket_name or settings.storage_bucket
+    source = source or default_source()
+    chunk_size = chunk_size or settings.asset_inventory_chunk_bytes
+    stats = IngestionStats()
+
+    chunks = _chain_chunks(source, bucket_name, file_paths, chunk_size, stats)
+    resources = _typed_resources(iter_ndjson(chunks), stats)
+    sources = [f"gs://{bucket_name}/{path}" for path in file_paths]
+    async for record in stream_compliance_report(resources, **report_options):
+        if record["type"] == "summary":
+            record = {
+                **record,
+                "source": sources[0] if isinstance(file_path, str) else sources,
+                "ingestion": stats.as_dict(),
+            }
+        yield record
+
+
+async def _run_cli(args: argparse.Namespace) -> None:
+    source = LocalObjectStore(args.local_root).iter_chunks if args.local_root else None
+    async for record in analyze_export(args.object_paths, args.bucket, source=source):
+        if args.summary_only and record["type"] in ("result", "aggregate"):
+            continue
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("object_paths", nargs="+", help="Rutas de las exportaciones NDJSON en el bucket")
+    parser.add_argument("--bucket", default=None, help="Bucket (por defecto STORAGE_BUCKET)")
+    parser.add_argument("--local-root", default=None, help="Leer <raíz>/<bucket>/<ruta> del disco en lugar de Storage")
+    parser.add_argument("--summary-only", action="store_true", help="Emitir solo errores y el resumen final")
+    asyncio.run(_run_cli(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Fachada asíncrona sobre GCPService
+
+Los clientes de GCP son síncronos; ejecutarlos directamente dentro de un
+handler `async def` bloquea el event loop de uvicorn. Esta fachada delega cada
+llamada a un ThreadPoolExecutor acotado y limita la concurrencia por servicio
+(Speech, TTS, Vertex AI, Storage) con semáforos.
+"""
+import asyncio
+import functools
+import logging
+import mmap
+import queue
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from src.config import settings
+from src.services import model_registry
+from src.services.gcp_service import GCPService, get_gcp_service
+from src.utils.audio_format import AudioFormat
+from src.utils.sentences import iter_sentences
+
+logger = logging.getLogger(__name__)
+
+# Servicios upstream con límite de concurrencia propio
+SPEECH = "speech"
+TTS = "tts"
+LLM = "llm"
+STORAGE = "storage"
+
+# Elementos de un iterador bloqueante pendientes de consumir (ver AsyncGCPService.iterate)
+ITERATE_BUFFER = 32
+
+
+def default_limits() -> Dict[str, int]:
+    """Límites de concurrencia por servicio definidos en la configuración"""
+    return {
+        SPEECH: settings.gcp_concurrency_speech,
+        TTS: settings.gcp_concurrency_tts,
+        LLM: settings.gcp_concurrency_llm,
+        STORAGE: settings.gcp_concurrency_storage,
+    }
+
+
+class AsyncGCPService:
+    """Fachada asíncrona con concurrencia acotada sobre GCPService"""
+
+    def __init__(
+        self,
+        service: Optional[GCPService] = None,
+        max_workers: Optional[int] = None,
+        limits: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Inicializar fachada
+
+        Args:
+            service: Servicio GCP síncrono (por defecto el singleton global)
+            max_workers: Hilos del executor compartido
+            limits: Llamadas simultáneas permitidas por servicio upstream
+        """
+        self._service = service
+        self._limits = {**default_limits(), **(limits or {})}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.gcp_executor_workers,
+            thread_name_prefix="gcp",
+        )
+        # Los semáforos de asyncio pertenecen a un event loop concreto
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def service(self) -> GCPService:
+        """Servicio GCP síncrono subyacente"""
+        if self._service is None:
+            self._service = get_gcp_service()
+        return self._service
+
+    @property
+    def limits(self) -> Dict[str, int]:
+        """Límites de concurrencia configurados"""
+        return dict(self._limits)
+
+    def _semaphore(self, upstream: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        per_loop = self._semaphores.setdefault(loop, {})
+        if upstream not in per_loop:
+            per_loop[upstream] = asyncio.Semaphore(self._limits[upstream])
+        return per_loop[upstream]
+
+    async def run(self, upstream: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Ejecutar una función bloqueante en el executor respetando el límite del upstream
+
+        Args:
+            upstream: Servicio upstream (speech, tts, llm, storage)
+            func: Función síncrona a ejecutar
+            *args: Argumentos posicionales
+            **kwargs: Argumentos con nombre
+
+        Returns:
+            Resultado de la función
+        """
+        async with self._semaphore(upstream):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    async def upload_to_storage(self, bucket_name: str, file_path: str, data: bytes) -> str:
+        """Subir archivo a Cloud Storage sin bloquear el event loop"""
+        return await self.run(STORAGE, self.service.upload_to_storage, bucket_name, file_path, data)
+
+    async def download_from_storage(self, bucket_name: str, file_path: str) -> bytes:
+        """Descargar archivo de Cloud Storage sin bloquear el event loop"""
+        return await self.run(STORAGE, self.service.download_from_storage, bucket_name, file_path)
+
+    async def get_storage_object_info(self, bucket_name: str, file_path: str) -> Dict[str, Any]:
+        """Metadatos de un objeto de Cloud Storage sin bloquear el event loop"""
+        return await self.run(STORAGE, self.service.get_storage_object_info, bucket_name, file_path)
+
+    async def iter_download(
+        self,
+        bucket_name: str,
+        file_path: str,
+        chunk_size: Optional[int] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Descargar archivo (o rango, `end` exclusivo) por fragmentos sin bloquear el event loop
+
+        Cada fragmento se pide al consumirse, así que la memoria queda acotada
+        por el tamaño de fragmento aunque el consumidor sea más lento.
+        """
+        chunks = self.service.iter_download(bucket_name, file_path, chunk_size, start, end)
+        while True:
+            chunk = await self.run(STORAGE, next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    async def download_to_mmap(
+        self,
+        bucket_name: str,
+        file_path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> mmap.mmap:
+        """Descargar a un archivo temporal mapeado en memoria sin bloquear el event loop"""
+        return await self.run(STORAGE, self.service.download_to_mmap, bucket_name, file_path, start, end)
+
+    async def transcribe_audio(
+        self,
+        audio_data: bytes,
+        language_code: str = "es-ES",
+        audio_format: Optional[AudioFormat] = None,
+    ) -> str:
+        """Transcribir audio sin bloquear el event loop"""
+        return await self.run(SPEECH, self.service.transcribe_audio, audio_data, language_code, audio_format)
+
+    async def iterate(
+        self,
+        upstream: str,
+        factory: Callable[[], Iterator[Any]],
+        max_buffered: int = ITERATE_BUFFER,
+    ) -> AsyncIterator[Any]:
+        """
+        Consumir un iterador bloqueante en el executor y entregar sus elementos al event loop
+
+        El hilo productor se detiene cuando hay `max_buffered` elementos sin
+        consumir y termina (cerrando el iterador) si el consumidor abandona.
+
+        Args:
+            upstream: Servicio upstream (speech, tts, llm, storage)
+            factory: Función que crea el iterador (se invoca dentro del hilo)
+            max_buffered: Elementos producidos pendientes de consumir como máximo
+
+        Yields:
+            Elementos del iterador en orden
+        """
+        loop = asyncio.get_running_loop()
+        items: "asyncio.Queue[Any]" = asyncio.Queue()
+        # Huecos libres de la cola; el productor espera uno antes de entregar cada elemento
+        slots = threading.Semaphore(max_buffered)
+        stop = threading.Event()
+        finished = object()
+
+        def put(item: Any) -> None:
+            loop.call_soon_threadsafe(items.put_nowait, item)
+
+        def consume() -> None:
+            iterator = None
+            try:
+                iterator = factory()
+                for item in iterator:
+                    slots.acquire()
+                    if stop.is_set():
+                        return
+                    put(item)
+            except Exception as e:
+                if not stop.is_set():
+                    put(e)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                if not stop.is_set():
+                    put(finished)
+
+        async with self._semaphore(upstream):
+            loop.run_in_executor(self._executor, consume)
+            try:
+                while True:
+                    item = await items.get()
+                    if item is finished:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    slots.release()
+                    yield item
+            finally:
+                stop.set()
+                # Despertar al productor si espera un hueco para que vea la parada
+                slots.release()
+
+    async def streaming_transcribe(
+        self,
+        frames: AsyncIterator[bytes],
+        language_code: str = "es-ES",
+        sample_rate: int = 16000,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Transcribir audio en streaming sin bloquear el event loop
+
+        El stream gRPC corre en un hilo del executor; los fragmentos de audio
+        llegan por una cola y los eventos se reenvían al event loop.
+
+        Args:
+            frames: Fragmentos PCM recibidos del cliente
+            language_code: Código de idioma
+            sample_rate: Frecuencia de muestreo del audio
+
+        Yields:
+            Eventos de reconocimiento (ver GCPService.streaming_transcribe)
+        """
+        audio_queue: "queue.Queue[Optional[bytes]]" = queue.Queue()
+
+        async def pump() -> None:
+            try:
+                async for frame in frames:
+                    audio_queue.put(frame)
+            finally:
+                audio_queue.put(None)
+
+        pump_task = asyncio.ensure_future(pump())
+        try:
+            async for event in self.iterate(
+                SPEECH,
+                lambda: self.service.streaming_transcribe(
+                    iter(audio_queue.get, None), language_code, sample_rate
+                ),
+            ):
+                yield event
+        finally:
+            pump_task.cancel()
+            audio_queue.put(None)
+
+    async def synthesize_speech(self, text: str, language_code: str = "es-ES") -> bytes:
+        """Sintetizar voz sin bloquear el event loop"""
+        return await self.run(TTS, self.service.synthesize_speech, text, language_code)
+
+    async def synthesize_and_archive(self, text: str, language_code: str, bucket_name: str) -> Dict[str, Any]:
+        """Sintetizar y archivar audio (con caché) sin bloquear el event loop"""
+        return await self.run(TTS, self.service.synthesize_and_archive, text, language_code, bucket_name)
+
+    async def get_ai_recommendation(self, prompt: str, profile: str = model_registry.VOICE) -> str:
+        """Obtener recomendación IA sin bloquear el event loop"""
+        return await self.run(LLM, self.service.get_ai_recommendation, prompt, profile=profile)
+
+    async def stream_ai_recommendation(self, prompt: str) -> AsyncIterator[str]:
+        """Obtener la recomendación IA oración por oración a medida que se genera"""
+        async for sentence in self.iterate(
+            LLM, lambda: iter_sentences(self.service.get_ai_recommendation(prompt, stream=True))
+        ):
+            yield sentence
+
+    async def get_governance_analysis(self, resource_type: str, resource_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analizar gobernanza con IA sin bloquear el event loop"""
+        return await self.run(LLM, self.service.get_governance_analysis, resource_type, resource_data)
+
+    async def get_governance_analysis_batch(self, resource_lines: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Analizar gobernanza de un lote de recursos con IA sin bloquear el event loop"""
+        return await self.run(LLM, self.service.get_governance_analysis_batch, resource_lines)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Detener el executor"""
+        self._executor.shutdown(wait=wait)
+
+
+# Instancia global de la fachada
+_async_gcp_service: Optional[AsyncGCPService] = None
+_async_gcp_service_lock = threading.Lock()
+
+
+def get_async_gcp_service() -> AsyncGCPService:
+    """Obtener instancia de la fachada asíncrona (patrón Singleton)"""
+    global _async_gcp_service
+    if _async_gcp_service is None:
+        with _async_gcp_service_lock:
+            if _async_gcp_service is None:
+                _async_gcp_service = AsyncGCPService()
+    return _async_gcp_service
+
+
+def shutdown_async_gcp_service() -> None:
+    """Liberar el executor de la fachada global"""
+    global _async_gcp_service
+    with _async_gcp_service_lock:
+        if _async_gcp_service is not None:
+            _async_gcp_service.shutdown(wait=False)
+            _async_gcp_service = None
@@ -0,0 +1,631 @@
+"""
+Cachés de respuestas del modelo IA y de audio sintetizado
+
+Las respuestas IA usan Redis cuando `redis_url` está configurado y, si no,
+una caché LRU en memoria con expiración por TTL. Delante del modelo de voz,
+una caché semántica local reconoce paráfrasis de preguntas ya respondidas.
+El audio sintetizado se direcciona por contenido y se guarda en memoria y en
+disco.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Caché LRU en memoria con expiración por TTL"""
+
+    def __init__(self, max_entries: int, ttl: int, clock: Callable[[], float] = time.monotonic):
+        """
+        Inicializar caché
+
+        Args:
+            max_entries: Número máximo de entradas antes de expulsar la menos usada
+            ttl: Segundos de vida de cada entrada
+            clock: Reloj monotónico (inyectable en tests)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Obtener valor si existe y no ha expirado"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Guardar valor expulsando la entrada menos usada si se excede la capacidad"""
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """Caché respaldada por Redis con expiración nativa"""
+
+    def __init__(self, url: str, ttl: int, prefix: str):
+        """
+        Inicializar caché
+
+        Args:
+            url: URL de conexión a Redis
+            ttl: Segundos de vida de cada entrada
+            prefix: Prefijo de las claves
+        """
+        import redis
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> Optional[str]:
+        """Obtener valor (None si no existe o Redis no responde)"""
+        try:
+            return self._client.get(f"{self.prefix}{key}")
+        except Exception as e:
+            logger.warning(f"⚠️ Redis no disponible (get): {str(e)}")
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Guardar valor con TTL (se ignora si Redis no responde)"""
+        try:
+            self._client.set(f"{self.prefix}{key}", value, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Redis no disponible (set): {str(e)}")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalizar prompt: minúsculas y espacios colapsados"""
+    return " ".join(prompt.split()).casefold()
+
+
+class LLMResponseCache:
+    """Caché de respuestas del modelo con contadores de aciertos"""
+
+    def __init__(self, backend: Any):
+        """
+        Inicializar caché
+
+        Args:
+            backend: TTLCache o RedisCache
+        """
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        system_instruction: Optional[str],
+    ) -> str:
+        """Clave determinista a partir del prompt normalizado y la configuración del modelo"""
+        payload = json.dumps(
+            [normalize_prompt(prompt), model, temperature, max_tokens, system_instruction or ""],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Obtener respuesta cacheada actualizando los contadores"""
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """Guardar respuesta"""
+        self.backend.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos y fallos"""
+        total = self.hits + self.misses
+        stats = {
+            "backend": "redis" if isinstance(self.backend, RedisCache) else "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+        if isinstance(self.backend, TTLCache):
+            stats["entries"] = len(self.backend)
+        return stats
+
+
+# Palabras vacías del español que no cambian el tema de una pregunta. Los
+# interrogativos (qué, cómo, cuál...) se conservan en la clave exacta del paquete FAQ.
+SEMANTIC_STOPWORDS = frozenset(
+    "el la los las lo un una unos unas de del al a en y o e u es son ser esta estan se "
+    "me mi mis te tu tus le les su sus nos por para con sin sobre entre "
+    "favor puedes podrias dime explica explicame hola oye".split()
+)
+# Interrogativos y muletillas: cambian la forma de la pregunta, no lo que se pregunta
+# ("qué es kubernetes" = "explícame kubernetes" = "para qué sirve kubernetes")
+QUESTION_FILLERS = frozenset("que como cual cuales sirve significa eso exactamente".split())
+# Negaciones: invierten la pregunta aunque el resto coincida
+QUESTION_NEGATIONS = frozenset("no nunca jamas ni sin tampoco".split())
+# Prefijos que forman antónimos ("habilito"/"deshabilito", "activo"/"inactivo")
+ANTONYM_PREFIXES = ("des", "in", "im", "anti")
+# Similitud mínima entre dos palabras para tratarlas como variantes (errores de ASR, conjugaciones)
+SPELLING_SIMILARITY = 0.8
+# Proporción mínima de palabras compartidas cuando una pregunta añade palabras a la otra
+QUESTION_MIN_OVERLAP = 0.75
+# Candidatos por similitud que se comprueban palabra a palabra
+QUESTION_CANDIDATES = 8
+# Base del hash polinómico de trigramas de caracteres
+_NGRAM_BASE = np.uint64(1_000_003)
+
+
+def _question_tokens(text: str) -> List[str]:
+    """Palabras sin mayúsculas, tildes ni puntuación"""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def normalize_question(text: str) -> List[str]:
+    """Palabras de una pregunta sin mayúsculas, tildes, puntuación ni palabras vacías"""
+    words = _question_tokens(text)
+    return [w for w in words if w not in SEMANTIC_STOPWORDS] or words
+
+
+def _content_words(text: str) -> List[str]:
+    """Palabras que definen lo que se pregunta (sin palabras vacías ni muletillas)"""
+    words = normalize_question(text)
+    return [w for w in words if w not in QUESTION_FILLERS] or words
+
+
+@dataclass(frozen=True)
+class QuestionSignature:
+    """Lo que debe coincidir entre dos preguntas además de la similitud de sus vectores"""
+    words: FrozenSet[str]
+    numbers: FrozenSet[str]
+    negated: bool
+
+
+def question_signature(text: str) -> QuestionSignature:
+    """Palabras de contenido (sin plural final), números y negación de una pregunta"""
+    words = _content_words(text)
+    return QuestionSignature(
+        words=frozenset(w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words if not w.isdigit()),
+        numbers=frozenset(w for w in words if w.isdigit()),
+        negated=not QUESTION_NEGATIONS.isdisjoint(_question_tokens(text)),
+    )
+
+
+def _spelling_variant(a: str, b: str) -> bool:
+    """Dos palabras son la misma escrita distinto (y no antónimos por prefijo)"""
+    if any(a == prefix + b or b == prefix + a for prefix in ANTONYM_PREFIXES):
+        return False
+    return min(len(a), len(b)) >= 4 and SequenceMatcher(None, a, b).ratio() >= SPELLING_SIMILARITY
+
+
+def same_question(a: QuestionSignature, b: QuestionSignature) -> bool:
+    """
+    Decidir si dos preguntas con vectores parecidos piden lo mismo
+
+    Los números y la negación deben coincidir. Las palabras que solo están en
+    una de las dos se emparejan con variantes ortográficas de la otra; si
+    queda una palabra sustituida por otra ("leer"/"escribir",
+    "habilito"/"deshabilito") son preguntas distintas. Si una solo añade
+    palabras, deben compartir al menos QUESTION_MIN_OVERLAP de ellas.
+    """
+    if a.numbers != b.numbers or a.negated != b.negated:
+        return False
+    only_a, only_b = set(a.words - b.words), set(b.words - a.words)
+    for word in list(only_a):
+        variant = next((other for other in only_b if _spelling_variant(word, other)), None)
+        if variant is not None:
+            only_a.discard(word)
+            only_b.discard(variant)
+    if only_a and only_b:
+        return False
+    shared = len(a.words | b.words) - len(a.words ^ b.words)
+    unmatched = len(only_a) + len(only_b)
+    return shared / (shared + unmatched) >= QUESTION_MIN_OVERLAP if shared + unmatched else True
+
+
+def match_question(
+    similarity: np.ndarray,
+    signatures: Sequence[Optional[QuestionSignature]],
+    signature: QuestionSignature,
+    threshold: float,
+) -> int:
+    """
+    Fila de la pregunta equivalente más similar
+
+    Args:
+        similarity: Similitud coseno con cada fila (-1 para las no válidas)
+        signatures: Firma de la pregunta de cada fila
+        signature: Firma de la pregunta buscada
+        threshold: Similitud mínima de un candidato
+
+    Returns:
+        Índice de la fila o -1 si ninguna es la misma pregunta
+    """
+    candidates = np.flatnonzero(similarity >= threshold)
+    if len(candidates) > QUESTION_CANDIDATES:
+        candidates = candidates[np.argpartition(-similarity[candidates], QUESTION_CANDIDATES)[:QUESTION_CANDIDATES]]
+    for row in candidates[np.argsort(-similarity[candidates], kind="stable")]:
+        if signatures[row] is not None and same_question(signatures[row], signature):
+            return int(row)
+    return -1
+
+
+def question_vector(text: str, dimensions: int) -> Optional[np.ndarray]:
+    """
+    Vector L2-normalizado de trigramas de caracteres y palabras de contenido (hashing trick)
+
+    Returns:
+        Vector float32 o None si el texto no tiene palabras
+    """
+    words = _content_words(text)
+    if not words:
+        return None
+    padded = f" {' '.join(words)} "
+    codes = np.frombuffer(padded.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    grams = (codes[:-2] * _NGRAM_BASE + codes[1:-1]) * _NGRAM_BASE + codes[2:]
+    buckets = np.concatenate([
+        (grams % np.uint64(dimensions)).astype(np.int64),
+        np.array([zlib.crc32(w.encode("utf-8")) % dimensions for w in words], dtype=np.int64),
+    ])
+    vector = np.bincount(buckets, minlength=dimensions).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector
+
+
+class SemanticAnswerCache:
+    """
+    Caché de respuestas por similitud de la pregunta
+
+    Los vectores se guardan como filas de una matriz que crece por duplicación
+    hasta `max_entries`; la búsqueda es un único producto matriz-vector. Al
+    llenarse se reemplaza la fila usada hace más tiempo. Los vectores solo
+    proponen candidatos: un acierto exige además que sea la misma pregunta
+    (ver same_question).
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: int,
+        threshold: float,
+        dimensions: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Inicializar caché
+
+        Args:
+            max_entries: Preguntas máximas almacenadas
+            ttl: Segundos de vida de cada respuesta
+            threshold: Similitud coseno mínima de un candidato
+            dimensions: Dimensiones del vector de hashing
+            clock: Reloj monotónico (inyectable en tests)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self._clock = clock
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self._expires = np.zeros(0, dtype=np.float64)
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._answers: List[Optional[str]] = []
+        self._signatures: List[Optional[QuestionSignature]] = []
+        self._size = 0
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _grow(self) -> None:
+        capacity = min(self.max_entries, max(16, 2 * len(self._answers)))
+        extra = capacity - len(self._answers)
+        self._vectors = np.vstack([self._vectors, np.zeros((extra, self.dimensions), dtype=np.float32)])
+        self._expires = np.concatenate([self._expires, np.zeros(extra)])
+        self._last_used = np.concatenate([self._last_used, np.zeros(extra, dtype=np.int64)])
+        self._answers.extend([None] * extra)
+        self._signatures.extend([None] * extra)
+
+    def _match(self, vector: np.ndarray, signature: QuestionSignature) -> int:
+        """Fila vigente de la misma pregunta más similar (-1 si no hay)"""
+        if not self._size:
+            return -1
+        similarity = self._vectors[:self._size] @ vector
+        similarity[self._expires[:self._size] <= self._clock()] = -1.0
+        return match_question(similarity, self._signatures, signature, self.threshold)
+
+    def get(self, question: str) -> Optional[str]:
+        """Obtener la respuesta de la pregunta almacenada equivalente más parecida"""
+        vector = question_vector(question, self.dimensions)
+        with self._lock:
+            row = self._match(vector, question_signature(question)) if vector is not None else -1
+            if row < 0:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._tick += 1
+            self._last_used[row] = self._tick
+            return self._answers[row]
+
+    def set(self, question: str, answer: str) -> None:
+        """Guardar respuesta; una pregunta equivalente ya almacenada se sobrescribe"""
+        vector = question_vector(question, self.dimensions)
+        if vector is None:
+            return
+        signature = question_signature(question)
+        with self._lock:
+            row = self._match(vector, signature)
+            if row < 0:
+                if self._size < self.max_entries:
+                    if self._size == len(self._answers):
+                        self._grow()
+                    row = self._size
+                    self._size += 1
+                else:
+                    # Expulsar la pregunta expirada o usada hace más tiempo
+                    last_used = np.where(self._expires <= self._clock(), -1, self._last_used)
+                    row = int(np.argmin(last_used))
+            self._tick += 1
+            self._vectors[row] = vector
+            self._expires[row] = self._clock() + self.ttl
+            self._last_used[row] = self._tick
+            self._answers[row] = answer
+            self._signatures[row] = signature
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos y ocupación"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": self._size,
+            "threshold": self.threshold,
+        }
+
+
+class AudioCache:
+    """Caché de audio sintetizado en dos niveles (memoria y disco) con expulsión LRU por tamaño"""
+
+    def __init__(self, memory_bytes: int, disk_bytes: int, directory: Optional[str] = None):
+        """
+        Inicializar caché
+
+        Args:
+            memory_bytes: Tamaño máximo del nivel en memoria
+            disk_bytes: Tamaño máximo del nivel en disco (0 lo deshabilita)
+            directory: Directorio de los blobs en disco
+        """
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes if directory else 0
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        # Claves cuyo audio ya está archivado en Storage
+        self._archived = TTLCache(max_entries=100_000, ttl=7 * 24 * 3600)
+        self._lock = threading.Lock()
+        if self.disk_bytes:
+            os.makedirs(directory, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(text: str, language_code: str, voice_name: str, audio_config: Dict[str, Any]) -> str:
+        """Hash del texto, la voz y la configuración de audio"""
+        payload = json.dumps(
+            [text, language_code, voice_name, audio_config],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _load_disk_index(self) -> None:
+        """Reconstruir el índice LRU del disco ordenando los blobs por último acceso"""
+        blobs = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".mp3"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            blobs.append((stat.st_atime, name[:-4], stat.st_size))
+        for _, key, size in sorted(blobs):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as blob:
+                    return blob[:]
+        except (FileNotFoundError, ValueError):
+            # Blob borrado externamente o vacío
+            size = self._disk.pop(key, 0)
+            self._disk_size -= size
+            return None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Obtener audio cacheado (promociona al nivel en memoria los aciertos en disco)"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            elif key in self._disk:
+                data = self._read_disk(key)
+                if data is not None:
+                    self._disk.move_to_end(key)
+                    self._put_memory(key, data)
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return data
+
+    def set(self, key: str, data: bytes) -> None:
+        """Guardar audio en ambos niveles"""
+        with self._lock:
+            self._put_memory(key, data)
+            if not self.disk_bytes or key in self._disk or len(data) > self.disk_bytes:
+                return
+            tmp_path = f"{self._path(key)}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                logger.warning(f"⚠️ No se pudo escribir audio en caché de disco: {str(e)}")
+                return
+            self._disk[key] = len(data)
+            self._disk_size += len(data)
+            self._evict_disk()
+
+    def is_archived(self, key: str) -> bool:
+        """Indica si el audio de la clave ya se subió a Storage"""
+        return self._archived.get(key) is not None
+
+    def mark_archived(self, key: str) -> None:
+        """Registrar que el audio de la clave ya está en Storage"""
+        self._archived.set(key, True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos y ocupación por nivel"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_size,
+        }
+
+
+# Instancia global de la caché
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Obtener caché de respuestas IA (patrón Singleton)"""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                backend = None
+                if settings.redis_url:
+                    try:
+                        backend = RedisCache(settings.redis_url, settings.cache_ttl, prefix="llm:")
+                        logger.info("✅ Caché IA en Redis")
+                    except ImportError:
+                        logger.warning("⚠️ Paquete redis no instalado; usando caché en memoria")
+                if backend is None:
+                    backend = TTLCache(settings.llm_cache_max_entries, settings.cache_ttl)
+                _llm_cache = LLMResponseCache(backend)
+    return _llm_cache
+
+
+# Instancia global de la caché semántica
+_semantic_cache: Optional[SemanticAnswerCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticAnswerCache:
+    """Obtener caché semántica de respuestas de voz (patrón Singleton)"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticAnswerCache(
+                    settings.semantic_cache_max_entries,
+                    settings.cache_ttl,
+                    settings.semantic_cache_threshold,
+                    settings.semantic_cache_dimensions,
+                )
+    return _semantic_cache
+
+
+# Instancia global de la caché de audio
+_audio_cache: Optional[AudioCache] = None
+_audio_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    """Obtener caché de audio sintetizado (patrón Singleton)"""
+    global _audio_cache
+    if _audio_cache is None:
+        with _audio_cache_lock:
+            if _audio_cache is None:
+                _audio_cache = AudioCache(
+                    settings.tts_cache_memory_bytes,
+                    settings.tts_cache_disk_bytes,
+                    settings.tts_cache_dir or None,
+                )
+    return _audio_cache
@@ -0,0 +1,277 @@
+"""
+Reporte de cumplimiento a escala de flota
+
+Evalúa inventarios de recursos tipados (lista JSON o stream NDJSON) por
+bloques, en paralelo con un pool de procesos cuando el inventario es grande,
+y emite un registro por recurso más agregados parciales y un resumen final.
+La memoria queda acotada por el tamaño de bloque y los bloques en vuelo.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from src.config import settings
+from src.services.governance_incremental import IncrementalGovernanceAnalyzer, get_incremental_analyzer
+from src.services.governance_service import GovernanceService, RISK_LEVEL_ORDER
+from src.services.iam_index import IAMPolicyIndex, get_iam_index_registry
+
+logger = logging.getLogger(__name__)
+
+# Resultado de un bloque: registros cacheados, registros evaluados y huellas de los evaluados
+ChunkOutcome = Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[int, Tuple]]
+
+
+def evaluate_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Evaluar un bloque de recursos tipados (función de nivel superior para el pool de procesos)
+
+    Cada recurso es {"resource_type", "resource_data", "resource_id"?, "index"}.
+
+    Returns:
+        Un registro `result` o `error` por recurso, en el mismo orden
+    """
+    records = []
+    for resource in chunk:
+        index = resource.get("index")
+        resource_id = resource.get("resource_id")
+        try:
+            resource_type = str(resource["resource_type"]).lower()
+            analysis = GovernanceService.analyze(resource_type, resource.get("resource_data") or {})
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            records.append({"type": "error", "index": index, "resource_id": resource_id, "detail": str(e)})
+            continue
+        records.append({"type": "result", "index": index, "resource_id": resource_id, **analysis})
+    return records
+
+
+def evaluate_chunk_with_indexes(chunk: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[IAMPolicyIndex]]:
+    """
+    Evaluar un bloque en el pool de procesos devolviendo también sus índices IAM
+
+    Los índices se construyen en el registro del proceso hijo; el padre debe
+    registrarlos para resolver los IDs de principales de los hallazgos.
+
+    Returns:
+        Registros del bloque (ver evaluate_chunk) e índices que referencian
+    """
+    records = evaluate_chunk(chunk)
+    registry = get_iam_index_registry()
+    indexes: Dict[str, IAMPolicyIndex] = {}
+    for record in records:
+        index_id = (record.get("iam_index") or {}).get("index_id")
+        if index_id is not None and index_id not in indexes:
+            index = registry.get(index_id)
+            if index is not None:
+                indexes[index_id] = index
+    return records, list(indexes.values())
+
+
+class ComplianceAggregator:
+    """Agregados acumulados del reporte"""
+
+    def __init__(self):
+        self.analyzed = 0
+        self.errors = 0
+        self.total_score = 0
+        self.worst_rank = -1
+        self.by_resource_type: Dict[str, int] = {}
+        self.by_risk_level: Dict[str, int] = {level.value: 0 for level in RISK_LEVEL_ORDER}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Incorporar un registro al agregado"""
+        if record["type"] == "error":
+            self.errors += 1
+            return
+        self.analyzed += 1
+        self.total_score += record["compliance_score"]
+        resource_type = record["resource_type"]
+        self.by_resource_type[resource_type] = self.by_resource_type.get(resource_type, 0) + 1
+        risk_level = record["risk_level"]
+        self.by_risk_level[risk_level] += 1
+        self.worst_rank = max(self.worst_rank, RISK_LEVEL_ORDER.index(risk_level))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Agregados actuales"""
+        return {
+            "total_resources": self.analyzed,
+            "errors": self.errors,
+            "overall_compliance_score": int(self.total_score / self.analyzed) if self.analyzed else 0,
+            "overall_risk_level": RISK_LEVEL_ORDER[max(self.worst_rank, 0)].value,
+            "by_risk_level": dict(self.by_risk_level),
+            "by_resource_type": dict(self.by_resource_type),
+        }
+
+
+async def iter_ndjson(byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Parsear un stream de bytes NDJSON línea a línea
+
+    Las líneas inválidas se entregan como {"_parse_error": detalle}.
+    """
+    buffer = b""
+    async for data in byte_chunks:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line: bytes) -> Dict[str, Any]:
+    try:
+        resource = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"_parse_error": f"JSON inválido: {e.msg}"}
+    if not isinstance(resource, dict):
+        return {"_parse_error": "Cada línea debe ser un objeto JSON"}
+    return resource
+
+
+async def stream_compliance_report(
+    resources: AsyncIterator[Dict[str, Any]],
+    chunk_size: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    parallel_threshold: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    analyzer: Optional[IncrementalGovernanceAnalyzer] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Evaluar un inventario y emitir registros a medida que se completan los bloques
+
+    Args:
+        resources: Recursos tipados en orden
+        chunk_size: Recursos por bloque
+        executor: Pool donde evaluar los bloques (por defecto el pool de procesos global)
+        parallel_threshold: Recursos a partir de los cuales se usa el pool
+        max_in_flight: Bloques evaluándose simultáneamente
+        analyzer: Caché incremental (por defecto la global si está habilitada);
+            solo se evalúan los recursos cuya huella cambió
+
+    Yields:
+        Registros `result`/`error` por recurso, `aggregate` tras cada bloque y `summary` al final
+    """
+    chunk_size = chunk_size or settings.governance_chunk_size
+    parallel_threshold = settings.governance_parallel_threshold if parallel_threshold is None else parallel_threshold
+    max_in_flight = max_in_flight or settings.governance_workers * 2
+    if analyzer is None and settings.governance_incremental_enabled:
+        analyzer = get_incremental_analyzer()
+    loop = asyncio.get_running_loop()
+    aggregator = ComplianceAggregator()
+    # Por bloque: evaluación en curso y errores de parseo del bloque
+    pending: Deque[Tuple["asyncio.Future[ChunkOutcome]", List[Dict[str, Any]]]] = deque()
+    seen = 0
+
+    def lookup(chunk: List[Dict[str, Any]]) -> ChunkOutcome:
+        """Separar los recursos cacheados de los que hay que evaluar (calcula huellas: fuera del event loop)"""
+        cached: List[Dict[str, Any]] = []
+        misses: List[Dict[str, Any]] = []
+        fingerprints: Dict[int, Tuple] = {}
+        for resource in chunk:
+            resource_type = str(resource.get("resource_type", "")).lower()
+            resource_id = resource.get("resource_id")
+            fingerprint, analysis = analyzer.cached(resource_type, resource.get("resource_data") or {}, resource_id)
+            if analysis is None:
+                fingerprints[resource["index"]] = (resource_type, fingerprint, resource_id)
+                misses.append(resource)
+            else:
+                cached.append({"type": "result", "index": resource["index"], "resource_id": resource_id, **analysis})
+        return cached, misses, fingerprints
+
+    def evaluate_in_thread(chunk: List[Dict[str, Any]]) -> ChunkOutcome:
+        cached, misses, fingerprints = lookup(chunk) if analyzer is not None else ([], chunk, {})
+        return cached, evaluate_chunk(misses) if misses else [], fingerprints
+
+    async def evaluate_pooled(chunk: List[Dict[str, Any]]) -> ChunkOutcome:
+        cached, misses, fingerprints = (
+            await loop.run_in_executor(None, lookup, chunk) if analyzer is not None else ([], chunk, {})
+        )
+        if not misses:
+            return cached, [], fingerprints
+        records, indexes = await loop.run_in_executor(
+            executor or get_process_pool(), evaluate_chunk_with_indexes, misses
+        )
+        registry = get_iam_index_registry()
+        for index in indexes:
+            registry.add(index)
+        return cached, records, fingerprints
+
+    def submit(chunk: List[Dict[str, Any]], errors: List[Dict[str, Any]]) -> None:
+        if seen > parallel_threshold:
+            future = asyncio.ensure_future(evaluate_pooled(chunk))
+        else:
+            # Informes pequeños: en el pool de hilos para no bloquear el event loop
+            future = loop.run_in_executor(None, evaluate_in_thread, chunk)
+        pending.append((future, errors))
+
+    async def flush(limit: int) -> AsyncIterator[Dict[str, Any]]:
+        while len(pending) > limit:
+            future, errors = pending.popleft()
+            cached, evaluated, fingerprints = await future
+            for record in evaluated:
+                if record["type"] == "result" and record["index"] in fingerprints:
+                    resource_type, fingerprint, resource_id = fingerprints[record["index"]]
+                    analysis = {k: v for k, v in record.items() if k not in ("type", "index", "resource_id")}
+                    analyzer.record(resource_type, fingerprint, analysis, resource_id)
+            records = evaluated
+            if cached or errors:
+                records = sorted(errors + cached + evaluated, key=lambda r: r["index"])
+            for record in records:
+                aggregator.add(record)
+                yield record
+            yield {"type": "aggregate", **aggregator.snapshot()}
+
+    # Las líneas inválidas viajan con su bloque para emitirse en orden de índice
+    chunk: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    async for resource in resources:
+        if "_parse_error" in resource:
+            errors.append({"type": "error", "index": seen, "resource_id": None, "detail": resource["_parse_error"]})
+        else:
+            chunk.append({**resource, "index": seen})
+        seen += 1
+        if len(chunk) + len(errors) >= chunk_size:
+            submit(chunk, errors)
+            chunk, errors = [], []
+            async for record in flush(max_in_flight - 1):
+                yield record
+    if chunk or errors:
+        submit(chunk, errors)
+    async for record in flush(0):
+        yield record
+
+    yield {"type": "summary", **aggregator.snapshot()}
+
+
+# Pool de procesos global
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Obtener pool de procesos para evaluación de gobernanza (patrón Singleton)"""
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                # spawn: hacer fork de un proceso con hilos de gRPC activos no es seguro
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=settings.governance_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Detener el pool de procesos"""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,177 @@
+"""
+Análisis de gobernanza de Compute Engine por columnas
+
+Las flotas de instancias se convierten en columnas booleanas de NumPy y cada
+regla se evalúa sobre la columna completa de una vez. El resultado incluye
+los hallazgos de cada instancia no conforme y agregados de toda la flota.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.services.governance_rules import SEVERITY_RANK
+
+# Penalización por hallazgo en la puntuación de cada instancia
+COMPUTE_SCORE_PENALTY = 10
+
+# Entornos considerados de desarrollo para la regla de instancias preemptibles
+DEV_ENVIRONMENTS = frozenset({"dev", "development", "desarrollo", "test", "sandbox"})
+
+# Cada regla se cumple cuando su columna es verdadera
+COMPUTE_RULES: List[Dict[str, str]] = [
+    {
+        "id": "compute.managed_images",
+        "column": "managed_image",
+        "severity": "medium",
+        "issue": "Imagen no administrada",
+        "recommendation": "Usar imágenes administradas o familias de imágenes aprobadas",
+    },
+    {
+        "id": "compute.monitoring",
+        "column": "monitoring",
+        "severity": "high",
+        "issue": "Monitoreo no habilitado",
+        "recommendation": "Instalar el agente de operaciones y habilitar Cloud Monitoring",
+    },
+    {
+        "id": "compute.labels",
+        "column": "labeled",
+        "severity": "low",
+        "issue": "Instancia sin etiquetas",
+        "recommendation": "Etiquetar instancias con entorno, equipo y centro de costos",
+    },
+    {
+        "id": "compute.preemptible_dev",
+        "column": "preemptible_ok",
+        "severity": "low",
+        "issue": "Instancia de desarrollo no preemptible",
+        "recommendation": "Usar instancias preemptibles o Spot en entornos de desarrollo",
+    },
+    {
+        "id": "compute.startup_shutdown_scripts",
+        "column": "scripts",
+        "severity": "low",
+        "issue": "Scripts de inicio/apagado no configurados",
+        "recommendation": "Configurar startup-script y shutdown-script en los metadatos",
+    },
+]
+
+RULE_IDS = [rule["id"] for rule in COMPUTE_RULES]
+RULE_SEVERITY_RANKS = np.array([SEVERITY_RANK[rule["severity"]] for rule in COMPUTE_RULES], dtype=np.int8)
+RULE_BITS = 1 << np.arange(len(COMPUTE_RULES), dtype=np.int32)
+
+# Reglas incumplidas para cada combinación posible de bits
+RULE_IDS_BY_MASK = [
+    [rule_id for r, rule_id in enumerate(RULE_IDS) if mask & (1 << r)]
+    for mask in range(1 << len(COMPUTE_RULES))
+]
+
+
+def _environment(instance: Dict[str, Any]) -> str:
+    environment = instance.get("environment") or (instance.get("labels") or {}).get("env") or ""
+    return str(environment).lower()
+
+
+def build_columns(instances: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Convertir la lista de instancias en columnas booleanas
+
+    Campos leídos por instancia: managed_image, monitoring_enabled, labels,
+    environment (o labels.env), preemptible, startup_script y shutdown_script.
+
+    Returns:
+        Columna de cumplimiento por regla, todas de longitud len(instances)
+    """
+    count = len(instances)
+
+    def column(values: Iterable[Any]) -> np.ndarray:
+        return np.fromiter(values, dtype=bool, count=count)
+
+    preemptible = column(bool(i.get("preemptible")) for i in instances)
+    is_dev = column(_environment(i) in DEV_ENVIRONMENTS for i in instances)
+    startup = column(bool(i.get("startup_script")) for i in instances)
+    shutdown = column(bool(i.get("shutdown_script")) for i in instances)
+    return {
+        "managed_image": column(bool(i.get("managed_image")) for i in instances),
+        "monitoring": column(bool(i.get("monitoring_enabled")) for i in instances),
+        "labeled": column(bool(i.get("labels")) for i in instances),
+        "preemptible_ok": ~is_dev | preemptible,
+        "scripts": startup & shutdown,
+    }
+
+
+def analyze_compute_fleet(
+    instances: List[Dict[str, Any]],
+    risk_levels: List[Any],
+    columns: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, Any]:
+    """
+    Analizar una flota de instancias de Compute Engine
+
+    Args:
+        instances: Datos de cada instancia
+        risk_levels: Niveles de riesgo ordenados por rango de severidad
+        columns: Columnas ya construidas (por defecto se derivan de `instances`)
+
+    Returns:
+        Análisis con hallazgos por regla para la flota, hallazgos por
+        instancia no conforme y agregados de la flota
+    """
+    columns = columns if columns is not None else build_columns(instances)
+    count = len(instances)
+
+    # violations[r, i] es verdadero si la instancia i incumple la regla r
+    violations = np.empty((len(COMPUTE_RULES), count), dtype=bool)
+    for r, rule in enumerate(COMPUTE_RULES):
+        np.logical_not(columns[rule["column"]], out=violations[r])
+
+    violations_per_rule = violations.sum(axis=1)
+    findings_per_instance = violations.sum(axis=0)
+    worst_per_instance = (violations * RULE_SEVERITY_RANKS[:, None]).max(axis=0, initial=0)
+    scores = np.maximum(0, 100 - findings_per_instance * COMPUTE_SCORE_PENALTY)
+
+    findings = [
+        {
+            "rule": rule["id"],
+            "severity": rule["severity"],
+            "issue": rule["issue"],
+            "recommendation": rule["recommendation"],
+            "count": int(violations_per_rule[r]),
+        }
+        for r, rule in enumerate(COMPUTE_RULES)
+        if violations_per_rule[r]
+    ]
+
+    # Una máscara de bits por instancia evita recorrer la matriz instancia a instancia
+    non_compliant = np.flatnonzero(findings_per_instance)
+    masks = RULE_BITS @ violations[:, non_compliant]
+    instance_findings = [
+        {
+            "instance": instances[i].get("name", i),
+            "risk_level": risk_levels[worst],
+            "compliance_score": score,
+            "findings": RULE_IDS_BY_MASK[mask],
+        }
+        for i, worst, score, mask in zip(
+            non_compliant.tolist(),
+            worst_per_instance[non_compliant].tolist(),
+            scores[non_compliant].tolist(),
+            masks.tolist(),
+        )
+    ]
+
+    risk_counts = np.bincount(worst_per_instance, minlength=len(risk_levels))
+    worst = int(worst_per_instance.max(initial=0))
+    return {
+        "resource_type": "compute",
+        "risk_level": risk_levels[worst],
+        "findings": findings,
+        "compliance_score": int(scores.mean()) if count else 100,
+        "instances": instance_findings,
+        "fleet": {
+            "total_instances": count,
+            "compliant_instances": count - len(non_compliant),
+            "violations_by_rule": {RULE_IDS[r]: int(n) for r, n in enumerate(violations_per_rule)},
+            "by_risk_level": {level.value: int(n) for level, n in zip(risk_levels, risk_counts)},
+        },
+    }
@@ -0,0 +1,398 @@
+"""
+Paquete precalculado de respuestas frecuentes (texto + audio)
+
+Las preguntas más habituales se responden sin llamar a Gemini ni a
+Text-to-Speech: un paso de construcción offline genera la respuesta y su MP3
+para una lista curada de preguntas y los guarda en un único archivo. El
+servidor lo mapea en memoria al arrancar y un hilo en segundo plano lo
+reemplaza en caliente cuando el archivo cambia.
+
+Formato del archivo:
+    MAGIC (8 bytes) | longitud del índice (uint32 LE) | índice JSON | blobs MP3
+
+El índice contiene los metadatos de construcción y, por entrada, la pregunta,
+la respuesta y el desplazamiento/longitud de su audio dentro de los blobs.
+
+Uso:
+    python -m src.services.faq_pack build data/faq_questions.txt --output data/faq.pack [--language es-ES]
+    python -m src.services.faq_pack inspect data/faq.pack
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.services.cache_service import match_question, normalize_question, question_signature, question_vector
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FAQPACK1"
+HEADER = struct.Struct("<8sI")
+FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class FAQAnswer:
+    """Respuesta precalculada"""
+    question: str
+    answer: str
+    audio: bytes
+
+
+def question_key(question: str) -> str:
+    """Clave exacta de una pregunta normalizada"""
+    return " ".join(normalize_question(question))
+
+
+def write_pack(path: str, entries: Iterable[Tuple[str, str, bytes]], metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Escribir un paquete de forma atómica (archivo temporal + rename)
+
+    Args:
+        path: Ruta de destino
+        entries: (pregunta, respuesta, audio MP3)
+        metadata: Metadatos de construcción (idioma, voz, modelo...)
+
+    Returns:
+        Índice escrito
+    """
+    index_entries = []
+    blobs = []
+    offset = 0
+    for question, answer, audio in entries:
+        index_entries.append({"question": question, "answer": answer, "offset": offset, "length": len(audio)})
+        blobs.append(audio)
+        offset += len(audio)
+
+    index = {
+        "version": FORMAT_VERSION,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        **(metadata or {}),
+        "entries": index_entries,
+    }
+    payload = json.dumps(index, ensure_ascii=False).encode("utf-8")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(payload)))
+        f.write(payload)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+    return index
+
+
+class FAQPack:
+    """Paquete cargado: índice en memoria y audio mapeado desde el archivo"""
+
+    def __init__(self, path: str, dimensions: int = 4096):
+        """
+        Abrir paquete
+
+        Args:
+            path: Ruta del archivo
+            dimensions: Dimensiones de los vectores de las preguntas
+
+        Raises:
+            ValueError: Si el archivo no es un paquete válido
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if stat.st_size < HEADER.size:
+                raise ValueError(f"Paquete FAQ truncado: {path}")
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, index_length = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Archivo no es un paquete FAQ: {path}")
+        self._blobs_start = HEADER.size + index_length
+        index = json.loads(self._data[HEADER.size:self._blobs_start].decode("utf-8"))
+        self.entries: List[Dict[str, Any]] = index.pop("entries")
+        self.metadata = index
+        if self._blobs_start + sum(e["length"] for e in self.entries) > len(self._data):
+            raise ValueError(f"Paquete FAQ truncado: {path}")
+
+        self.dimensions = dimensions
+        self._by_key = {question_key(e["question"]): i for i, e in enumerate(self.entries)}
+        self._signatures = [question_signature(e["question"]) for e in self.entries]
+        self._vectors = np.zeros((len(self.entries), dimensions), dtype=np.float32)
+        for i, entry in enumerate(self.entries):
+            vector = question_vector(entry["question"], dimensions)
+            if vector is not None:
+                self._vectors[i] = vector
+
+    @property
+    def language_code(self) -> Optional[str]:
+        return self.metadata.get("language_code")
+
+    def answer(self, i: int) -> FAQAnswer:
+        """Respuesta y audio de una entrada"""
+        entry = self.entries[i]
+        start = self._blobs_start + entry["offset"]
+        return FAQAnswer(entry["question"], entry["answer"], self._data[start:start + entry["length"]])
+
+    def lookup(self, question: str, threshold: float) -> Optional[FAQAnswer]:
+        """
+        Buscar la respuesta de una pregunta
+
+        Primero por clave exacta normalizada y, si no, por la pregunta más
+        similar del paquete con similitud coseno >= `threshold` que sea la
+        misma pregunta (ver same_question).
+        """
+        i = self._by_key.get(question_key(question))
+        if i is None and len(self.entries):
+            vector = question_vector(question, self.dimensions)
+            if vector is None:
+                return None
+            i = match_question(self._vectors @ vector, self._signatures, question_signature(question), threshold)
+            if i < 0:
+                return None
+        return None if i is None else self.answer(i)
+
+    def summary(self) -> Dict[str, Any]:
+        """Metadatos y tamaño del paquete"""
+        return {
+            "path": self.path,
+            "entries": len(self.entries),
+            "bytes": len(self._data),
+            **self.metadata,
+        }
+
+
+class FAQPackStore:
+    """
+    Paquete FAQ vigente con reemplazo en caliente
+
+    Un hilo en segundo plano revisa el archivo cada `check_interval`
+    segundos; si cambió (el build lo reemplaza de forma atómica) carga el
+    nuevo paquete y lo publica con una sola asignación. El anterior se libera
+    cuando ninguna petición lo está usando. Las búsquedas solo leen el
+    paquete ya cargado: nunca tocan el disco desde el event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threshold: float,
+        check_interval: float = 30.0,
+        dimensions: int = 4096,
+    ):
+        """
+        Inicializar almacén
+
+        Args:
+            path: Ruta del paquete (vacía deshabilita las respuestas precalculadas)
+            threshold: Similitud mínima para responder con una pregunta parecida
+            check_interval: Segundos entre comprobaciones del archivo
+            dimensions: Dimensiones de los vectores de las preguntas
+        """
+        self.path = path
+        self.threshold = threshold
+        self.check_interval = check_interval
+        self.dimensions = dimensions
+        self._pack: Optional[FAQPack] = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> Optional[FAQPack]:
+        """Cargar el paquete si el archivo cambió (se conserva el anterior si el nuevo es inválido)"""
+        if not self.path:
+            return None
+        with self._lock:
+            signature = self._signature()
+            current = self._pack
+            if signature is None:
+                if current is not None:
+                    logger.warning(f"⚠️ Paquete FAQ no encontrado, se mantiene el cargado: {self.path}")
+                return current
+            if current is not None and current.signature == signature:
+                return current
+            try:
+                pack = FAQPack(self.path, self.dimensions)
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ Paquete FAQ inválido: {str(e)}")
+                return current
+            self._pack = pack
+            logger.info(f"✅ Paquete FAQ cargado: {len(pack.entries)} respuestas ({self.path})")
+            return pack
+
+    def start(self) -> None:
+        """Arrancar el hilo que revisa el archivo periódicamente"""
+        if not self.path or self.check_interval <= 0:
+            return
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="faq-pack-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self) -> None:
+        """Detener el hilo de revisión"""
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+        self._stop.set()
+        if watcher is not None:
+            watcher.join()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"❌ Error al revisar el paquete FAQ: {str(e)}")
+
+    def lookup(self, question: str, language_code: str) -> Optional[FAQAnswer]:
+        """Respuesta precalculada para la pregunta en el idioma del paquete (solo memoria)"""
+        pack = self._pack
+        if pack is None:
+            return None
+        answer = None
+        if pack.language_code in (None, language_code):
+            answer = pack.lookup(question, self.threshold)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos y paquete cargado"""
+        total = self.hits + self.misses
+        pack = self._pack
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "pack": pack.summary() if pack is not None else None,
+        }
+
+
+# Instancia global del almacén
+_faq_pack_store: Optional[FAQPackStore] = None
+_faq_pack_store_lock = threading.Lock()
+
+
+def get_faq_pack_store() -> FAQPackStore:
+    """Obtener almacén del paquete FAQ (patrón Singleton)"""
+    global _faq_pack_store
+    if _faq_pack_store is None:
+        with _faq_pack_store_lock:
+            if _faq_pack_store is None:
+                _faq_pack_store = FAQPackStore(
+                    settings.faq_pack_path,
+                    settings.faq_pack_threshold,
+                    settings.faq_pack_check_interval,
+                    settings.semantic_cache_dimensions,
+                )
+    return _faq_pack_store
+
+
+def read_questions(path: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Leer la lista curada de preguntas
+
+    Una pregunta por línea; `pregunta | respuesta` fija una respuesta curada
+    en lugar de generarla. Las líneas vacías y las que empiezan con # se
+    ignoran, igual que las preguntas repetidas tras normalizar.
+    """
+    questions = []
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            question, _, answer = (part.strip() for part in line.partition("|"))
+            key = question_key(question)
+            if key in seen:
+                continue
+            seen.add(key)
+            questions.append((question, answer or None))
+    return questions
+
+
+def build_pack(
+    questions: Iterable[Tuple[str, Optional[str]]],
+    output: str,
+    language_code: str = "es-ES",
+    service: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """
+    Generar respuestas y audio y escribir el paquete
+
+    Args:
+        questions: (pregunta, respuesta curada o None)
+        output: Ruta del paquete
+        language_code: Idioma de la síntesis
+        service: GCPService síncrono (por defecto el singleton global)
+
+    Returns:
+        Índice escrito
+    """
+    from src.services.gcp_service import TTS_VOICE_VARIANT, get_gcp_service
+
+    service = service or get_gcp_service()
+
+    def entries() -> Iterable[Tuple[str, str, bytes]]:
+        for question, answer in questions:
+            answer = answer or service.get_ai_recommendation(question)
+            logger.info(f"🎙️ FAQ: {question}")
+            yield question, answer, service.synthesize_speech(answer, language_code)
+
+    return write_pack(output, entries(), {
+        "language_code": language_code,
+        "voice": f"{language_code}-{TTS_VOICE_VARIANT}",
+        "model": settings.vertex_ai_model,
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Generar el paquete a partir de la lista de preguntas")
+    build.add_argument("questions", help="Archivo con una pregunta por línea")
+    build.add_argument("--output", default=settings.faq_pack_path or "data/faq.pack", help="Ruta del paquete")
+    build.add_argument("--language", default="es-ES", help="Idioma de la síntesis")
+    inspect = commands.add_parser("inspect", help="Mostrar el índice de un paquete")
+    inspect.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = build_pack(read_questions(args.questions), args.output, args.language)
+        print(f"✅ {len(index['entries'])} respuestas escritas en {args.output}")
+    else:
+        pack = FAQPack(args.path)
+        summary = pack.summary()
+        summary["questions"] = [entry["question"] for entry in pack.entries]
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,17 +1,47 @@
 """
 Servicios para integración con Google Cloud Platform
 """
+import io
 import json
 import logging
-from typing import Optional, Dict, Any
+import mmap
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Sequence, Tuple, Union
+import grpc
 from google.cloud import storage, speech_v1, texttospeech_v1
+from google.cloud.storage import transfer_manager
 import vertexai
-from vertexai.generative_models import GenerativeModel
 
 from src.config import settings
+from src.services import model_registry
+from src.services.cache_service import AudioCache, LLMResponseCache, get_audio_cache, get_llm_cache, get_semantic_cache
+from src.services.upload_queue import get_upload_queue
+from src.utils.audio_format import AudioFormat, detect_audio_format
+from src.utils.audio_normalize import normalize_audio
 
 logger = logging.getLogger(__name__)
 
+# Voz y formato de Text-to-Speech
+TTS_VOICE_VARIANT = "Neural2-B"  # Voz masculina clara
+TTS_AUDIO_CONFIG = {
+    "audio_encoding": "MP3",
+    "pitch": 0.0,  # Ajusta entre -20.0 (grave) y 20.0 (agudo)
+    "speaking_rate": 1.0,  # Velocidad: 0.25 (lento) a 4.0 (rápido)
+}
+
+# Prompt del análisis de gobernanza por lotes; cada recurso va en una línea JSON compacta
+GOVERNANCE_BATCH_PROMPT = """Analiza la gobernanza de los siguientes recursos de GCP. Cada línea es un recurso con
+su "id", su "tipo", los "hallazgos" de las reglas automáticas y sus "datos".
+Para cada recurso indica problemas de seguridad, recomendaciones de mejora, cumplimiento
+de estándares de DevOps y nivel de riesgo (Alto/Medio/Bajo), sin repetir los hallazgos.
+
+Responde con un objeto JSON {{"resources": [{{"id", "problemas", "recomendaciones",
+"cumplimiento_devops", "nivel_riesgo"}}]}} con exactamente un elemento por id.
+
+{resources}"""
+
 
 class GCPService:
     """Servicio para operaciones con GCP"""
@@ -24,11 +54,40 @@ class GCPService:
         # Inicializar VertexAI
         vertexai.init(project=self.project_id, location=self.region)
         
+        # Modelos generativos compartidos por perfil
+        self.models = model_registry.ModelRegistry()
+        
         # Inicializar clientes
         self.storage_client = storage.Client()
         self.speech_client = speech_v1.SpeechClient()
         self.tts_client = texttospeech_v1.TextToSpeechClient()
 
+    def warm_up(self) -> None:
+        """
+        Precalentar modelos y conexiones con una llamada mínima a cada servicio
+        
+        Las llamadas de cebado son best-effort: un fallo solo se registra.
+        """
+        self.models.warm()
+        primers = {
+            "storage": lambda: self.storage_client.bucket(settings.storage_bucket).exists(),
+            "speech": lambda: grpc.channel_ready_future(
+                self.speech_client.transport.grpc_channel
+            ).result(timeout=10),
+            "tts": lambda: self.tts_client.list_voices(language_code="es-ES"),
+            "vertex": lambda: self.models.get(model_registry.VOICE).count_tokens("ping"),
+        }
+        
+        def prime(name: str) -> None:
+            try:
+                primers[name]()
+                logger.info(f"🔥 Cliente {name} precalentado")
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo precalentar {name}: {str(e)}")
+        
+        with ThreadPoolExecutor(max_workers=len(primers), thread_name_prefix="warmup") as executor:
+            list(executor.map(prime, primers))
+
     def upload_to_storage(self, bucket_name: str, file_path: str, data: bytes) -> str:
         """
         Subir archivo a Cloud Storage
@@ -51,41 +110,225 @@ class GCPService:
             logger.error(f"❌ Error al subir archivo: {str(e)}")
             raise
 
-    def download_from_storage(self, bucket_name: str, file_path: str) -> bytes:
+    def upload_many_to_storage(self, objects: Sequence[Tuple[str, str, bytes]]) -> List[Optional[Exception]]:
+        """
+        Subir un lote de archivos a Cloud Storage en paralelo con el mismo cliente
+
+        Args:
+            objects: Tuplas (bucket, ruta, datos)
+
+        Returns:
+            Por objeto y en orden: None si se subió o la excepción de su subida
+        """
+        pairs = [
+            (io.BytesIO(data), self.storage_client.bucket(bucket_name).blob(file_path))
+            for bucket_name, file_path, data in objects
+        ]
+        results = transfer_manager.upload_many(
+            pairs,
+            raise_exception=False,
+            worker_type=transfer_manager.THREAD,
+            max_workers=len(pairs),
+        )
+        errors = [result if isinstance(result, Exception) else None for result in results]
+        logger.info(f"✅ Lote subido: {errors.count(None)}/{len(objects)} archivos")
+        return errors
+
+    def download_from_storage(
+        self,
+        bucket_name: str,
+        file_path: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> bytes:
         """
         Descargar archivo de Cloud Storage
         
+        Para objetos grandes usar iter_download, open_download o download_to_mmap.
+        
         Args:
             bucket_name: Nombre del bucket
             file_path: Ruta del archivo en el bucket
+            start: Primer byte del rango (opcional)
+            end: Byte final del rango, exclusivo (opcional)
             
         Returns:
-            Contenido del archivo
+            Contenido del archivo o del rango
         """
         try:
             bucket = self.storage_client.bucket(bucket_name)
             blob = bucket.blob(file_path)
-            return blob.download_as_bytes()
+            if start is None and end is None:
+                return blob.download_as_bytes()
+            return blob.download_as_bytes(start=start or 0, end=None if end is None else end - 1)
         except Exception as e:
             logger.error(f"❌ Error al descargar archivo: {str(e)}")
             raise
 
-    def transcribe_audio(self, audio_data: bytes, language_code: str = "es-ES") -> str:
+    def _get_blob(self, bucket_name: str, file_path: str) -> Any:
+        blob = self.storage_client.bucket(bucket_name).get_blob(file_path)
+        if blob is None:
+            raise FileNotFoundError(f"gs://{bucket_name}/{file_path}")
+        return blob
+
+    def get_storage_object_info(self, bucket_name: str, file_path: str) -> Dict[str, Any]:
+        """
+        Metadatos de un objeto de Cloud Storage
+        
+        Returns:
+            Tamaño, content type y generación del objeto
+            
+        Raises:
+            FileNotFoundError: Si el objeto no existe
+        """
+        blob = self._get_blob(bucket_name, file_path)
+        return {"size": blob.size, "content_type": blob.content_type, "generation": blob.generation}
+
+    def iter_download(
+        self,
+        bucket_name: str,
+        file_path: str,
+        chunk_size: Optional[int] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> Iterator[bytes]:
+        """
+        Descargar archivo de Cloud Storage por fragmentos (lecturas por rango)
+        
+        La memoria usada queda acotada por `chunk_size`.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            file_path: Ruta del archivo en el bucket
+            chunk_size: Bytes por fragmento (por defecto `storage_chunk_bytes`)
+            start: Primer byte a descargar
+            end: Byte final, exclusivo (por defecto el final del objeto)
+            
+        Yields:
+            Fragmentos del rango en orden
+            
+        Raises:
+            FileNotFoundError: Si el objeto no existe
+        """
+        chunk_size = chunk_size or settings.storage_chunk_bytes
+        blob = self._get_blob(bucket_name, file_path)
+        end = blob.size if end is None else min(end, blob.size)
+        for offset in range(start, end, chunk_size):
+            # `end` de la API es inclusivo; fijar la generación evita mezclar versiones si el objeto se reescribe
+            yield blob.download_as_bytes(
+                start=offset,
+                end=min(offset + chunk_size, end) - 1,
+                if_generation_match=blob.generation,
+            )
+
+    def open_download(self, bucket_name: str, file_path: str, chunk_size: Optional[int] = None) -> io.BufferedIOBase:
+        """
+        Abrir un objeto de Cloud Storage como archivo de solo lectura con seek
+        
+        Cada lectura descarga a lo sumo un fragmento de `chunk_size` bytes.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            file_path: Ruta del archivo en el bucket
+            chunk_size: Bytes por fragmento (por defecto `storage_chunk_bytes`)
+            
+        Returns:
+            Lector tipo archivo (cerrarlo al terminar)
+            
+        Raises:
+            FileNotFoundError: Si el objeto no existe
+        """
+        blob = self._get_blob(bucket_name, file_path)
+        return blob.open(
+            "rb",
+            chunk_size=chunk_size or settings.storage_chunk_bytes,
+            if_generation_match=blob.generation,
+        )
+
+    def download_to_mmap(
+        self,
+        bucket_name: str,
+        file_path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> mmap.mmap:
+        """
+        Descargar un objeto (o rango) a un archivo temporal mapeado en memoria
+        
+        Permite acceso aleatorio a objetos grandes sin mantenerlos en el heap:
+        el archivo temporal no tiene nombre y se libera al cerrar el mapa.
+        
+        Args:
+            bucket_name: Nombre del bucket
+            file_path: Ruta del archivo en el bucket
+            start: Primer byte a descargar
+            end: Byte final, exclusivo (por defecto el final del objeto)
+            chunk_size: Bytes por fragmento (por defecto `storage_chunk_bytes`)
+            
+        Returns:
+            Mapa de solo lectura del contenido (cerrarlo al terminar)
+            
+        Raises:
+            FileNotFoundError: Si el objeto no existe
+            ValueError: Si el rango está vacío
+        """
+        with tempfile.TemporaryFile(dir=settings.storage_spill_dir or None) as spill:
+            for chunk in self.iter_download(bucket_name, file_path, chunk_size, start, end):
+                spill.write(chunk)
+            if not spill.tell():
+                raise ValueError(f"Rango vacío en gs://{bucket_name}/{file_path}")
+            spill.flush()
+            # El mapa sigue siendo válido tras cerrar el archivo
+            return mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def transcribe_audio(
+        self,
+        audio_data: bytes,
+        language_code: str = "es-ES",
+        audio_format: Optional[AudioFormat] = None,
+    ) -> str:
         """
         Transcribir audio a texto usando Speech-to-Text
         
         Args:
-            audio_data: Datos de audio en bytes
+            audio_data: Datos de audio en bytes (WAV PCM16, FLAC, Ogg/WebM Opus o MP3);
+                el WAV se pasa a 16 kHz mono y sin silencios en los extremos
             language_code: Código de idioma
+            audio_format: Formato ya detectado (por defecto se lee de la cabecera)
             
         Returns:
             Texto transcrito
+            
+        Raises:
+            UnsupportedAudioFormat: Si la cabecera no corresponde a un formato soportado
         """
         try:
+            audio_format = audio_format or detect_audio_format(audio_data)
+            if settings.audio_normalize_enabled:
+                normalized = normalize_audio(
+                    audio_data,
+                    audio_format,
+                    settings.audio_trim_threshold_dbfs,
+                    settings.audio_trim_padding_ms,
+                )
+                if normalized is not None:
+                    if not normalized.has_voice:
+                        # Sin voz no hay nada que transcribir ni que facturar
+                        logger.info(f"🔇 Audio sin voz ({normalized.original_seconds:.1f}s), se omite Speech-to-Text")
+                        return ""
+                    if normalized.content is not audio_data:
+                        logger.info(
+                            f"✂️ Audio normalizado: {normalized.original_seconds:.1f}s "
+                            f"({audio_format.sample_rate} Hz, {audio_format.channels} canales) → "
+                            f"{normalized.seconds:.1f}s a 16 kHz mono"
+                        )
+                    audio_data, audio_format = normalized.content, normalized.audio_format
             audio = speech_v1.RecognitionAudio(content=audio_data)
             config = speech_v1.RecognitionConfig(
-                encoding=speech_v1.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=16000,
+                encoding=speech_v1.RecognitionConfig.AudioEncoding[audio_format.encoding],
+                sample_rate_hertz=audio_format.sample_rate,
+                audio_channel_count=audio_format.channels,
                 language_code=language_code,
                 enable_automatic_punctuation=True,
             )
@@ -104,6 +347,63 @@ class GCPService:
             logger.error(f"❌ Error al transcribir audio: {str(e)}")
             raise
 
+    def streaming_transcribe(
+        self,
+        audio_chunks: Iterable[bytes],
+        language_code: str = "es-ES",
+        sample_rate: int = 16000,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Transcribir audio en streaming usando Speech-to-Text
+
+        El reconocimiento se hace en modo `single_utterance`: el servicio
+        detecta el fin de la frase y cierra el stream tras el resultado final.
+
+        Args:
+            audio_chunks: Fragmentos PCM LINEAR16 mono en orden de captura
+            language_code: Código de idioma
+            sample_rate: Frecuencia de muestreo del audio
+
+        Yields:
+            Eventos `interim`, `final` y `end_of_speech`
+        """
+        try:
+            config = speech_v1.RecognitionConfig(
+                encoding=speech_v1.RecognitionConfig.AudioEncoding.LINEAR16,
+                sample_rate_hertz=sample_rate,
+                language_code=language_code,
+                enable_automatic_punctuation=True,
+            )
+            streaming_config = speech_v1.StreamingRecognitionConfig(
+                config=config,
+                interim_results=True,
+                single_utterance=True,
+            )
+            requests = (
+                speech_v1.StreamingRecognizeRequest(audio_content=chunk)
+                for chunk in audio_chunks
+            )
+
+            responses = self.speech_client.streaming_recognize(
+                config=streaming_config,
+                requests=requests,
+            )
+
+            end_of_utterance = speech_v1.StreamingRecognizeResponse.SpeechEventType.END_OF_SINGLE_UTTERANCE
+            for response in responses:
+                if response.speech_event_type == end_of_utterance:
+                    yield {"type": "end_of_speech"}
+                for result in response.results:
+                    if not result.alternatives:
+                        continue
+                    yield {
+                        "type": "final" if result.is_final else "interim",
+                        "transcript": result.alternatives[0].transcript,
+                    }
+        except Exception as e:
+            logger.error(f"❌ Error en transcripción streaming: {str(e)}")
+            raise
+
     def synthesize_speech(self, text: str, language_code: str = "es-ES") -> bytes:
         """
         Sintetizar texto a voz usando Text-to-Speech
@@ -115,18 +415,62 @@ class GCPService:
         Returns:
             Audio sintetizado en bytes
         """
+        audio_content, _ = self._synthesize_cached(text, language_code)
+        return audio_content
+
+    def synthesize_and_archive(self, text: str, language_code: str, bucket_name: str) -> Dict[str, Any]:
+        """
+        Sintetizar texto y encolar el archivo del audio en Storage con ruta direccionada por contenido
+        
+        Si el audio ya está en caché y archivado se omiten tanto TTS como la subida.
+        
+        Args:
+            text: Texto a sintetizar
+            language_code: Código de idioma
+            bucket_name: Bucket de archivo
+            
+        Returns:
+            Dict con `audio` (bytes), `storage_path` y `cached`
+        """
+        audio_content, key = self._synthesize_cached(text, language_code)
+        storage_path = f"audios/synthesized/{key}.mp3"
+        audio_cache = get_audio_cache()
+        cached = audio_cache.is_archived(key)
+        if not cached:
+            get_upload_queue().enqueue(
+                bucket_name,
+                storage_path,
+                audio_content,
+                on_success=lambda: audio_cache.mark_archived(key),
+            )
+        return {
+            "audio": audio_content,
+            "storage_path": f"gs://{bucket_name}/{storage_path}",
+            "cached": cached,
+        }
+
+    def _synthesize_cached(self, text: str, language_code: str) -> Tuple[bytes, str]:
+        """Sintetizar consultando primero la caché de audio; retorna el audio y su clave"""
+        voice_name = f"{language_code}-{TTS_VOICE_VARIANT}"
+        key = AudioCache.make_key(text, language_code, voice_name, TTS_AUDIO_CONFIG)
+        if settings.tts_cache_enabled:
+            cached = get_audio_cache().get(key)
+            if cached is not None:
+                logger.info(f"⚡ Audio desde caché: {text[:50]}...")
+                return cached, key
+
         try:
             synthesis_input = texttospeech_v1.SynthesisInput(text=text)
             
             voice = texttospeech_v1.VoiceSelectionParams(
                 language_code=language_code,
-                name=f"{language_code}-Neural2-B",  # Voz masculina clara
+                name=voice_name,
             )
             
             audio_config = texttospeech_v1.AudioConfig(
-                audio_encoding=texttospeech_v1.AudioEncoding.MP3,
-                pitch=0.0,  # Ajusta entre -20.0 (grave) y 20.0 (agudo)
-                speaking_rate=1.0,  # Velocidad: 0.25 (lento) a 4.0 (rápido)
+                audio_encoding=texttospeech_v1.AudioEncoding[TTS_AUDIO_CONFIG["audio_encoding"]],
+                pitch=TTS_AUDIO_CONFIG["pitch"],
+                speaking_rate=TTS_AUDIO_CONFIG["speaking_rate"],
             )
             
             response = self.tts_client.synthesize_speech(
@@ -136,68 +480,99 @@ class GCPService:
             )
             
             logger.info(f"✅ Texto sintetizado: {text[:50]}...")
-            return response.audio_content
         except Exception as e:
             logger.error(f"❌ Error al sintetizar voz: {str(e)}")
             raise
 
-    def get_ai_recommendation(self, prompt: str) -> str:
+        if settings.tts_cache_enabled:
+            get_audio_cache().set(key, response.audio_content)
+        return response.audio_content, key
+
+    def get_ai_recommendation(
+        self,
+        prompt: str,
+        stream: bool = False,
+        profile: str = model_registry.VOICE,
+    ) -> Union[str, Iterator[str]]:
         """
         Obtener recomendación usando VertexAI Gemini
         
         Args:
             prompt: Prompt para el modelo
+            stream: Si es True, retorna los fragmentos de texto a medida que se generan
+            profile: Perfil de modelo (voice: texto plano para voz, json: respuesta JSON)
             
         Returns:
-            Respuesta del modelo IA
+            Respuesta del modelo IA (o iterador de fragmentos si stream=True)
         """
         try:
-            model = GenerativeModel(
-                settings.vertex_ai_model,
-                system_instruction="""
-Eres un asistente experto en DevOps y Cloud Engineering. Respondes de forma directa y concisa.
-
-ESPECIALIDADES:
-Google Cloud Platform, CI/CD, Kubernetes, Docker, Terraform, Ansible, seguridad cloud, monitoreo e infraestructura.
-
-REGLAS ESTRICTAS:
-1. Responde en español, máximo 3-4 oraciones
-2. NUNCA uses asteriscos, guiones, viñetas o símbolos especiales
-3. NO uses markdown ni formato (sin *, -, #, etc)
-4. Escribe en texto plano natural
-5. Ve directo al punto, sin introducciones largas
-6. Si piden pasos, enumera con palabras: "Primero", "Segundo", "Tercero"
-7. Si piden definiciones, explica en 1-2 oraciones
-8. Para comandos, di "ejecuta" seguido del comando
-
-EJEMPLOS DE RESPUESTAS CORRECTAS:
-Pregunta: "Qué es Kubernetes?"
-Respuesta: "Kubernetes es un orquestador de contenedores que automatiza el despliegue, escalado y gestión de aplicaciones en contenedores. Lo usa principalmente para clusters de producción."
-
-Pregunta: "Cómo despliego en GCP?"
-Respuesta: "Primero, autentica con gcloud auth login. Segundo, configura tu proyecto. Tercero, usa gcloud app deploy o kubectl apply según el servicio. Necesitas tener configurado el archivo de configuración correspondiente."
-
-SI LA PREGUNTA NO ES DE DEVOPS:
-Responde: "No tengo información sobre eso. Puedo ayudarte con DevOps, GCP, Kubernetes, CI/CD e infraestructura."
-
-IMPORTANTE: El usuario habla por voz. Interpreta transcripciones imperfectas. Sé breve y claro.
-                """
-            )
+            model_profile = self.models.profile(profile)
+            cache_key = None
+            if settings.llm_cache_enabled:
+                cache_key = LLMResponseCache.make_key(
+                    prompt,
+                    model_profile.model_name,
+                    model_profile.temperature,
+                    model_profile.max_output_tokens,
+                    model_profile.system_instruction,
+                )
+                cached = get_llm_cache().get(cache_key)
+                if cached is not None:
+                    logger.info(f"⚡ Respuesta IA desde caché")
+                    return iter([cached]) if stream else cached
+
+            # Las preguntas de voz se buscan además por similitud (paráfrasis, acentos, puntuación)
+            question = prompt if profile == model_registry.VOICE and settings.semantic_cache_enabled else None
+            if question is not None:
+                cached = get_semantic_cache().get(question)
+                if cached is not None:
+                    logger.info(f"⚡ Respuesta IA desde caché semántica")
+                    return iter([cached]) if stream else cached
+
+            response = self.models.get(profile).generate_content(prompt, stream=stream)
             
-            response = model.generate_content(
-                prompt,
-                generation_config={
-                    "temperature": settings.vertex_ai_temperature,
-                    "max_output_tokens": settings.vertex_ai_max_tokens,
-                },
-            )
+            if stream:
+                return self._iter_response_text(response, cache_key, question)
             
             logger.info(f"✅ Respuesta IA generada")
+            self._remember_answer(response.text, cache_key, question)
             return response.text
         except Exception as e:
             logger.error(f"❌ Error al obtener recomendación IA: {str(e)}")
             raise
 
+    @staticmethod
+    def _remember_answer(answer: str, cache_key: Optional[str], question: Optional[str]) -> None:
+        """Guardar una respuesta completa en las cachés aplicables"""
+        if cache_key is not None:
+            get_llm_cache().set(cache_key, answer)
+        if question is not None:
+            get_semantic_cache().set(question, answer)
+
+    @staticmethod
+    def _iter_response_text(
+        responses: Iterable[Any],
+        cache_key: Optional[str] = None,
+        question: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Extraer el texto de cada fragmento de una respuesta en streaming"""
+        try:
+            parts = []
+            for chunk in responses:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Fragmento sin texto (p. ej. solo metadatos de finalización)
+                    continue
+                parts.append(text)
+                yield text
+            logger.info(f"✅ Respuesta IA generada (streaming)")
+            # Solo se cachea la respuesta completa
+            GCPService._remember_answer("".join(parts), cache_key, question)
+        except Exception as e:
+            logger.error(f"❌ Error en streaming de recomendación IA: {str(e)}")
+            raise
+
     def get_governance_analysis(self, resource_type: str, resource_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Analizar gobernanza de un recurso
@@ -222,7 +597,7 @@ IMPORTANTE: El usuario habla por voz. Interpreta transcripciones imperfectas. S
             Responde en formato JSON estructurado.
             """
             
-            response_text = self.get_ai_recommendation(prompt)
+            response_text = self.get_ai_recommendation(prompt, profile=model_registry.JSON)
             
             # Parsear respuesta JSON
             try:
@@ -235,14 +610,99 @@ IMPORTANTE: El usuario habla por voz. Interpreta transcripciones imperfectas. S
             logger.error(f"❌ Error en análisis de gobernanza: {str(e)}")
             raise
 
+    def get_governance_analysis_batch(self, resource_lines: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Analizar gobernanza de varios recursos con una sola llamada al modelo
+
+        Args:
+            resource_lines: Un recurso por línea en JSON compacto con su "id"
+
+        Returns:
+            Análisis por id (los ids que el modelo omita no aparecen)
+        """
+        try:
+            prompt = GOVERNANCE_BATCH_PROMPT.format(resources="\n".join(resource_lines))
+            response_text = self.get_ai_recommendation(prompt, profile=model_registry.JSON)
+
+            try:
+                reply = json.loads(response_text)
+            except json.JSONDecodeError:
+                logger.warning(f"⚠️  Respuesta del lote de gobernanza no es JSON válido")
+                return {}
+
+            if isinstance(reply, dict):
+                reply = reply.get("resources", reply)
+            if isinstance(reply, dict):
+                # Variante {id: análisis}
+                return {str(key): value for key, value in reply.items() if isinstance(value, dict)}
+            return {
+                str(item["id"]): {key: value for key, value in item.items() if key != "id"}
+                for item in reply or ()
+                if isinstance(item, dict) and "id" in item
+            }
+        except Exception as e:
+            logger.error(f"❌ Error en análisis de gobernanza por lotes: {str(e)}")
+            raise
+
 
 # Instancia global del servicio
 _gcp_service: Optional[GCPService] = None
+_gcp_service_lock = threading.Lock()
+
+# Estado del precalentamiento: pending, warming, ready, failed
+_warmup_state: Dict[str, Optional[str]] = {"status": "pending", "error": None}
+_warmup_stop = threading.Event()
 
 
 def get_gcp_service() -> GCPService:
     """Obtener instancia del servicio GCP (patrón Singleton)"""
     global _gcp_service
     if _gcp_service is None:
-        _gcp_service = GCPService()
+        with _gcp_service_lock:
+            if _gcp_service is None:
+                _gcp_service = GCPService()
     return _gcp_service
+
+
+def warm_up_gcp_service(max_attempts: Optional[int] = None, backoff: Optional[float] = None) -> None:
+    """
+    Crear el servicio GCP y precalentar sus clientes (se llama al arrancar)
+
+    Un fallo transitorio al arrancar (credenciales, servidor de metadatos) no
+    deja /ready en 503 para siempre: se reintenta con espera exponencial
+    hasta que funcione o se cierre la aplicación.
+
+    Args:
+        max_attempts: Intentos máximos (0 = sin límite; por defecto el de configuración)
+        backoff: Espera inicial entre intentos en segundos (se duplica hasta el máximo)
+    """
+    max_attempts = settings.gcp_warmup_max_attempts if max_attempts is None else max_attempts
+    delay = settings.gcp_warmup_backoff_seconds if backoff is None else backoff
+    _warmup_stop.clear()
+    attempt = 0
+    while True:
+        attempt += 1
+        _warmup_state.update(status="warming", error=None)
+        try:
+            get_gcp_service().warm_up()
+            _warmup_state["status"] = "ready"
+            logger.info("✅ Servicios GCP listos")
+            return
+        except Exception as e:
+            _warmup_state.update(status="failed", error=str(e))
+            logger.error(f"❌ Error al inicializar servicios GCP (intento {attempt}): {str(e)}")
+        if max_attempts and attempt >= max_attempts:
+            return
+        if _warmup_stop.wait(delay):
+            return
+        delay = min(delay * 2, settings.gcp_warmup_max_backoff_seconds)
+
+
+def stop_gcp_warmup() -> None:
+    """Cancelar los reintentos pendientes del precalentamiento (al cerrar)"""
+    _warmup_stop.set()
+
+
+def get_warmup_state() -> Dict[str, Optional[str]]:
+    """Estado actual del precalentamiento"""
+    return dict(_warmup_state)
@@ -0,0 +1,191 @@
+"""
+Revisión de gobernanza con IA por lotes
+
+Las reglas deterministas de GovernanceService se ejecutan primero sobre todo
+el inventario. Solo los recursos con hallazgos graves o con un resultado
+dudoso (riesgo medio) se envían a Gemini, varios por prompt bajo un
+presupuesto de tokens y con un número acotado de prompts simultáneos. Las
+respuestas estructuradas se asignan de vuelta a cada recurso por su id en el
+lote, así un inventario de miles de recursos cuesta unas pocas llamadas.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.config import settings
+from src.services.gcp_service import GOVERNANCE_BATCH_PROMPT
+from src.services.governance_incremental import get_incremental_analyzer
+from src.services.governance_service import GovernanceService, RiskLevel
+
+logger = logging.getLogger(__name__)
+
+# Severidades de hallazgo que siempre se revisan con IA
+REVIEW_SEVERITIES = frozenset({"high", "critical"})
+# Estimación conservadora de caracteres por token para JSON compacto
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens aproximados de un texto (sin llamar a la API)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def needs_review(analysis: Dict[str, Any]) -> bool:
+    """
+    Decidir si un recurso necesita revisión con IA
+
+    Se revisan los recursos con algún hallazgo grave y los de riesgo medio,
+    donde las reglas detectan problemas pero su impacto depende del contexto.
+    Los recursos sin hallazgos relevantes quedan resueltos por las reglas.
+    """
+    if analysis.get("risk_level") == RiskLevel.MEDIUM:
+        return True
+    return any(finding.get("severity") in REVIEW_SEVERITIES for finding in analysis.get("findings") or ())
+
+
+def resource_line(key: str, resource_type: str, resource_data: Dict[str, Any], analysis: Dict[str, Any]) -> str:
+    """Línea JSON compacta de un recurso dentro del prompt del lote"""
+    return json.dumps(
+        {
+            "id": key,
+            "tipo": resource_type,
+            "hallazgos": [finding["issue"] for finding in analysis.get("findings") or ()],
+            "datos": resource_data,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+
+
+def pack_batches(
+    lines: Sequence[Tuple[str, str]],
+    token_budget: int,
+    max_resources: int,
+) -> List[List[Tuple[str, str]]]:
+    """
+    Agrupar líneas (id, json) en lotes respetando el orden
+
+    Args:
+        lines: Recursos a revisar
+        token_budget: Tokens de entrada disponibles por lote para los recursos
+        max_resources: Recursos máximos por lote
+
+    Returns:
+        Lotes; un recurso que por sí solo supera el presupuesto va en su propio lote
+    """
+    batches: List[List[Tuple[str, str]]] = []
+    current: List[Tuple[str, str]] = []
+    used = 0
+    for key, line in lines:
+        tokens = estimate_tokens(line)
+        if current and (used + tokens > token_budget or len(current) >= max_resources):
+            batches.append(current)
+            current, used = [], 0
+        current.append((key, line))
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def default_max_resources() -> int:
+    """Recursos por lote permitidos por la configuración y por la salida máxima del modelo JSON"""
+    by_output = settings.vertex_ai_json_max_tokens // max(1, settings.governance_ai_reply_tokens)
+    return max(1, min(settings.governance_ai_batch_max_resources, by_output))
+
+
+def _analyze_deterministic(resources: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aplicar las reglas a cada recurso; los errores quedan registrados por recurso"""
+    analyzer = get_incremental_analyzer() if settings.governance_incremental_enabled else None
+    supported = GovernanceService.supported_resource_types()
+    records = []
+    for index, resource in enumerate(resources):
+        resource_type = str(resource.get("resource_type") or "").lower()
+        resource_id = resource.get("resource_id")
+        resource_data = resource.get("resource_data") or {}
+        if resource_type not in supported:
+            records.append({
+                "index": index,
+                "resource_id": resource_id,
+                "error": f"Tipo de recurso no soportado: {resource_type}",
+            })
+            continue
+        try:
+            if analyzer is not None:
+                analysis = analyzer.analyze(resource_type, resource_data, resource_id)
+            else:
+                analysis = GovernanceService.analyze(resource_type, resource_data)
+        except Exception as e:
+            records.append({"index": index, "resource_id": resource_id, "error": str(e)})
+            continue
+        records.append({
+            "index": index,
+            "resource_id": resource_id,
+            **analysis,
+            "ai_review": None,
+            "_data": resource_data,
+        })
+    return records
+
+
+async def review_governance(
+    resources: Iterable[Dict[str, Any]],
+    service: Optional[Any] = None,
+    token_budget: Optional[int] = None,
+    max_resources: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Analizar un inventario con reglas y revisar con IA solo lo necesario
+
+    Args:
+        resources: Recursos {"resource_type", "resource_data", "resource_id"}
+        service: Fachada asíncrona con `get_governance_analysis_batch` (por defecto la global)
+        token_budget: Tokens de entrada por prompt (incluida la instrucción)
+        max_resources: Recursos máximos por prompt
+        max_concurrency: Prompts simultáneos de esta revisión
+
+    Returns:
+        {"total", "reviewed", "llm_calls", "results"}; cada resultado incluye el
+        análisis de las reglas y `ai_review` (None si no se envió al modelo)
+    """
+    if service is None:
+        from src.services.async_gcp_service import get_async_gcp_service
+
+        service = get_async_gcp_service()
+    token_budget = token_budget or settings.governance_ai_batch_tokens
+    max_resources = max_resources or default_max_resources()
+    # Límite propio para que una revisión grande no acapare el semáforo LLM compartido con voz
+    semaphore = asyncio.Semaphore(max_concurrency or settings.governance_ai_concurrency)
+
+    records = await asyncio.to_thread(_analyze_deterministic, list(resources))
+
+    pending: Dict[str, Dict[str, Any]] = {}
+    lines: List[Tuple[str, str]] = []
+    for record in records:
+        data = record.pop("_data", None)
+        if data is None or not needs_review(record):
+            continue
+        key = f"r{record['index']}"
+        pending[key] = record
+        lines.append((key, resource_line(key, record["resource_type"], data, record)))
+
+    batches = pack_batches(lines, token_budget - estimate_tokens(GOVERNANCE_BATCH_PROMPT), max_resources)
+
+    async def review(batch: List[Tuple[str, str]]) -> None:
+        async with semaphore:
+            try:
+                reply = await service.get_governance_analysis_batch([line for _, line in batch])
+                missing = {"error": "El modelo no devolvió análisis para este recurso"}
+            except Exception as e:
+                logger.error(f"❌ Error en lote de revisión de gobernanza ({len(batch)} recursos): {str(e)}")
+                reply, missing = {}, {"error": str(e)}
+        for key, _ in batch:
+            pending[key]["ai_review"] = reply.get(key) or missing
+
+    await asyncio.gather(*(review(batch) for batch in batches))
+    logger.info(f"✅ Revisión de gobernanza: {len(records)} recursos, {len(lines)} revisados en {len(batches)} llamadas")
+
+    return {"total": len(records), "reviewed": len(lines), "llm_calls": len(batches), "results": records}
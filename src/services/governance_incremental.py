@@ -0,0 +1,227 @@
+"""
+Análisis de gobernanza incremental
+
+Cada recurso se identifica por una huella de sus datos canónicos y de la
+versión de las reglas. Los análisis se cachean por huella, así que en
+escaneos periódicos solo se reevalúan los recursos que cambiaron. Para los
+recursos con `resource_id` se registra además un historial acotado de
+cambios en sus hallazgos, consultable por revisión.
+"""
+import hashlib
+import json
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.config import settings
+from src.services.cache_service import TTLCache
+from src.services.compute_governance import COMPUTE_RULES, COMPUTE_SCORE_PENALTY
+from src.services.governance_rules import RULE_TABLE
+from src.services.governance_service import GovernanceService
+
+# Vida de las entradas: la huella ya incluye la versión de las reglas
+RESULT_TTL = 24 * 3600
+
+
+def canonical_json(data: Any) -> str:
+    """Serialización determinista (claves ordenadas, sin espacios)"""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _rule_set_version() -> str:
+    payload = canonical_json([RULE_TABLE, GovernanceService.GOVERNANCE_RULES, COMPUTE_RULES, COMPUTE_SCORE_PENALTY])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# Cambia cuando cambia cualquier regla o umbral, invalidando las huellas anteriores
+RULE_SET_VERSION = _rule_set_version()
+
+
+def _finding_ids(analysis: Dict[str, Any]) -> List[str]:
+    return sorted({finding.get("rule") or finding["issue"] for finding in analysis["findings"]})
+
+
+class IncrementalGovernanceAnalyzer:
+    """Caché de análisis por huella con historial de cambios de hallazgos"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_changes: int,
+        rule_set_version: str = RULE_SET_VERSION,
+    ):
+        """
+        Inicializar analizador
+
+        Args:
+            max_entries: Análisis y recursos identificados que se conservan
+            max_changes: Cambios de hallazgos que se conservan en el historial
+            rule_set_version: Versión de las reglas incluida en cada huella
+        """
+        self.rule_set_version = rule_set_version
+        self._results = TTLCache(max_entries, RESULT_TTL)
+        # (resource_type, resource_id) -> (huella, ids de hallazgos, nivel de riesgo)
+        self._resources = TTLCache(max_entries, RESULT_TTL)
+        self._changes: Deque[Dict[str, Any]] = deque(maxlen=max_changes)
+        self.revision = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def fingerprint(self, resource_type: str, resource_data: Dict[str, Any]) -> str:
+        """Huella de los datos canónicos del recurso y la versión de las reglas"""
+        payload = f"{self.rule_set_version}\0{resource_type}\0{canonical_json(resource_data)}"
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def cached(
+        self,
+        resource_type: str,
+        resource_data: Dict[str, Any],
+        resource_id: Optional[str] = None,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Buscar el análisis de un recurso por su huella
+
+        Returns:
+            Huella y análisis cacheado (None si hay que evaluarlo)
+        """
+        fingerprint = self.fingerprint(resource_type, resource_data)
+        analysis = self._results.get(fingerprint)
+        with self._lock:
+            if analysis is None:
+                self.misses += 1
+                return fingerprint, None
+            self.hits += 1
+        # Los hallazgos IAM referencian un índice que puede haber expirado antes que el análisis
+        GovernanceService.register_indexes(resource_type, resource_data, analysis)
+        self._track(resource_type, resource_id, fingerprint, analysis)
+        return fingerprint, analysis
+
+    def record(
+        self,
+        resource_type: str,
+        fingerprint: str,
+        analysis: Dict[str, Any],
+        resource_id: Optional[str] = None,
+    ) -> None:
+        """Guardar un análisis recién evaluado"""
+        self._results.set(fingerprint, analysis)
+        self._track(resource_type, resource_id, fingerprint, analysis)
+
+    def analyze(
+        self,
+        resource_type: str,
+        resource_data: Dict[str, Any],
+        resource_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Analizar un recurso reevaluándolo solo si cambió su huella
+
+        Args:
+            resource_type: Tipo de recurso
+            resource_data: Datos del recurso
+            resource_id: Identificador estable del recurso (habilita el historial de cambios)
+
+        Returns:
+            Análisis de gobernanza con su huella
+
+        Raises:
+            ValueError: Si el tipo de recurso no está soportado
+        """
+        fingerprint, analysis = self.cached(resource_type, resource_data, resource_id)
+        if analysis is None:
+            analysis = GovernanceService.analyze(resource_type, resource_data)
+            self.record(resource_type, fingerprint, analysis, resource_id)
+        return {**analysis, "fingerprint": fingerprint}
+
+    def _track(
+        self,
+        resource_type: str,
+        resource_id: Optional[str],
+        fingerprint: str,
+        analysis: Dict[str, Any],
+    ) -> None:
+        """Registrar un cambio si variaron los hallazgos del recurso identificado"""
+        if resource_id is None:
+            return
+        key = f"{resource_type}\0{resource_id}"
+        previous = self._resources.get(key)
+        if previous is not None and previous[0] == fingerprint:
+            return
+        finding_ids = _finding_ids(analysis)
+        risk_level = analysis["risk_level"]
+        self._resources.set(key, (fingerprint, finding_ids, risk_level))
+
+        if previous is None:
+            if not finding_ids:
+                return
+            status, previous_ids, previous_risk = "new", [], None
+        else:
+            _, previous_ids, previous_risk = previous
+            if previous_ids == finding_ids and previous_risk == risk_level:
+                return
+            status = "changed"
+
+        with self._lock:
+            self.revision += 1
+            self._changes.append({
+                "revision": self.revision,
+                "status": status,
+                "resource_type": resource_type,
+                "resource_id": resource_id,
+                "previous_risk_level": previous_risk,
+                "risk_level": risk_level,
+                "added": [f for f in finding_ids if f not in previous_ids],
+                "resolved": [f for f in previous_ids if f not in finding_ids],
+                "compliance_score": analysis["compliance_score"],
+            })
+
+    def changes_since(self, revision: int = 0) -> Dict[str, Any]:
+        """
+        Cambios de hallazgos posteriores a una revisión
+
+        Args:
+            revision: Última revisión ya procesada por el cliente
+
+        Returns:
+            Revisión actual, cambios posteriores y si el historial se truncó
+        """
+        with self._lock:
+            changes = [change for change in self._changes if change["revision"] > revision]
+            oldest = self._changes[0]["revision"] if self._changes else self.revision + 1
+            return {
+                "revision": self.revision,
+                "changes": changes,
+                "truncated": revision + 1 < oldest,
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos y ocupación"""
+        total = self.hits + self.misses
+        return {
+            "rule_set_version": self.rule_set_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._results),
+            "tracked_resources": len(self._resources),
+            "revision": self.revision,
+        }
+
+
+# Instancia global del analizador
+_incremental_analyzer: Optional[IncrementalGovernanceAnalyzer] = None
+_incremental_analyzer_lock = threading.Lock()
+
+
+def get_incremental_analyzer() -> IncrementalGovernanceAnalyzer:
+    """Obtener analizador incremental de gobernanza (patrón Singleton)"""
+    global _incremental_analyzer
+    if _incremental_analyzer is None:
+        with _incremental_analyzer_lock:
+            if _incremental_analyzer is None:
+                _incremental_analyzer = IncrementalGovernanceAnalyzer(
+                    settings.governance_cache_max_entries,
+                    settings.governance_changes_max,
+                )
+    return _incremental_analyzer
@@ -0,0 +1,357 @@
+"""
+Motor de reglas de gobernanza
+
+Las reglas se declaran en `RULE_TABLE` y se compilan una sola vez al
+importar el módulo en evaluadores (closures) que solo leen los campos que
+necesitan. Las severidades se comparan por rango numérico, no por el texto.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.services.iam_index import get_iam_index_registry
+
+# Rango de cada severidad de hallazgo (mayor = más grave)
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+
+# Tipos de chequeo soportados:
+# - required: el campo debe ser verdadero / no vacío
+# - forbidden: el campo debe ser falso / vacío
+# Chequeos sobre el índice IAM del campo (ver `indexed_field`):
+# - index_service_accounts: cuentas de servicio (lista `service_accounts` o principales del índice) <= `limit`
+# - index_max_roles_per_principal: ningún principal del índice con más de `limit` roles
+# - index_holds_roles: ningún principal del índice con alguno de los roles `roles`
+RULE_TABLE: Dict[str, Dict[str, Any]] = {
+    "iam": {
+        "score_penalty": 10,
+        # Los bindings se sustituyen por su IAMPolicyIndex antes de evaluar
+        "indexed_field": "bindings",
+        "rules": [
+            {
+                "id": "iam.service_account_count",
+                "check": "index_service_accounts",
+                "field": "bindings",
+                "limit": "max_service_accounts_per_project",
+                "severity": "medium",
+                "issue": "Demasiadas cuentas de servicio",
+                "recommendation": "Reducir cuentas de servicio a {limit} o menos",
+            },
+            {
+                "id": "iam.least_privilege",
+                "check": "index_max_roles_per_principal",
+                "field": "bindings",
+                "limit": "max_roles_per_principal",
+                "severity": "high",
+                "issue": "Permisos excesivos detectados",
+                "recommendation": "Implementar principio de menor privilegio",
+            },
+            {
+                "id": "iam.primitive_roles",
+                "check": "index_holds_roles",
+                "field": "bindings",
+                "roles": ["roles/owner", "roles/editor"],
+                "severity": "high",
+                "issue": "Roles básicos (Owner/Editor) asignados",
+                "recommendation": "Reemplazar roles básicos por roles predefinidos o personalizados",
+            },
+            {
+                "id": "iam.custom_roles",
+                "check": "required",
+                "field": "uses_custom_roles",
+                "severity": "low",
+                "issue": "No se utilizan roles personalizados",
+                "recommendation": "Considerar crear roles personalizados para casos de uso específicos",
+            },
+            {
+                "id": "iam.audit_logging",
+                "check": "required",
+                "field": "audit_logging_enabled",
+                "severity": "high",
+                "issue": "Logging de auditoría no habilitado",
+                "recommendation": "Habilitar Cloud Audit Logs para IAM",
+            },
+        ],
+    },
+    "storage": {
+        "score_penalty": 15,
+        "rules": [
+            {
+                "id": "storage.encryption",
+                "check": "required",
+                "field": "encryption_enabled",
+                "severity": "critical",
+                "issue": "Encriptación no habilitada",
+                "recommendation": "Habilitar encriptación en el bucket de storage",
+            },
+            {
+                "id": "storage.versioning",
+                "check": "required",
+                "field": "versioning_enabled",
+                "severity": "medium",
+                "issue": "Versionado no habilitado",
+                "recommendation": "Habilitar versionado para recuperación de datos",
+            },
+            {
+                "id": "storage.lifecycle",
+                "check": "required",
+                "field": "lifecycle_policy",
+                "severity": "medium",
+                "issue": "Política de ciclo de vida no configurada",
+                "recommendation": "Configurar política de ciclo de vida para optimizar costos",
+            },
+            {
+                "id": "storage.public_access",
+                "check": "forbidden",
+                "field": "is_public",
+                "severity": "critical",
+                "issue": "Bucket público detectado",
+                "recommendation": "Cambiar permisos a privado inmediatamente",
+            },
+            {
+                "id": "storage.audit_logging",
+                "check": "required",
+                "field": "audit_logging_enabled",
+                "severity": "high",
+                "issue": "Logging de acceso no habilitado",
+                "recommendation": "Habilitar logging para auditoría de acceso",
+            },
+        ],
+    },
+    "gke": {
+        "score_penalty": 12,
+        "rules": [
+            {
+                "id": "gke.rbac",
+                "check": "required",
+                "field": "rbac_enabled",
+                "severity": "critical",
+                "issue": "RBAC no habilitado",
+                "recommendation": "Habilitar RBAC en el cluster de GKE",
+            },
+            {
+                "id": "gke.network_policy",
+                "check": "required",
+                "field": "network_policy_enabled",
+                "severity": "high",
+                "issue": "Network Policy no habilitada",
+                "recommendation": "Habilitar Network Policy para segmentación de red",
+            },
+            {
+                "id": "gke.pod_security",
+                "check": "required",
+                "field": "pod_security_policy_enabled",
+                "severity": "high",
+                "issue": "Pod Security Policy no habilitada",
+                "recommendation": "Habilitar Pod Security Policy o Pod Security Standards",
+            },
+            {
+                "id": "gke.resource_quotas",
+                "check": "required",
+                "field": "resource_quotas_configured",
+                "severity": "medium",
+                "issue": "Resource Quotas no configuradas",
+                "recommendation": "Configurar resource quotas por namespace",
+            },
+            {
+                "id": "gke.audit_logging",
+                "check": "required",
+                "field": "audit_logging_enabled",
+                "severity": "high",
+                "issue": "Audit Logging no habilitado",
+                "recommendation": "Habilitar auditoría de cluster",
+            },
+        ],
+    },
+}
+
+Evaluator = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def compile_rule(rule: Dict[str, Any], thresholds: Dict[str, Any]) -> Evaluator:
+    """
+    Compilar una regla declarativa en un evaluador
+
+    Args:
+        rule: Definición de la regla (ver RULE_TABLE)
+        thresholds: Umbrales del tipo de recurso (GOVERNANCE_RULES)
+
+    Returns:
+        Función que recibe los datos del recurso y retorna el hallazgo o None
+    """
+    check = rule["check"]
+    field = rule["field"]
+    limit = thresholds[rule["limit"]] if "limit" in rule else None
+    template = {
+        "severity": rule["severity"],
+        "issue": rule["issue"],
+        "recommendation": rule["recommendation"].format(limit=limit),
+    }
+
+    if check == "required":
+        def evaluate(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            if data.get(field):
+                return None
+            return dict(template)
+    elif check == "forbidden":
+        def evaluate(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            if not data.get(field):
+                return None
+            return dict(template)
+    elif check == "index_service_accounts":
+        def evaluate(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            count = max(len(data.get("service_accounts") or ()), len(data[field].service_account_ids))
+            if count <= limit:
+                return None
+            return {**template, "count": count}
+    elif check == "index_max_roles_per_principal":
+        def evaluate(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            index = data[field]
+            offenders = index.principals_over(limit)
+            if not len(offenders):
+                return None
+            return {**template, "index_id": index.index_id, "principal_ids": offenders.tolist(), "count": len(offenders)}
+    elif check == "index_holds_roles":
+        roles = rule["roles"]
+
+        def evaluate(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            index = data[field]
+            role_ids, holders = index.principals_holding(roles)
+            if not len(holders):
+                return None
+            return {
+                **template,
+                "index_id": index.index_id,
+                "role_ids": role_ids,
+                "principal_ids": holders.tolist(),
+                "count": len(holders),
+            }
+    else:
+        raise ValueError(f"Tipo de chequeo desconocido en {rule['id']}: {check}")
+
+    return evaluate
+
+
+class RuleSet:
+    """Reglas compiladas de un tipo de recurso"""
+
+    __slots__ = ("resource_type", "rules", "score_penalty", "indexed_field")
+
+    def __init__(self, resource_type: str, spec: Dict[str, Any], thresholds: Dict[str, Any]):
+        self.resource_type = resource_type
+        self.score_penalty = spec["score_penalty"]
+        self.indexed_field = spec.get("indexed_field")
+        self.rules: List[Tuple[Evaluator, int]] = [
+            (compile_rule(rule, thresholds), SEVERITY_RANK[rule["severity"]])
+            for rule in spec["rules"]
+        ]
+
+    def prepare(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Sustituir el campo indexado por su índice; retorna datos y campos extra del análisis"""
+        if self.indexed_field is None:
+            return data, {}
+        index = get_iam_index_registry().get_or_build(data.get(self.indexed_field) or {})
+        return {**data, self.indexed_field: index}, {"iam_index": index.summary()}
+
+    def register_index(self, data: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+        """Asegurar que el índice del análisis sigue registrado (reconstruyéndolo solo si expiró)"""
+        if self.indexed_field is None:
+            return
+        registry = get_iam_index_registry()
+        # El análisis ya trae el id del índice: la huella de los bindings solo se recalcula al reconstruirlo
+        index_id = (analysis.get("iam_index") or {}).get("index_id")
+        if index_id is None or registry.get(index_id) is None:
+            registry.get_or_build(data.get(self.indexed_field) or {})
+
+    def evaluate(self, data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int]:
+        """Evaluar un recurso ya preparado; retorna hallazgos y rango de severidad máximo"""
+        findings = []
+        worst = 0
+        for evaluate, rank in self.rules:
+            finding = evaluate(data)
+            if finding is not None:
+                findings.append(finding)
+                if rank > worst:
+                    worst = rank
+        return findings, worst
+
+
+class RuleEngine:
+    """Motor que evalúa recursos contra las reglas compiladas"""
+
+    def __init__(
+        self,
+        table: Dict[str, Dict[str, Any]],
+        thresholds: Dict[str, Dict[str, Any]],
+        risk_levels: List[Any],
+    ):
+        """
+        Inicializar motor
+
+        Args:
+            table: Tabla de reglas declarativas por tipo de recurso
+            thresholds: Umbrales por tipo de recurso
+            risk_levels: Niveles de riesgo ordenados por rango de severidad
+        """
+        self.risk_levels = risk_levels
+        self.rule_sets = {
+            resource_type: RuleSet(resource_type, spec, thresholds.get(resource_type, {}))
+            for resource_type, spec in table.items()
+        }
+
+    @property
+    def resource_types(self) -> List[str]:
+        """Tipos de recurso con reglas"""
+        return list(self.rule_sets)
+
+    def evaluate(self, resource_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evaluar un recurso
+
+        Args:
+            resource_type: Tipo de recurso
+            data: Datos del recurso
+
+        Returns:
+            Análisis con resource_type, risk_level, findings y compliance_score
+        """
+        rule_set = self.rule_sets.get(resource_type)
+        if rule_set is None:
+            raise ValueError(f"Tipo de recurso no soportado: {resource_type}")
+        data, extras = rule_set.prepare(data)
+        findings, worst = rule_set.evaluate(data)
+        return {
+            "resource_type": resource_type,
+            "risk_level": self.risk_levels[worst],
+            "findings": findings,
+            "compliance_score": max(0, 100 - len(findings) * rule_set.score_penalty),
+            **extras,
+        }
+
+    def register_indexes(self, resource_type: str, data: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+        """
+        Volver a registrar los índices que referencian los hallazgos de un análisis cacheado
+
+        Los hallazgos IAM guardan IDs de un índice con vida propia en el
+        registro; un análisis reutilizado debe reconstruirlo si ya expiró.
+        """
+        rule_set = self.rule_sets.get(resource_type)
+        if rule_set is not None:
+            rule_set.register_index(data, analysis)
+
+    def evaluate_many(self, resource_type: str, resources: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Evaluar muchos recursos del mismo tipo"""
+        rule_set = self.rule_sets.get(resource_type)
+        if rule_set is None:
+            raise ValueError(f"Tipo de recurso no soportado: {resource_type}")
+        risk_levels = self.risk_levels
+        penalty = rule_set.score_penalty
+        results = []
+        for data in resources:
+            data, extras = rule_set.prepare(data)
+            findings, worst = rule_set.evaluate(data)
+            results.append({
+                "resource_type": resource_type,
+                "risk_level": risk_levels[worst],
+                "findings": findings,
+                "compliance_score": max(0, 100 - len(findings) * penalty),
+                **extras,
+            })
+        return results
@@ -2,9 +2,12 @@
 Servicio de análisis de gobernanza
 """
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List
 from enum import Enum
 
+from src.services.compute_governance import analyze_compute_fleet
+from src.services.governance_rules import RULE_TABLE, RuleEngine
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,6 +19,10 @@ class RiskLevel(str, Enum):
     CRITICAL = "crítico"
 
 
+# Niveles de riesgo ordenados de menor a mayor gravedad
+RISK_LEVEL_ORDER = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL]
+
+
 class GovernanceService:
     """Servicio para análisis de gobernanza"""
 
@@ -53,72 +60,70 @@ class GovernanceService:
     }
 
     @staticmethod
-    def analyze_iam_governance(iam_data: Dict[str, Any]) -> Dict[str, Any]:
+    def supported_resource_types() -> List[str]:
+        """Tipos de recurso con análisis de gobernanza"""
+        return RULE_ENGINE.resource_types + ["compute"]
+
+    @staticmethod
+    def analyze(resource_type: str, resource_data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Analizar gobernanza de IAM
+        Analizar gobernanza de un recurso de cualquier tipo soportado
         
         Args:
-            iam_data: Datos de IAM
+            resource_type: Tipo de recurso (iam, storage, gke, compute)
+            resource_data: Datos del recurso
             
         Returns:
             Análisis de gobernanza
+            
+        Raises:
+            ValueError: Si el tipo de recurso no está soportado
         """
-        findings = []
-        risk_level = RiskLevel.LOW
+        if resource_type == "compute":
+            return GovernanceService.analyze_compute_governance(resource_data)
+        return RULE_ENGINE.evaluate(resource_type, resource_data)
 
-        # Verificar número de cuentas de servicio
-        service_accounts = iam_data.get("service_accounts", [])
-        if len(service_accounts) > GovernanceService.GOVERNANCE_RULES["iam"]["max_service_accounts_per_project"]:
-            findings.append({
-                "severity": "medium",
-                "issue": "Demasiadas cuentas de servicio",
-                "recommendation": f"Reducir cuentas de servicio a {GovernanceService.GOVERNANCE_RULES['iam']['max_service_accounts_per_project']} o menos",
-                "count": len(service_accounts),
-            })
-            risk_level = RiskLevel.MEDIUM
-
-        # Verificar permisos excesivos
-        excessive_permissions = []
-        for principal, roles in iam_data.get("bindings", {}).items():
-            if len(roles) > GovernanceService.GOVERNANCE_RULES["iam"]["max_roles_per_principal"]:
-                excessive_permissions.append({
-                    "principal": principal,
-                    "role_count": len(roles),
-                    "roles": roles,
-                })
-
-        if excessive_permissions:
-            findings.append({
-                "severity": "high",
-                "issue": "Permisos excesivos detectados",
-                "recommendation": "Implementar principio de menor privilegio",
-                "principals": excessive_permissions,
-            })
-            risk_level = RiskLevel.HIGH
-
-        # Verificar uso de roles personalizados
-        if not iam_data.get("uses_custom_roles", False):
-            findings.append({
-                "severity": "low",
-                "issue": "No se utilizan roles personalizados",
-                "recommendation": "Considerar crear roles personalizados para casos de uso específicos",
-            })
+    @staticmethod
+    def register_indexes(resource_type: str, resource_data: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+        """
+        Asegurar que los índices referenciados por el análisis de un recurso siguen registrados
+        
+        Args:
+            resource_type: Tipo de recurso
+            resource_data: Datos del recurso analizado
+            analysis: Análisis cacheado del recurso
+        """
+        if resource_type != "compute":
+            RULE_ENGINE.register_indexes(resource_type, resource_data, analysis)
 
-        # Verificar logging de auditoría
-        if not iam_data.get("audit_logging_enabled", False):
-            findings.append({
-                "severity": "high",
-                "issue": "Logging de auditoría no habilitado",
-                "recommendation": "Habilitar Cloud Audit Logs para IAM",
-            })
-            risk_level = RiskLevel.HIGH
+    @staticmethod
+    def analyze_many(resource_type: str, resources: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analizar gobernanza de muchos recursos del mismo tipo
+        
+        Args:
+            resource_type: Tipo de recurso (iam, storage, gke)
+            resources: Datos de cada recurso
+            
+        Returns:
+            Un análisis por recurso, en el mismo orden
+        """
+        if resource_type == "compute":
+            return [GovernanceService.analyze_compute_governance(data) for data in resources]
+        return RULE_ENGINE.evaluate_many(resource_type, resources)
 
-        return {
-            "resource_type": "iam",
-            "risk_level": risk_level,
-            "findings": findings,
-            "compliance_score": 100 - (len(findings) * 10),
-        }
+    @staticmethod
+    def analyze_iam_governance(iam_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analizar gobernanza de IAM
+        
+        Args:
+            iam_data: Datos de IAM
+            
+        Returns:
+            Análisis de gobernanza
+        """
+        return RULE_ENGINE.evaluate("iam", iam_data)
 
     @staticmethod
     def analyze_storage_governance(storage_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -131,58 +136,7 @@ class GovernanceService:
         Returns:
             Análisis de gobernanza
         """
-        findings = []
-        risk_level = RiskLevel.LOW
-
-        # Verificar encriptación
-        if not storage_data.get("encryption_enabled", False):
-            findings.append({
-                "severity": "critical",
-                "issue": "Encriptación no habilitada",
-                "recommendation": "Habilitar encriptación en el bucket de storage",
-            })
-            risk_level = RiskLevel.CRITICAL
-
-        # Verificar versionado
-        if not storage_data.get("versioning_enabled", False):
-            findings.append({
-                "severity": "medium",
-                "issue": "Versionado no habilitado",
-                "recommendation": "Habilitar versionado para recuperación de datos",
-            })
-
-        # Verificar políticas de ciclo de vida
-        if not storage_data.get("lifecycle_policy", None):
-            findings.append({
-                "severity": "medium",
-                "issue": "Política de ciclo de vida no configurada",
-                "recommendation": "Configurar política de ciclo de vida para optimizar costos",
-            })
-
-        # Verificar acceso público
-        if storage_data.get("is_public", False):
-            findings.append({
-                "severity": "critical",
-                "issue": "Bucket público detectado",
-                "recommendation": "Cambiar permisos a privado inmediatamente",
-            })
-            risk_level = RiskLevel.CRITICAL
-
-        # Verificar logging
-        if not storage_data.get("audit_logging_enabled", False):
-            findings.append({
-                "severity": "high",
-                "issue": "Logging de acceso no habilitado",
-                "recommendation": "Habilitar logging para auditoría de acceso",
-            })
-            risk_level = max(risk_level, RiskLevel.HIGH)
-
-        return {
-            "resource_type": "storage",
-            "risk_level": risk_level,
-            "findings": findings,
-            "compliance_score": max(0, 100 - (len(findings) * 15)),
-        }
+        return RULE_ENGINE.evaluate("storage", storage_data)
 
     @staticmethod
     def analyze_gke_governance(gke_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -195,59 +149,23 @@ class GovernanceService:
         Returns:
             Análisis de gobernanza
         """
-        findings = []
-        risk_level = RiskLevel.LOW
-
-        # Verificar RBAC
-        if not gke_data.get("rbac_enabled", False):
-            findings.append({
-                "severity": "critical",
-                "issue": "RBAC no habilitado",
-                "recommendation": "Habilitar RBAC en el cluster de GKE",
-            })
-            risk_level = RiskLevel.CRITICAL
-
-        # Verificar Network Policy
-        if not gke_data.get("network_policy_enabled", False):
-            findings.append({
-                "severity": "high",
-                "issue": "Network Policy no habilitada",
-                "recommendation": "Habilitar Network Policy para segmentación de red",
-            })
-            risk_level = max(risk_level, RiskLevel.HIGH)
+        return RULE_ENGINE.evaluate("gke", gke_data)
 
-        # Verificar Pod Security Policy
-        if not gke_data.get("pod_security_policy_enabled", False):
-            findings.append({
-                "severity": "high",
-                "issue": "Pod Security Policy no habilitada",
-                "recommendation": "Habilitar Pod Security Policy o Pod Security Standards",
-            })
-            risk_level = max(risk_level, RiskLevel.HIGH)
-
-        # Verificar Resource Quotas
-        if not gke_data.get("resource_quotas_configured", False):
-            findings.append({
-                "severity": "medium",
-                "issue": "Resource Quotas no configuradas",
-                "recommendation": "Configurar resource quotas por namespace",
-            })
-
-        # Verificar Audit Logging
-        if not gke_data.get("audit_logging_enabled", False):
-            findings.append({
-                "severity": "high",
-                "issue": "Audit Logging no habilitado",
-                "recommendation": "Habilitar auditoría de cluster",
-            })
-            risk_level = max(risk_level, RiskLevel.HIGH)
-
-        return {
-            "resource_type": "gke",
-            "risk_level": risk_level,
-            "findings": findings,
-            "compliance_score": max(0, 100 - (len(findings) * 12)),
-        }
+    @staticmethod
+    def analyze_compute_governance(compute_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analizar gobernanza de Compute Engine
+        
+        Args:
+            compute_data: Flota como {"instances": [...]} o los datos de una sola instancia
+            
+        Returns:
+            Análisis de gobernanza con hallazgos por instancia y agregados de la flota
+        """
+        instances = compute_data.get("instances")
+        if instances is None:
+            instances = [compute_data]
+        return analyze_compute_fleet(instances, RISK_LEVEL_ORDER)
 
     @staticmethod
     def get_best_practices_recommendations(resource_type: str) -> List[Dict[str, str]]:
@@ -289,6 +207,20 @@ class GovernanceService:
                     "description": "Usar políticas de acceso basadas en identidad",
                 },
             ],
+            "compute": [
+                {
+                    "practice": "Imágenes administradas",
+                    "description": "Usar familias de imágenes aprobadas y actualizadas",
+                },
+                {
+                    "practice": "Observabilidad",
+                    "description": "Instalar el agente de operaciones en todas las instancias",
+                },
+                {
+                    "practice": "Optimización de costos",
+                    "description": "Etiquetar instancias y usar VMs preemptibles en desarrollo",
+                },
+            ],
             "gke": [
                 {
                     "practice": "Seguridad en capas",
@@ -306,3 +238,7 @@ class GovernanceService:
         }
 
         return recommendations.get(resource_type, [])
+
+
+# Reglas compiladas una sola vez al importar el módulo
+RULE_ENGINE = RuleEngine(RULE_TABLE, GovernanceService.GOVERNANCE_RULES, RISK_LEVEL_ORDER)
@@ -0,0 +1,202 @@
+"""
+Índice de políticas IAM
+
+Una política se indexa una sola vez: principales y roles reciben IDs enteros
+compactos (los roles de texto se internan), los roles de cada principal se
+guardan deduplicados con su conteo precalculado en un arreglo de NumPy y la
+relación inversa rol→principales se construye como arreglos CSR al primer
+uso. Las reglas de menor privilegio se resuelven con búsquedas en el índice
+y los hallazgos referencian IDs en lugar de copiar listas.
+
+Los índices se reutilizan entre análisis de la misma política mediante un
+registro acotado por huella. Quien entregue hallazgos que no acaba de
+evaluar (caché de análisis, pool de procesos) debe volver a registrar su
+índice para que los IDs sigan resolviéndose.
+"""
+import functools
+import hashlib
+import json
+import sys
+import threading
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.cache_service import TTLCache
+
+# Vida de los índices en el registro
+INDEX_TTL = 3600
+
+
+def _iter_grants(bindings: Any) -> Iterator[Tuple[Hashable, Iterable[Hashable]]]:
+    """
+    Pares (principal, roles) de una política
+
+    Acepta el formato del análisis ({principal: [roles]}) y el de la API de
+    IAM ([{"role": ..., "members": [...]}]).
+    """
+    if isinstance(bindings, dict):
+        yield from bindings.items()
+    else:
+        for binding in bindings or ():
+            role = (binding.get("role"),)
+            for member in binding.get("members") or ():
+                yield member, role
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Agrupar `values` por `keys` en formato CSR (offsets, valores)"""
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return offsets, values[order]
+
+
+def policy_fingerprint(bindings: Any) -> str:
+    """Huella de los bindings de una política"""
+    payload = json.dumps(bindings, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class IAMPolicyIndex:
+    """Índice de una política IAM con IDs enteros y conteos precalculados"""
+
+    def __init__(self, bindings: Any, index_id: Optional[str] = None):
+        """
+        Construir índice
+
+        Args:
+            bindings: {principal: [roles]} o [{"role", "members"}]
+            index_id: Identificador del índice (por defecto la huella de los bindings)
+        """
+        self.index_id = index_id or policy_fingerprint(bindings)
+        self.principals: List[Hashable] = []
+        self.roles: List[Hashable] = []
+        self.principal_ids: Dict[Hashable, int] = {}
+        self.role_ids: Dict[Hashable, int] = {}
+
+        # Roles de cada principal como dict ordenado (un binding repetido cuenta una sola vez)
+        grants: List[Dict[int, None]] = []
+        principal_ids, role_ids, roles_list = self.principal_ids, self.role_ids, self.roles
+        for principal, roles in _iter_grants(bindings):
+            principal_id = principal_ids.get(principal)
+            if principal_id is None:
+                principal_id = principal_ids[principal] = len(self.principals)
+                self.principals.append(principal)
+                grants.append({})
+            granted = grants[principal_id]
+            for role in roles or ():
+                role_id = role_ids.get(role)
+                if role_id is None:
+                    role_id = role_ids[role] = len(roles_list)
+                    roles_list.append(sys.intern(role) if type(role) is str else role)
+                granted[role_id] = None
+
+        self._grants = grants
+        self.role_counts = np.fromiter(map(len, grants), dtype=np.int64, count=len(grants))
+        self.binding_count = int(self.role_counts.sum())
+        self.service_account_ids = np.array(
+            [i for i, p in enumerate(self.principals) if isinstance(p, str) and p.startswith("serviceAccount:")],
+            dtype=np.int64,
+        )
+
+    # La relación rol→principales (CSR) se construye al primer uso: muchos análisis solo necesitan los conteos
+    @functools.cached_property
+    def _principals_by_role(self) -> Tuple[np.ndarray, np.ndarray]:
+        principal_of = np.repeat(np.arange(len(self.principals), dtype=np.int64), self.role_counts)
+        role_of = np.fromiter(
+            (role_id for granted in self._grants for role_id in granted),
+            dtype=np.int64,
+            count=self.binding_count,
+        )
+        return _csr(role_of, principal_of, len(self.roles))
+
+    @functools.cached_property
+    def principal_counts(self) -> np.ndarray:
+        """Número de principales de cada rol"""
+        offsets, _ = self._principals_by_role
+        return np.diff(offsets)
+
+    def roles_of(self, principal_id: int) -> List[int]:
+        """IDs de los roles de un principal"""
+        return list(self._grants[principal_id])
+
+    def principals_with(self, role_id: int) -> np.ndarray:
+        """IDs de los principales con un rol"""
+        offsets, principals = self._principals_by_role
+        return principals[offsets[role_id]:offsets[role_id + 1]]
+
+    def principals_over(self, limit: int) -> np.ndarray:
+        """IDs de los principales con más de `limit` roles"""
+        return np.flatnonzero(self.role_counts > limit)
+
+    def principals_holding(self, roles: Iterable[Hashable]) -> Tuple[List[int], np.ndarray]:
+        """IDs de los roles presentes de `roles` y de los principales que tienen alguno"""
+        role_ids = [self.role_ids[role] for role in roles if role in self.role_ids]
+        if not role_ids:
+            return [], np.empty(0, dtype=np.int64)
+        return role_ids, np.unique(np.concatenate([self.principals_with(r) for r in role_ids]))
+
+    def describe(self, principal_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Resolver IDs de principales a nombres y roles"""
+        return [
+            {
+                "id": principal_id,
+                "principal": self.principals[principal_id],
+                "role_count": int(self.role_counts[principal_id]),
+                "roles": [self.roles[r] for r in self.roles_of(principal_id)],
+            }
+            for principal_id in principal_ids
+            if 0 <= principal_id < len(self.principals)
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """Tamaño del índice"""
+        return {
+            "index_id": self.index_id,
+            "principals": len(self.principals),
+            "roles": len(self.roles),
+            "bindings": self.binding_count,
+            "service_accounts": len(self.service_account_ids),
+        }
+
+
+class IAMIndexRegistry:
+    """Registro acotado de índices por huella de la política"""
+
+    def __init__(self, max_entries: int = 64):
+        self._indexes = TTLCache(max_entries, INDEX_TTL)
+
+    def get_or_build(self, bindings: Any) -> IAMPolicyIndex:
+        """Obtener el índice de una política, construyéndolo si no existe"""
+        if isinstance(bindings, IAMPolicyIndex):
+            return bindings
+        index_id = policy_fingerprint(bindings)
+        index = self._indexes.get(index_id)
+        if index is None:
+            index = IAMPolicyIndex(bindings, index_id)
+            self._indexes.set(index_id, index)
+        return index
+
+    def get(self, index_id: str) -> Optional[IAMPolicyIndex]:
+        """Obtener un índice ya construido"""
+        return self._indexes.get(index_id)
+
+    def add(self, index: IAMPolicyIndex) -> None:
+        """Registrar un índice construido en otro proceso"""
+        self._indexes.set(index.index_id, index)
+
+
+# Registro global de índices
+_iam_index_registry: Optional[IAMIndexRegistry] = None
+_iam_index_registry_lock = threading.Lock()
+
+
+def get_iam_index_registry() -> IAMIndexRegistry:
+    """Obtener registro de índices IAM (patrón Singleton)"""
+    global _iam_index_registry
+    if _iam_index_registry is None:
+        with _iam_index_registry_lock:
+            if _iam_index_registry is None:
+                _iam_index_registry = IAMIndexRegistry()
+    return _iam_index_registry
@@ -0,0 +1,149 @@
+"""
+Registro de modelos generativos de VertexAI
+
+Cada caso de uso (voz, JSON estructurado) tiene un perfil con su propia
+instrucción de sistema y configuración de generación. Los handles de
+`GenerativeModel` se crean una sola vez por perfil y se comparten entre
+peticiones.
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from vertexai.generative_models import GenerationConfig, GenerativeModel
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Instrucción de sistema del asistente de voz
+VOICE_SYSTEM_INSTRUCTION = """
+Eres un asistente experto en DevOps y Cloud Engineering. Respondes de forma directa y concisa.
+
+ESPECIALIDADES:
+Google Cloud Platform, CI/CD, Kubernetes, Docker, Terraform, Ansible, seguridad cloud, monitoreo e infraestructura.
+
+REGLAS ESTRICTAS:
+1. Responde en español, máximo 3-4 oraciones
+2. NUNCA uses asteriscos, guiones, viñetas o símbolos especiales
+3. NO uses markdown ni formato (sin *, -, #, etc)
+4. Escribe en texto plano natural
+5. Ve directo al punto, sin introducciones largas
+6. Si piden pasos, enumera con palabras: "Primero", "Segundo", "Tercero"
+7. Si piden definiciones, explica en 1-2 oraciones
+8. Para comandos, di "ejecuta" seguido del comando
+
+EJEMPLOS DE RESPUESTAS CORRECTAS:
+Pregunta: "Qué es Kubernetes?"
+Respuesta: "Kubernetes es un orquestador de contenedores que automatiza el despliegue, escalado y gestión de aplicaciones en contenedores. Lo usa principalmente para clusters de producción."
+
+Pregunta: "Cómo despliego en GCP?"
+Respuesta: "Primero, autentica con gcloud auth login. Segundo, configura tu proyecto. Tercero, usa gcloud app deploy o kubectl apply según el servicio. Necesitas tener configurado el archivo de configuración correspondiente."
+
+SI LA PREGUNTA NO ES DE DEVOPS:
+Responde: "No tengo información sobre eso. Puedo ayudarte con DevOps, GCP, Kubernetes, CI/CD e infraestructura."
+
+IMPORTANTE: El usuario habla por voz. Interpreta transcripciones imperfectas. Sé breve y claro.
+"""
+
+# Instrucción de sistema para endpoints que esperan JSON
+JSON_SYSTEM_INSTRUCTION = """
+Eres un experto en DevOps, Cloud Engineering y gobernanza en Google Cloud Platform.
+Respondes en español con JSON válido y nada más: sin markdown, sin bloques de código
+y sin texto fuera del JSON. Usa claves descriptivas y listas para enumeraciones.
+"""
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    """Perfil de modelo: nombre, instrucción de sistema y configuración de generación"""
+    model_name: str
+    system_instruction: str
+    temperature: float
+    max_output_tokens: int
+    response_mime_type: Optional[str] = None
+
+    def generation_config(self) -> GenerationConfig:
+        """Configuración de generación del perfil"""
+        return GenerationConfig(
+            temperature=self.temperature,
+            max_output_tokens=self.max_output_tokens,
+            response_mime_type=self.response_mime_type,
+        )
+
+
+# Perfiles por caso de uso
+VOICE = "voice"
+JSON = "json"
+
+
+def default_profiles() -> Dict[str, ModelProfile]:
+    """Perfiles definidos a partir de la configuración"""
+    return {
+        VOICE: ModelProfile(
+            model_name=settings.vertex_ai_model,
+            system_instruction=VOICE_SYSTEM_INSTRUCTION,
+            temperature=settings.vertex_ai_temperature,
+            max_output_tokens=settings.vertex_ai_max_tokens,
+        ),
+        JSON: ModelProfile(
+            model_name=settings.vertex_ai_model,
+            system_instruction=JSON_SYSTEM_INSTRUCTION,
+            temperature=settings.vertex_ai_json_temperature,
+            max_output_tokens=settings.vertex_ai_json_max_tokens,
+            response_mime_type="application/json",
+        ),
+    }
+
+
+class ModelRegistry:
+    """Registro de handles `GenerativeModel` compartidos por perfil"""
+
+    def __init__(self, profiles: Optional[Dict[str, ModelProfile]] = None):
+        """
+        Inicializar registro
+
+        Args:
+            profiles: Perfiles disponibles por nombre
+        """
+        self.profiles = profiles or default_profiles()
+        self._models: Dict[ModelProfile, GenerativeModel] = {}
+        self._lock = threading.Lock()
+
+    def profile(self, name: str) -> ModelProfile:
+        """Obtener perfil por nombre"""
+        try:
+            return self.profiles[name]
+        except KeyError:
+            raise ValueError(f"Perfil de modelo desconocido: {name}")
+
+    def get(self, name: str) -> GenerativeModel:
+        """
+        Obtener el modelo de un perfil, creándolo en el primer uso
+
+        Args:
+            name: Nombre del perfil
+
+        Returns:
+            Handle compartido de GenerativeModel
+        """
+        profile = self.profile(name)
+        model = self._models.get(profile)
+        if model is None:
+            with self._lock:
+                model = self._models.get(profile)
+                if model is None:
+                    model = GenerativeModel(
+                        profile.model_name,
+                        generation_config=profile.generation_config(),
+                        system_instruction=profile.system_instruction,
+                    )
+                    self._models[profile] = model
+                    logger.info(f"✅ Modelo {profile.model_name} listo para perfil '{name}'")
+        return model
+
+    def warm(self) -> None:
+        """Crear los modelos de todos los perfiles"""
+        for name in self.profiles:
+            self.get(name)
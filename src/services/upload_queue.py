@@ -0,0 +1,360 @@
+"""
+Cola de subidas a Cloud Storage en segundo plano
+
+El archivo de audios no afecta la respuesta al usuario: las peticiones solo
+encolan y un pool de hilos sube los objetos por lotes con reintentos. Si la cola está
+llena, los objetos se descartan o se guardan en disco local según la
+configuración, y se reintentan en el siguiente arranque.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Políticas cuando la cola está llena
+DROP = "drop"
+SPILL = "spill"
+
+# Subida de un lote: (bucket, ruta, datos) por objeto -> None o la excepción de cada uno, en orden
+BatchUploader = Callable[[Sequence[Tuple[str, str, bytes]]], List[Optional[Exception]]]
+
+
+class UploadTask:
+    """Objeto pendiente de subir"""
+
+    __slots__ = ("bucket_name", "file_path", "data", "enqueued_at", "on_success")
+
+    def __init__(
+        self,
+        bucket_name: str,
+        file_path: str,
+        data: bytes,
+        on_success: Optional[Callable[[], None]] = None,
+    ):
+        self.bucket_name = bucket_name
+        self.file_path = file_path
+        self.data = data
+        self.enqueued_at = time.monotonic()
+        self.on_success = on_success
+
+
+class UploadQueue:
+    """Cola acotada de subidas con workers, reintentos y desborde a disco"""
+
+    def __init__(
+        self,
+        uploader: Callable[[str, str, bytes], Any],
+        maxsize: int = 1000,
+        workers: int = 4,
+        batch_size: int = 1,
+        batch_uploader: Optional[BatchUploader] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        overflow_policy: str = SPILL,
+        spill_dir: Optional[str] = None,
+    ):
+        """
+        Inicializar cola
+
+        Args:
+            uploader: Función que sube (bucket, ruta, datos) a Storage
+            maxsize: Capacidad máxima de la cola
+            workers: Hilos de subida concurrentes
+            batch_size: Objetos que cada worker toma de la cola de una vez
+            batch_uploader: Función que sube un lote completo (por defecto se usa `uploader` objeto a objeto)
+            max_retries: Reintentos por objeto antes de darlo por fallido
+            backoff_base: Espera base en segundos del backoff exponencial
+            overflow_policy: "drop" o "spill" cuando la cola está llena o falla la subida
+            spill_dir: Directorio local para objetos desbordados
+        """
+        self._uploader = uploader
+        self._queue: "queue.Queue[Optional[UploadTask]]" = queue.Queue(maxsize=maxsize)
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self._batch_uploader = batch_uploader
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.overflow_policy = overflow_policy if spill_dir else DROP
+        self.spill_dir = spill_dir
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        # Lotes que los workers están subiendo, para desbordarlos si el apagado no espera
+        self._in_flight: Dict[int, List[UploadTask]] = {}
+        self._stats = {
+            "enqueued": 0,
+            "uploaded": 0,
+            "batches": 0,
+            "failed": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "retries": 0,
+        }
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    def start(self) -> None:
+        """Arrancar los workers y reencolar lo desbordado en ejecuciones anteriores"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"upload-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self._recover_spilled()
+
+    def enqueue(
+        self,
+        bucket_name: str,
+        file_path: str,
+        data: bytes,
+        on_success: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """
+        Encolar una subida sin bloquear
+
+        Args:
+            bucket_name: Nombre del bucket
+            file_path: Ruta del archivo en el bucket
+            data: Contenido del archivo
+            on_success: Callback tras una subida exitosa
+
+        Returns:
+            True si se encoló, False si se descartó o desbordó a disco
+        """
+        if not self._threads:
+            self.start()
+        task = UploadTask(bucket_name, file_path, data, on_success)
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            self._overflow(task, reason="cola llena")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def _take_batch(self) -> Tuple[List[UploadTask], bool]:
+        """Esperar una tarea y añadir las ya encoladas hasta `batch_size` (True si llegó la señal de parada)"""
+        tasks: List[UploadTask] = []
+        task = self._queue.get()
+        while task is not None:
+            tasks.append(task)
+            if len(tasks) >= self.batch_size:
+                return tasks, False
+            try:
+                task = self._queue.get_nowait()
+            except queue.Empty:
+                return tasks, False
+        return tasks, True
+
+    def _work(self) -> None:
+        worker = threading.get_ident()
+        while True:
+            tasks, stop = self._take_batch()
+            try:
+                if tasks:
+                    in_flight = list(tasks)
+                    with self._lock:
+                        self._in_flight[worker] = in_flight
+                    self._upload_batch(tasks, in_flight)
+            finally:
+                with self._lock:
+                    self._in_flight.pop(worker, None)
+                for _ in range(len(tasks) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _send(self, tasks: List[UploadTask]) -> List[Optional[Exception]]:
+        """Subir un lote y devolver el error de cada objeto (None si se subió)"""
+        if self._batch_uploader is not None and len(tasks) > 1:
+            self._count("batches")
+            try:
+                return self._batch_uploader([(t.bucket_name, t.file_path, t.data) for t in tasks])
+            except Exception as e:
+                return [e] * len(tasks)
+        errors: List[Optional[Exception]] = []
+        for task in tasks:
+            try:
+                self._uploader(task.bucket_name, task.file_path, task.data)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+    def _settle(self, in_flight: List[UploadTask], task: UploadTask) -> None:
+        with self._lock:
+            in_flight.remove(task)
+
+    def _upload_batch(self, tasks: List[UploadTask], in_flight: List[UploadTask]) -> None:
+        for attempt in range(self.max_retries + 1):
+            failed = []
+            for task, error in zip(tasks, self._send(tasks)):
+                if error is None:
+                    self._settle(in_flight, task)
+                    self._uploaded(task)
+                else:
+                    failed.append((task, error))
+            if not failed:
+                return
+            if attempt == self.max_retries:
+                for task, error in failed:
+                    self._settle(in_flight, task)
+                    logger.error(f"❌ Subida fallida tras {attempt + 1} intentos: {task.file_path}: {str(error)}")
+                    self._count("failed")
+                    self._overflow(task, reason="subida fallida")
+                return
+            # Solo se reintentan los objetos que fallaron
+            tasks = [task for task, _ in failed]
+            self._count("retries", len(tasks))
+            time.sleep(self.backoff_base * (2 ** attempt))
+
+    def _uploaded(self, task: UploadTask) -> None:
+        lag = time.monotonic() - task.enqueued_at
+        with self._lock:
+            self._stats["uploaded"] += 1
+            self._last_lag = lag
+            self._max_lag = max(self._max_lag, lag)
+        if task.on_success is not None:
+            try:
+                task.on_success()
+            except Exception as e:
+                logger.warning(f"⚠️ Error en callback de subida: {str(e)}")
+
+    def _spill_path(self, task: UploadTask) -> str:
+        return os.path.join(self.spill_dir, task.bucket_name, task.file_path)
+
+    def _overflow(self, task: UploadTask, reason: str) -> None:
+        if self.overflow_policy == SPILL:
+            path = self._spill_path(task)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(task.data)
+                self._count("spilled")
+                logger.warning(f"⚠️ Subida guardada en disco ({reason}): {path}")
+                return
+            except OSError as e:
+                logger.error(f"❌ No se pudo guardar en disco: {path}: {str(e)}")
+        self._count("dropped")
+        logger.warning(f"⚠️ Subida descartada ({reason}): gs://{task.bucket_name}/{task.file_path}")
+
+    def _recover_spilled(self) -> None:
+        """Reencolar objetos guardados en disco mientras haya capacidad"""
+        if self.overflow_policy != SPILL or not os.path.isdir(self.spill_dir):
+            return
+        for root, _, files in os.walk(self.spill_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                bucket_name, _, file_path = os.path.relpath(path, self.spill_dir).partition(os.sep)
+                with open(path, "rb") as f:
+                    data = f.read()
+                task = UploadTask(bucket_name, file_path.replace(os.sep, "/"), data, on_success=lambda p=path: os.remove(p))
+                try:
+                    self._queue.put_nowait(task)
+                except queue.Full:
+                    return
+                self._count("enqueued")
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Esperar a que se vacíe la cola y detener los workers
+
+        Lo que no alcanza a subirse, encolado o en curso, se desborda a disco
+        (o se descarta).
+
+        Args:
+            timeout: Segundos máximos de espera
+
+        Returns:
+            True si la cola quedó vacía
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        drained = self._queue.unfinished_tasks == 0
+
+        # Desbordar lo pendiente y detener los workers
+        while True:
+            try:
+                task = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                self._overflow(task, reason="apagado")
+            self._queue.task_done()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+
+        # Lotes que siguen subiéndose: se desbordan para no perderlos al terminar el proceso
+        # (si la subida termina después, el objeto recuperado se vuelve a subir sin efecto)
+        with self._lock:
+            in_flight = [task for tasks in self._in_flight.values() for task in tasks]
+        if in_flight:
+            logger.warning(f"⚠️ {len(in_flight)} subidas en curso al apagar")
+            for task in in_flight:
+                self._overflow(task, reason="apagado con subida en curso")
+        logger.info(f"🛑 Cola de subidas detenida (vacía: {drained})")
+        return drained
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidad de la cola, latencia de subida y contadores"""
+        with self._lock:
+            return {
+                "depth": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "workers": len(self._threads),
+                "last_lag_seconds": round(self._last_lag, 3),
+                "max_lag_seconds": round(self._max_lag, 3),
+                **self._stats,
+            }
+
+
+# Instancia global de la cola
+_upload_queue: Optional[UploadQueue] = None
+_upload_queue_lock = threading.Lock()
+
+
+def get_upload_queue() -> UploadQueue:
+    """Obtener cola de subidas (patrón Singleton)"""
+    global _upload_queue
+    if _upload_queue is None:
+        with _upload_queue_lock:
+            if _upload_queue is None:
+                from src.services.gcp_service import get_gcp_service
+
+                _upload_queue = UploadQueue(
+                    uploader=lambda bucket, path, data: get_gcp_service().upload_to_storage(bucket, path, data),
+                    maxsize=settings.upload_queue_maxsize,
+                    workers=settings.upload_workers,
+                    batch_size=settings.upload_batch_size,
+                    batch_uploader=lambda objects: get_gcp_service().upload_many_to_storage(objects),
+                    max_retries=settings.upload_max_retries,
+                    backoff_base=settings.upload_backoff_base,
+                    overflow_policy=settings.upload_overflow_policy,
+                    spill_dir=settings.upload_spill_dir or None,
+                )
+    return _upload_queue
+
+
+def shutdown_upload_queue() -> None:
+    """Drenar la cola global al apagar"""
+    global _upload_queue
+    with _upload_queue_lock:
+        upload_queue, _upload_queue = _upload_queue, None
+    if upload_queue is not None:
+        upload_queue.drain(settings.upload_drain_timeout)
@@ -0,0 +1,175 @@
+"""
+Detección del formato de audio a partir de los bytes de cabecera
+
+Speech-to-Text necesita la codificación y la frecuencia de muestreo del audio;
+si no coinciden con el contenido, el reconocimiento devuelve texto vacío o
+basura sin error. Aquí se lee solo la cabecera del contenedor (WAV, FLAC,
+Ogg, WebM o MP3) para elegir la `RecognitionConfig` correcta.
+"""
+import struct
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+# Frecuencias que Speech-to-Text acepta para Opus (Ogg y WebM)
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+OPUS_DEFAULT_RATE = 48000
+
+# Bytes de cabecera que se inspeccionan para WebM (CodecPrivate va al principio)
+WEBM_PROBE_BYTES = 4096
+
+# Frecuencias MPEG por versión (bits 19-20 de la cabecera de trama) e índice
+MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),  # MPEG-2.5
+}
+
+# Códigos de formato WAV (fmt chunk)
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class UnsupportedAudioFormat(ValueError):
+    """El audio no tiene un formato que Speech-to-Text pueda decodificar"""
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """Formato detectado de un audio"""
+    container: str  # wav, flac, ogg, webm, mp3 (también la extensión de archivo)
+    encoding: str  # Nombre de RecognitionConfig.AudioEncoding
+    sample_rate: int
+    channels: int = 1
+
+
+def _opus_head(data: bytes, offset: int) -> AudioFormat:
+    """Leer OpusHead (RFC 7845): canales en el byte 9 y frecuencia original en 12-15"""
+    if len(data) < offset + 16:
+        raise UnsupportedAudioFormat("Cabecera Opus incompleta")
+    channels = data[offset + 9]
+    input_rate = struct.unpack_from("<I", data, offset + 12)[0]
+    # Opus siempre decodifica a 48 kHz; la original solo sirve si Speech la admite
+    rate = input_rate if input_rate in OPUS_SAMPLE_RATES else OPUS_DEFAULT_RATE
+    return AudioFormat("ogg", "OGG_OPUS", rate, max(1, channels))
+
+
+def iter_riff_chunks(data: bytes) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    Recorrer los chunks de un WAV
+
+    Yields:
+        (id, offset del contenido, tamaño); el tamaño se recorta a los bytes
+        disponibles (grabadores en streaming dejan el tamaño de `data` a 0 o
+        al máximo)
+    """
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        if chunk_id == b"data" and size in (0, 0xFFFFFFFF):
+            size = len(data) - offset - 8
+        yield chunk_id, offset + 8, min(size, len(data) - offset - 8)
+        # Los chunks se alinean a tamaño par
+        offset += 8 + size + (size & 1)
+
+
+def _detect_wav(data: bytes) -> AudioFormat:
+    """Buscar el chunk `fmt ` y exigir PCM de 16 bits"""
+    for chunk_id, offset, size in iter_riff_chunks(data):
+        if chunk_id != b"fmt ":
+            continue
+        if size < 16:
+            break
+        code, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, offset)
+        if code == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+            # El código real va en los dos primeros bytes del GUID de subformato
+            code = struct.unpack_from("<H", data, offset + 24)[0]
+        if code != WAVE_FORMAT_PCM or bits != 16:
+            raise UnsupportedAudioFormat(f"WAV no soportado (formato {code}, {bits} bits); se requiere PCM de 16 bits")
+        if not channels or not rate:
+            raise UnsupportedAudioFormat(f"WAV con cabecera inválida ({channels} canales, {rate} Hz)")
+        return AudioFormat("wav", "LINEAR16", rate, channels)
+    raise UnsupportedAudioFormat("WAV sin chunk fmt")
+
+
+def _detect_flac(data: bytes, offset: int) -> AudioFormat:
+    """STREAMINFO es siempre el primer bloque de metadatos tras `fLaC`"""
+    info = offset + 8
+    if len(data) < info + 14 or data[offset + 4] & 0x7F != 0:
+        raise UnsupportedAudioFormat("FLAC sin STREAMINFO")
+    # 20 bits de frecuencia y 3 de canales - 1 tras los tamaños de bloque y trama
+    packed = int.from_bytes(data[info + 10:info + 13], "big")
+    return AudioFormat("flac", "FLAC", packed >> 4, ((packed >> 1) & 0x07) + 1)
+
+
+def _detect_ogg(data: bytes) -> AudioFormat:
+    """La primera página Ogg lleva la cabecera de identificación del códec"""
+    if len(data) < 27:
+        raise UnsupportedAudioFormat("Página Ogg incompleta")
+    payload = 27 + data[26]
+    if data[payload:payload + 8] == b"OpusHead":
+        return _opus_head(data, payload)
+    codec = data[payload:payload + 8].strip(b"\x00 \x01").decode("latin-1") or "desconocido"
+    raise UnsupportedAudioFormat(f"Ogg con códec {codec} no soportado; usa Opus")
+
+
+def _detect_webm(data: bytes) -> AudioFormat:
+    """WebM de MediaRecorder: se admite solo la pista Opus"""
+    head = data[:WEBM_PROBE_BYTES]
+    if b"A_OPUS" not in head:
+        raise UnsupportedAudioFormat("WebM sin pista Opus")
+    position = head.find(b"OpusHead")
+    if position < 0:
+        return AudioFormat("webm", "WEBM_OPUS", OPUS_DEFAULT_RATE)
+    opus = _opus_head(data, position)
+    return AudioFormat("webm", "WEBM_OPUS", opus.sample_rate, opus.channels)
+
+
+def _skip_id3(data: bytes) -> int:
+    """Saltar una etiqueta ID3v2 (tamaño synchsafe de 28 bits, pie opcional)"""
+    if not data.startswith(b"ID3") or len(data) < 10:
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _detect_mp3(data: bytes, offset: int) -> Optional[AudioFormat]:
+    """Cabecera de trama MPEG Layer III (sincronía de 11 bits)"""
+    if len(data) < offset + 4 or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 0x03
+    layer = (data[offset + 1] >> 1) & 0x03
+    rate_index = (data[offset + 2] >> 2) & 0x03
+    if version not in MP3_SAMPLE_RATES or layer != 1 or rate_index == 3:
+        return None
+    channels = 1 if data[offset + 3] >> 6 == 3 else 2
+    return AudioFormat("mp3", "MP3", MP3_SAMPLE_RATES[version][rate_index], channels)
+
+
+def detect_audio_format(data: bytes) -> AudioFormat:
+    """
+    Detectar contenedor, códec y frecuencia de muestreo de un audio
+
+    Args:
+        data: Audio completo o al menos sus primeros KB
+
+    Returns:
+        Formato con la codificación de Speech-to-Text que le corresponde
+
+    Raises:
+        UnsupportedAudioFormat: Si el formato no se reconoce o Speech no lo admite
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return _detect_wav(data)
+    if data[:4] == b"OggS":
+        return _detect_ogg(data)
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return _detect_webm(data)
+
+    offset = _skip_id3(data)
+    if data[offset:offset + 4] == b"fLaC":
+        return _detect_flac(data, offset)
+    mp3 = _detect_mp3(data, offset)
+    if mp3 is not None:
+        return mp3
+    raise UnsupportedAudioFormat("Formato de audio no reconocido; usa WAV (PCM 16 bits), FLAC, Ogg Opus o MP3")
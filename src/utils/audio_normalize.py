@@ -0,0 +1,206 @@
+"""
+Normalización de audio PCM antes de Speech-to-Text
+
+Los WAV llegan de clientes distintos (navegadores a 44.1/48 kHz estéreo,
+el cliente de voz a 16 kHz mono) y con silencio al principio y al final,
+que Speech-to-Text factura igual que la voz. Aquí se convierte el audio a
+16 kHz mono y se recortan los extremos sin voz con una puerta de energía,
+todo vectorizado con NumPy.
+
+Las muestras se leen como vista sobre los bytes subidos; si el audio ya es
+16 kHz mono solo se recorta (un slice de la vista) y, si no hay nada que
+recortar, se envían los bytes originales sin copiarlos.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from math import gcd
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.utils.audio_format import AudioFormat, iter_riff_chunks
+
+# Frecuencia de reconocimiento (la óptima para Speech-to-Text)
+TARGET_RATE = 16000
+
+# Ventana de la puerta de energía
+FRAME_MS = 20
+
+# Filtro antialias: cruces por cero a cada lado (en la frecuencia menor) y beta de Kaiser
+FILTER_HALF_WIDTH = 16
+KAISER_BETA = 8.6
+
+# Salidas por bloque del resampler (acota la memoria temporal)
+RESAMPLE_BLOCK = 32768
+
+
+@dataclass(frozen=True)
+class NormalizedAudio:
+    """Audio listo para reconocer y lo que se hizo con él"""
+    content: bytes
+    audio_format: AudioFormat
+    original_seconds: float
+    seconds: float
+
+    @property
+    def has_voice(self) -> bool:
+        return self.seconds > 0
+
+
+def wav_samples(data: bytes, channels: int) -> np.ndarray:
+    """
+    Muestras int16 del chunk `data` como vista (sin copia) de forma (n, canales)
+
+    Raises:
+        ValueError: Si el WAV no tiene chunk `data`
+    """
+    for chunk_id, offset, size in iter_riff_chunks(data):
+        if chunk_id == b"data":
+            frames = size // (2 * channels)
+            return np.frombuffer(data, dtype="<i2", count=frames * channels, offset=offset).reshape(frames, channels)
+    raise ValueError("WAV sin chunk data")
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """Mono a partir de (n, canales); con un canal devuelve la vista tal cual"""
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def voiced_span(
+    samples: np.ndarray,
+    sample_rate: int,
+    threshold_dbfs: float,
+    padding_ms: int,
+) -> Tuple[int, int]:
+    """
+    Tramo [inicio, fin) entre la primera y la última ventana con voz
+
+    Args:
+        samples: Audio mono (int16 o float en escala int16)
+        sample_rate: Frecuencia de muestreo
+        threshold_dbfs: Energía RMS mínima de una ventana con voz
+        padding_ms: Margen que se conserva antes y después de la voz
+
+    Returns:
+        (inicio, fin) en muestras; (0, 0) si no hay voz
+    """
+    frame = max(1, sample_rate * FRAME_MS // 1000)
+    count = len(samples) // frame
+    if count == 0:
+        return (0, len(samples)) if len(samples) else (0, 0)
+    frames = samples[:count * frame].reshape(count, frame)
+    # Suma de cuadrados por ventana en float64 sin materializar el audio convertido
+    energy = np.einsum("ij,ij->i", frames, frames, dtype=np.float64, casting="unsafe")
+    threshold = frame * (32768.0 * 10 ** (threshold_dbfs / 20)) ** 2
+    voiced = np.flatnonzero(energy >= threshold)
+    if voiced.size == 0:
+        return 0, 0
+    padding = sample_rate * padding_ms // 1000
+    start = max(0, voiced[0] * frame - padding)
+    end = min(len(samples), (voiced[-1] + 1) * frame + padding)
+    return int(start), int(end)
+
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int) -> np.ndarray:
+    """Filtro paso bajo (sinc con ventana de Kaiser) repartido en `up` fases: (up, taps)"""
+    factor = max(up, down)
+    length = 2 * FILTER_HALF_WIDTH * factor + 1
+    center = (length - 1) / 2
+    n = np.arange(length)
+    taps = np.sinc((n - center) / factor) / factor * up * np.kaiser(length, KAISER_BETA)
+    # Completar hasta múltiplo de `up`; la fase r son los coeficientes r, r+up, r+2up...
+    taps = np.concatenate([taps, np.zeros(-length % up)])
+    return np.ascontiguousarray(taps.reshape(-1, up).T, dtype=np.float32)
+
+
+def resample_poly(samples: np.ndarray, up: int, down: int) -> np.ndarray:
+    """
+    Remuestrear por up/down con un filtro polifásico
+
+    Cada salida n es el producto escalar de una fase del filtro con una
+    ventana de la entrada. Las salidas con la misma fase están separadas
+    `down` muestras en la entrada, así que se calculan juntas como una matriz
+    de ventanas (vista con strides, sin copiar la entrada) por la fase.
+
+    Args:
+        samples: Audio mono
+        up: Factor de interpolación
+        down: Factor de diezmado
+
+    Returns:
+        Audio float32 de longitud ceil(len * up / down)
+    """
+    divisor = gcd(up, down)
+    up, down = up // divisor, down // divisor
+    x = np.asarray(samples, dtype=np.float32)
+    if up == down == 1:
+        return x
+    phases = _polyphase_filter(up, down)
+    width = phases.shape[1]
+    delay = (2 * FILTER_HALF_WIDTH * max(up, down)) // 2
+    total = -(-len(x) * up // down)
+
+    # Relleno para que las ventanas de los extremos existan
+    padded = np.concatenate([np.zeros(width, np.float32), x, np.zeros(width + down, np.float32)])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, width)
+    reversed_phases = phases[:, ::-1]
+
+    out = np.zeros(total, dtype=np.float32)
+    for first in range(min(up, total)):
+        # Salidas first, first + up, ...: la posición en la señal interpolada avanza up * down
+        position = first * down + delay
+        phase = position % up
+        # x[base - j] para j = 0..width-1 es la ventana que empieza en base - width + 1 (+ relleno)
+        start = position // up + 1
+        count = len(range(first, total, up))
+        rows = windows[start::down]
+        for block in range(0, count, RESAMPLE_BLOCK):
+            block_rows = rows[block:block + RESAMPLE_BLOCK][:count - block]
+            out[first + block * up:total:up][:len(block_rows)] = block_rows @ reversed_phases[phase]
+    return out
+
+
+def normalize_audio(
+    data: bytes,
+    audio_format: AudioFormat,
+    threshold_dbfs: float,
+    padding_ms: int,
+) -> Optional[NormalizedAudio]:
+    """
+    Convertir un WAV PCM16 a 16 kHz mono sin los silencios de los extremos
+
+    Args:
+        data: WAV completo tal como se subió
+        audio_format: Formato detectado (ver detect_audio_format)
+        threshold_dbfs: Energía mínima de voz de la puerta
+        padding_ms: Margen alrededor de la voz
+
+    Returns:
+        Audio normalizado (LINEAR16 sin cabecera o los bytes originales), o
+        None si el formato no es PCM (FLAC, Opus y MP3 van comprimidos y se
+        envían tal cual)
+    """
+    if audio_format.encoding != "LINEAR16":
+        return None
+    samples = wav_samples(data, audio_format.channels)
+    rate = audio_format.sample_rate
+    original_seconds = len(samples) / rate
+    mono = downmix(samples)
+
+    # Recortar antes de remuestrear: se procesa solo la voz
+    start, end = voiced_span(mono, rate, threshold_dbfs, padding_ms)
+    target = AudioFormat("wav", "LINEAR16", TARGET_RATE, 1)
+    if start == end:
+        return NormalizedAudio(b"", target, original_seconds, 0.0)
+    if rate == TARGET_RATE and mono.dtype == np.int16:
+        if (start, end) == (0, len(mono)):
+            # Nada que cambiar: los bytes originales, cabecera incluida
+            return NormalizedAudio(data, audio_format, original_seconds, original_seconds)
+        voice = mono[start:end]
+    else:
+        voice = resample_poly(mono[start:end], TARGET_RATE, rate)
+        voice = np.clip(np.rint(voice), -32768, 32767).astype("<i2")
+    return NormalizedAudio(voice.tobytes(), target, original_seconds, len(voice) / TARGET_RATE)
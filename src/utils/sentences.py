@@ -0,0 +1,41 @@
+"""
+Segmentación incremental de texto en oraciones
+"""
+import re
+from typing import Iterable, Iterator
+
+# Fin de oración: signo de cierre seguido de espacio
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+# Oraciones más cortas se agrupan con la siguiente para no sintetizar fragmentos sueltos
+MIN_SENTENCE_LENGTH = 20
+
+
+def iter_sentences(chunks: Iterable[str], min_length: int = MIN_SENTENCE_LENGTH) -> Iterator[str]:
+    """
+    Cortar un stream de texto en oraciones completas a medida que llegan
+
+    Args:
+        chunks: Fragmentos de texto en orden (p. ej. stream de Gemini)
+        min_length: Longitud mínima de cada oración emitida
+
+    Yields:
+        Oraciones completas; el resto se emite al final del stream
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        parts = SENTENCE_END.split(buffer)
+        # La última parte puede ser una oración incompleta
+        buffer = parts.pop()
+        pending = ""
+        for part in parts:
+            pending = f"{pending} {part}" if pending else part
+            if len(pending) >= min_length:
+                yield pending.strip()
+                pending = ""
+        if pending:
+            buffer = f"{pending} {buffer}" if buffer else pending
+
+    if buffer.strip():
+        yield buffer.strip()
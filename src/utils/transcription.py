@@ -0,0 +1,43 @@
+"""
+Utilidades para normalizar transcripciones de voz
+"""
+
+# Palabras que indican una pregunta
+QUESTION_STARTERS = [
+    'qué', 'como', 'cómo', 'cuándo', 'cuando', 'dónde', 'donde',
+    'cuál', 'cual', 'por qué', 'por que', 'quién', 'quien',
+    'puedo', 'podés', 'podemos', 'necesito', 'necesitamos',
+    'cómo se', 'como se', 'cuál es', 'cual es'
+]
+
+
+def clean_transcription(text: str) -> str:
+    """
+    Limpiar y normalizar transcripción con detección de intención
+
+    Args:
+        text: Texto transcrito
+
+    Returns:
+        Texto capitalizado y con puntuación final
+    """
+    text = text.strip()
+    if not text:
+        return ""
+
+    # Capitalizar primera letra
+    text = text[0].upper() + text[1:] if len(text) > 1 else text.upper()
+
+    text_lower = text.lower()
+    is_question = (
+        any(text_lower.startswith(q) for q in QUESTION_STARTERS) or
+        "?" in text or
+        text_lower.startswith("ayuda") or
+        text_lower.startswith("help")
+    )
+
+    # Agregar puntuación si no la tiene
+    if not text.endswith(('.', '?', '!', ',')):
+        text += '?' if is_question else '.'
+
+    return text
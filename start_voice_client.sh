@@ -67,6 +67,14 @@ if [ ! -f "$GOOGLE_APPLICATION_CREDENTIALS" ]; then
 fi
 echo "✅ Credenciales OK"
 
+# Verificar dependencias del cliente
+if ! python -c "import sounddevice, soundfile, websockets, requests" > /dev/null 2>&1; then
+    echo "❌ Faltan dependencias del cliente de voz"
+    echo "   Instálalas con: pip install -r requirements-client.txt"
+    exit 1
+fi
+echo "✅ Dependencias OK"
+
 echo ""
 echo "=================================="
 echo "✅ Todo listo. Iniciando cliente..."
@@ -77,4 +85,4 @@ echo ""
 python voice_client.py
 
 # Cleanup
-trap "echo 'Limpiando...'; pkill -f 'ffplay' || true; exit 0" EXIT
+trap "echo 'Limpiando...'; exit 0" EXIT
@@ -0,0 +1,250 @@
+"""
+Tests para la ingesta de exportaciones de Cloud Asset Inventory
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.config import settings
+from src.main import app
+from src.services.asset_inventory import LocalObjectStore, analyze_export, map_asset
+from src.services.gcp_service import GCPService
+from src.services.governance_incremental import IncrementalGovernanceAnalyzer
+from src.services.governance_service import RiskLevel
+
+BUCKET = "exports-bucket"
+EXPORT_PATH = "assets/2024-01-01.json"
+
+ASSETS = [
+    {
+        "name": "//storage.googleapis.com/public-bucket",
+        "asset_type": "storage.googleapis.com/Bucket",
+        "resource": {"data": {"versioning": {"enabled": True}, "lifecycle": {"rule": [{"action": {}}]}, "logging": {"logBucket": "logs"}}},
+        "iam_policy": {"bindings": [{"role": "roles/storage.objectViewer", "members": ["allUsers"]}]},
+    },
+    {
+        "name": "//cloudresourcemanager.googleapis.com/projects/123",
+        "asset_type": "cloudresourcemanager.googleapis.com/Project",
+        "iam_policy": {
+            "bindings": [
+                {"role": "roles/owner", "members": ["user:a@example.com", "serviceAccount:ci@p.iam.gserviceaccount.com"]},
+                {"role": "projects/p/roles/deployer", "members": ["user:a@example.com"]},
+            ],
+            "auditConfigs": [{"service": "allServices"}],
+        },
+    },
+    {
+        "name": "//container.googleapis.com/projects/p/locations/us-central1/clusters/prod",
+        "asset_type": "container.googleapis.com/Cluster",
+        "resource": {"data": {"legacyAbac": {"enabled": True}, "networkPolicy": {"enabled": True}, "loggingService": "logging.googleapis.com/kubernetes"}},
+    },
+    {
+        "name": "//compute.googleapis.com/projects/p/zones/us-central1-a/instances/vm-1",
+        "asset_type": "compute.googleapis.com/Instance",
+        "resource": {"data": {
+            "name": "vm-1",
+            "labels": {"env": "dev", "goog-ops-agent-policy": "v2"},
+            "disks": [{"licenses": ["https://www.googleapis.com/compute/v1/projects/debian-cloud/global/licenses/debian-12"]}],
+            "scheduling": {"provisioningModel": "SPOT"},
+            "metadata": {"items": [{"key": "startup-script", "value": "x"}, {"key": "shutdown-script", "value": "y"}]},
+        }},
+    },
+    {
+        "name": "//pubsub.googleapis.com/projects/p/topics/t",
+        "asset_type": "pubsub.googleapis.com/Topic",
+        "resource": {"data": {}},
+    },
+]
+
+
+@pytest.fixture
+def export_root(tmp_path):
+    """Bucket local con una exportación NDJSON"""
+    path = tmp_path / BUCKET / EXPORT_PATH
+    path.parent.mkdir(parents=True)
+    lines = [json.dumps(asset) for asset in ASSETS] + ["{truncado"]
+    path.write_text("\n".join(lines) + "\n")
+    return tmp_path
+
+
+def test_map_asset_shapes():
+    """Test cada tipo de activo se convierte al formato de GovernanceService"""
+    bucket, project, cluster, instance, topic = (map_asset(asset) for asset in ASSETS)
+
+    assert bucket["resource_type"] == "storage"
+    assert bucket["resource_data"]["is_public"] is True
+    assert bucket["resource_data"]["versioning_enabled"] is True
+    assert project["resource_type"] == "iam"
+    assert project["resource_data"]["bindings"]["user:a@example.com"] == ["roles/owner", "projects/p/roles/deployer"]
+    assert project["resource_data"]["service_accounts"] == ["serviceAccount:ci@p.iam.gserviceaccount.com"]
+    assert project["resource_data"]["uses_custom_roles"] is True
+    assert cluster["resource_data"]["rbac_enabled"] is False
+    assert instance["resource_type"] == "compute"
+    assert instance["resource_data"]["managed_image"] is True
+    assert instance["resource_data"]["preemptible"] is True
+    assert topic is None
+
+
+def test_analyze_export_streams_from_local_bucket(export_root):
+    """Test pipeline completo leyendo por fragmentos pequeños del bucket local"""
+    async def run():
+        return [
+            record
+            async for record in analyze_export(
+                EXPORT_PATH,
+                BUCKET,
+                source=LocalObjectStore(str(export_root)).iter_chunks,
+                chunk_size=64,
+                analyzer=IncrementalGovernanceAnalyzer(max_entries=100, max_changes=100),
+            )
+        ]
+
+    records = asyncio.run(run())
+    results = {r["resource_type"]: r for r in records if r["type"] == "result"}
+    summary = records[-1]
+
+    assert results["storage"]["risk_level"] == RiskLevel.CRITICAL
+    assert results["gke"]["risk_level"] == RiskLevel.CRITICAL
+    assert results["compute"]["findings"] == []
+    assert summary["type"] == "summary"
+    assert summary["total_resources"] == 4
+    assert summary["errors"] == 1
+    assert summary["source"] == f"gs://{BUCKET}/{EXPORT_PATH}"
+    assert summary["ingestion"]["assets"] == 6
+    assert summary["ingestion"]["mapped"] == 4
+    assert summary["ingestion"]["skipped"] == 1
+    assert summary["ingestion"]["bytes"] == (export_root / BUCKET / EXPORT_PATH).stat().st_size
+
+
+def split_content_types(assets):
+    """Líneas RESOURCE e IAM_POLICY separadas, como en las exportaciones reales"""
+    resources, policies = [], []
+    for asset in assets:
+        base = {"name": asset["name"], "asset_type": asset["asset_type"]}
+        if "resource" in asset:
+            resources.append({**base, "resource": asset["resource"]})
+        if "iam_policy" in asset:
+            policies.append({**base, "iam_policy": asset["iam_policy"]})
+    return resources, policies
+
+
+@pytest.mark.parametrize("separate_exports", [False, True])
+def test_analyze_export_merges_split_content_types(tmp_path, separate_exports):
+    """Test el bucket público se detecta aunque su política IAM llegue en otra línea u otra exportación"""
+    resources, policies = split_content_types(ASSETS)
+    if separate_exports:
+        paths = {"resources.json": resources, "iam.json": policies}
+    else:
+        paths = {"assets.json": policies[:1] + resources + policies[1:]}
+    for name, assets in paths.items():
+        path = tmp_path / BUCKET / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text("\n".join(json.dumps(asset) for asset in assets))
+
+    async def run():
+        return [
+            record
+            async for record in analyze_export(
+                list(paths),
+                BUCKET,
+                source=LocalObjectStore(str(tmp_path)).iter_chunks,
+                chunk_size=64,
+                analyzer=IncrementalGovernanceAnalyzer(max_entries=100, max_changes=100),
+            )
+        ]
+
+    records = asyncio.run(run())
+    results = [r for r in records if r["type"] == "result"]
+    storage = [r for r in results if r["resource_type"] == "storage"]
+    summary = records[-1]
+
+    assert len(storage) == 1
+    assert storage[0]["resource_id"] == "//storage.googleapis.com/public-bucket"
+    assert storage[0]["risk_level"] == RiskLevel.CRITICAL
+    assert summary["errors"] == 0
+    assert summary["total_resources"] == 4
+    assert summary["ingestion"]["merged"] == 1
+    assert summary["source"] == [f"gs://{BUCKET}/{name}" for name in paths]
+
+
+def test_local_object_store_rejects_paths_outside_root(tmp_path):
+    """Test el almacén local no lee fuera de su raíz"""
+    store = LocalObjectStore(str(tmp_path / "root"))
+
+    for bucket, path in [(BUCKET, "../../etc/passwd"), ("..", "secreto.json"), (BUCKET, "/etc/passwd"), (BUCKET, "a\\..\\..\\b")]:
+        with pytest.raises(ValueError):
+            store.object_path(bucket, path)
+    assert store.object_path(BUCKET, EXPORT_PATH) == str(tmp_path / "root" / BUCKET / EXPORT_PATH)
+
+
+def test_asset_inventory_endpoint_uses_local_root(export_root, monkeypatch):
+    """Test endpoint con el bucket sustituido por un directorio local"""
+    monkeypatch.setattr(settings, "asset_inventory_local_root", str(export_root))
+    monkeypatch.setattr(settings, "storage_bucket", BUCKET)
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/v1/governance/asset-inventory",
+        json={"object_path": EXPORT_PATH, "include_results": False},
+    )
+
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert not any(r["type"] == "result" for r in records)
+    assert records[-1]["type"] == "summary"
+    assert records[-1]["total_resources"] == 4
+
+
+def test_asset_inventory_endpoint_ignores_bucket_override(export_root, monkeypatch):
+    """Test el endpoint solo lee del bucket configurado"""
+    monkeypatch.setattr(settings, "asset_inventory_local_root", str(export_root))
+    monkeypatch.setattr(settings, "storage_bucket", "otro-bucket")
+    client = TestClient(app)
+
+    response = client.post("/api/v1/governance/asset-inventory", json={"object_path": EXPORT_PATH, "bucket": BUCKET})
+
+    assert json.loads(response.text.splitlines()[-1])["type"] == "error"
+
+
+def test_asset_inventory_endpoint_reports_missing_object(tmp_path, monkeypatch):
+    """Test una exportación inexistente termina con un registro de error"""
+    monkeypatch.setattr(settings, "asset_inventory_local_root", str(tmp_path))
+    client = TestClient(app)
+
+    response = client.post("/api/v1/governance/asset-inventory", json={"object_path": "no-existe.json"})
+
+    assert json.loads(response.text.splitlines()[-1])["type"] == "error"
+
+
+def test_gcp_iter_download_uses_ranged_reads():
+    """Test la descarga por fragmentos pide rangos inclusivos de la misma generación"""
+    data = bytes(range(250))
+    calls = []
+
+    class FakeBlob:
+        size = len(data)
+        generation = 7
+
+        def download_as_bytes(self, start, end, if_generation_match):
+            calls.append((start, end, if_generation_match))
+            return data[start:end + 1]
+
+    class FakeBucket:
+        def get_blob(self, path):
+            return FakeBlob()
+
+    class FakeStorageClient:
+        def bucket(self, name):
+            return FakeBucket()
+
+    service = GCPService.__new__(GCPService)
+    service.storage_client = FakeStorageClient()
+
+    assert b"".join(service.iter_download("b", "p", 100)) == data
+    assert calls == [(0, 99, 7), (100, 199, 7), (200, 249, 7)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,178 @@
+"""
+Tests de carga para la fachada asíncrona de GCP
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from src.services.async_gcp_service import AsyncGCPService, LLM, TTS
+
+
+UPSTREAM_LATENCY = 0.05
+CONCURRENT_REQUESTS = 16
+
+
+class SlowGCPService:
+    """Servicio GCP simulado con latencia fija por llamada"""
+
+    def __init__(self, latency: float = UPSTREAM_LATENCY):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self, result):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        return result
+
+    def get_ai_recommendation(self, prompt: str, stream: bool = False, profile: str = "voice") -> str:
+        return self._call(f"respuesta: {prompt}")
+
+    def synthesize_speech(self, text: str, language_code: str = "es-ES") -> bytes:
+        return self._call(b"mp3")
+
+    def streaming_transcribe(self, audio_chunks, language_code="es-ES", sample_rate=16000):
+        total = 0
+        for chunk in audio_chunks:
+            total += len(chunk)
+            yield {"type": "interim", "transcript": f"{total} bytes"}
+        yield {"type": "final", "transcript": f"{total} bytes"}
+
+
+def _throughput(llm_limit: int) -> float:
+    """Consultas por segundo con un límite de concurrencia dado"""
+    fake = SlowGCPService()
+    facade = AsyncGCPService(service=fake, max_workers=CONCURRENT_REQUESTS, limits={LLM: llm_limit})
+
+    async def load():
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            facade.get_ai_recommendation(f"pregunta {i}") for i in range(CONCURRENT_REQUESTS)
+        ))
+        return time.perf_counter() - start
+
+    try:
+        elapsed = asyncio.run(load())
+    finally:
+        facade.shutdown()
+    assert fake.max_in_flight <= llm_limit
+    return CONCURRENT_REQUESTS / elapsed
+
+
+def test_throughput_scales_with_concurrency_limit():
+    """Test el throughput crece con el límite de concurrencia bajo latencia simulada"""
+    sequential = _throughput(llm_limit=1)
+    concurrent = _throughput(llm_limit=CONCURRENT_REQUESTS)
+
+    assert concurrent > sequential * 4, (
+        f"limit=1 {sequential:.1f} req/s, limit={CONCURRENT_REQUESTS} {concurrent:.1f} req/s"
+    )
+
+
+def test_concurrency_limit_is_per_upstream():
+    """Test el límite de un upstream no frena a los demás"""
+    fake = SlowGCPService()
+    facade = AsyncGCPService(service=fake, max_workers=8, limits={LLM: 1, TTS: 4})
+
+    async def load():
+        return await asyncio.gather(
+            facade.get_ai_recommendation("a"),
+            *(facade.synthesize_speech(f"t{i}") for i in range(4)),
+        )
+
+    try:
+        start = time.perf_counter()
+        results = asyncio.run(load())
+        elapsed = time.perf_counter() - start
+    finally:
+        facade.shutdown()
+
+    assert results[0] == "respuesta: a"
+    assert results[1:] == [b"mp3"] * 4
+    assert elapsed < UPSTREAM_LATENCY * 3
+
+
+def test_event_loop_not_blocked():
+    """Test el event loop sigue respondiendo mientras hay llamadas lentas en curso"""
+    fake = SlowGCPService(latency=0.2)
+    facade = AsyncGCPService(service=fake, max_workers=2, limits={LLM: 2})
+
+    async def load():
+        call = asyncio.ensure_future(facade.get_ai_recommendation("lenta"))
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        tick = time.perf_counter() - start
+        await call
+        return tick
+
+    try:
+        tick = asyncio.run(load())
+    finally:
+        facade.shutdown()
+
+    assert tick < 0.1
+
+
+def test_streaming_transcribe_bridges_thread_to_event_loop():
+    """Test el stream síncrono se consume desde el event loop fragmento a fragmento"""
+    facade = AsyncGCPService(service=SlowGCPService(), max_workers=2)
+
+    async def frames():
+        for _ in range(3):
+            yield b"\x00" * 10
+            await asyncio.sleep(0)
+
+    async def collect():
+        return [event async for event in facade.streaming_transcribe(frames())]
+
+    try:
+        events = asyncio.run(collect())
+    finally:
+        facade.shutdown()
+
+    assert [e["type"] for e in events] == ["interim"] * 3 + ["final"]
+    assert events[-1]["transcript"] == "30 bytes"
+
+
+def test_iterate_bounds_buffer_and_stops_when_consumer_leaves():
+    """Test el productor no se adelanta más de max_buffered y se cierra al abandonar el consumo"""
+    facade = AsyncGCPService(service=SlowGCPService(), max_workers=2)
+    produced = []
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                produced.append(len(produced))
+                yield produced[-1]
+        finally:
+            closed.set()
+
+    async def take_three():
+        taken = []
+        stream = facade.iterate(LLM, endless, max_buffered=4)
+        async for item in stream:
+            taken.append(item)
+            if len(taken) == 3:
+                await asyncio.sleep(0.05)
+                assert len(produced) <= 3 + 4 + 1
+                break
+        await stream.aclose()
+        return taken
+
+    try:
+        assert asyncio.run(take_three()) == [0, 1, 2]
+        assert closed.wait(1)
+    finally:
+        facade.shutdown()
+    assert len(produced) <= 3 + 4 + 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,110 @@
+"""
+Tests para la detección del formato de audio subido
+"""
+import io
+import struct
+import wave
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.routers import voice
+from src.services.gcp_service import GCPService
+from src.utils.audio_format import AudioFormat, UnsupportedAudioFormat, detect_audio_format
+from tests.test_voice import FakeAsyncGCPService, FakeUploadQueue, wav_bytes
+
+
+def flac_bytes(sample_rate=16000, channels=1, bits=16):
+    """Cabecera FLAC con STREAMINFO (sin tramas)"""
+    packed = sample_rate << 44 | (channels - 1) << 41 | (bits - 1) << 36
+    info = struct.pack(">HH", 4096, 4096) + bytes(6) + packed.to_bytes(8, "big") + bytes(16)
+    return b"fLaC" + bytes([0x80]) + len(info).to_bytes(3, "big") + info
+
+
+def ogg_bytes(head):
+    """Primera página Ogg con un único segmento"""
+    return b"OggS" + bytes(22) + bytes([1, len(head)]) + head
+
+
+def opus_head(input_rate, channels=1):
+    """Cabecera de identificación Opus (RFC 7845)"""
+    return b"OpusHead" + bytes([1, channels]) + struct.pack("<HIhB", 312, input_rate, 0, 0)
+
+
+def test_detects_supported_containers():
+    """Test WAV, FLAC, Ogg Opus, WebM Opus y MP3 con su frecuencia"""
+    assert detect_audio_format(wav_bytes(8000)) == AudioFormat("wav", "LINEAR16", 8000)
+    assert detect_audio_format(flac_bytes(44100, channels=2)) == AudioFormat("flac", "FLAC", 44100, 2)
+    assert detect_audio_format(ogg_bytes(opus_head(16000))) == AudioFormat("ogg", "OGG_OPUS", 16000)
+    # Una frecuencia original que Speech no admite se decodifica a 48 kHz
+    assert detect_audio_format(ogg_bytes(opus_head(44100, 2))) == AudioFormat("ogg", "OGG_OPUS", 48000, 2)
+    webm = b"\x1a\x45\xdf\xa3" + bytes(40) + b"A_OPUS" + bytes(8) + opus_head(48000)
+    assert detect_audio_format(webm) == AudioFormat("webm", "WEBM_OPUS", 48000)
+
+    frame = bytes([0xFF, 0xF3, 0x44, 0xC4])  # MPEG-2 Layer III, 24 kHz, mono
+    id3 = b"ID3" + bytes([4, 0, 0, 0, 0, 1, 0]) + bytes(128)
+    assert detect_audio_format(id3 + frame) == AudioFormat("mp3", "MP3", 24000)
+    assert detect_audio_format(bytes([0xFF, 0xFB, 0x90, 0x44])) == AudioFormat("mp3", "MP3", 44100, 2)
+
+
+def test_rejects_undecodable_audio():
+    """Test formatos que Speech-to-Text decodificaría mal"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(1)
+        writer.setframerate(16000)
+        writer.writeframes(bytes(160))
+    vorbis = ogg_bytes(b"\x01vorbis" + bytes(22))
+    header = wav_bytes()
+    no_channels = header[:22] + bytes(2) + header[24:]
+    no_rate = header[:24] + bytes(4) + header[28:]
+
+    for data in (buffer.getvalue(), vorbis, no_channels, no_rate, b"RIFF-audio", b"\xff\xf1\x50\x80", b"texto"):
+        with pytest.raises(UnsupportedAudioFormat):
+            detect_audio_format(data)
+
+
+def test_transcribe_uses_detected_encoding():
+    """Test GCPService pasa la codificación y la frecuencia de la cabecera"""
+    service = GCPService.__new__(GCPService)
+    configs = []
+
+    def recognize(config, audio):
+        configs.append(config)
+        alternative = SimpleNamespace(transcript="hola")
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative])])
+
+    service.speech_client = SimpleNamespace(recognize=recognize)
+
+    assert service.transcribe_audio(flac_bytes(48000)) == "hola"
+    service.transcribe_audio(ogg_bytes(opus_head(16000)), "en-US")
+
+    assert (configs[0].encoding.name, configs[0].sample_rate_hertz) == ("FLAC", 48000)
+    assert (configs[1].encoding.name, configs[1].sample_rate_hertz) == ("OGG_OPUS", 16000)
+    assert configs[1].language_code == "en-US"
+
+
+def test_transcribe_endpoint_detects_format(monkeypatch):
+    """Test /transcribe archiva con la extensión detectada y rechaza formatos desconocidos"""
+    fake = FakeAsyncGCPService()
+    fake.uploads = FakeUploadQueue()
+    monkeypatch.setattr(voice, "get_async_gcp_service", lambda: fake)
+    monkeypatch.setattr(voice, "get_upload_queue", lambda: fake.uploads)
+    client = TestClient(app)
+
+    res = client.post("/api/v1/voice/transcribe", files={"file": ("audio.flac", flac_bytes(), "audio/flac")})
+    assert res.status_code == 200
+    assert fake.audio_format == AudioFormat("flac", "FLAC", 16000)
+    assert fake.uploads.paths[0].endswith("_input.flac")
+
+    res = client.post("/api/v1/voice/transcribe", files={"file": ("audio.aac", b"\xff\xf1\x50\x80", "audio/aac")})
+    assert res.status_code == 415
+    assert client.post("/api/v1/voice/transcribe", files={"file": ("vacio.wav", b"", "audio/wav")}).status_code == 400
+    assert fake.calls == ["transcribe"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
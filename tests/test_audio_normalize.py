@@ -0,0 +1,106 @@
+"""
+Tests para la normalización de audio antes de Speech-to-Text
+"""
+import io
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.services.gcp_service import GCPService
+from src.utils.audio_format import AudioFormat, detect_audio_format
+from src.utils.audio_normalize import normalize_audio, resample_poly, voiced_span, wav_samples
+
+
+def wav(samples, sample_rate=16000):
+    """WAV PCM16 a partir de un array (n,) o (n, canales)"""
+    samples = np.asarray(samples, dtype=np.int16)
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def tone(seconds, sample_rate, frequency=440.0, amplitude=8000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return amplitude * np.sin(2 * np.pi * frequency * t)
+
+
+def padded_voice(sample_rate, silence=1.0, voice=0.5):
+    """Silencio, tono y silencio"""
+    gap = np.zeros(int(silence * sample_rate))
+    return np.concatenate([gap, tone(voice, sample_rate), gap])
+
+
+@pytest.mark.parametrize("rate", [8000, 22050, 44100, 48000])
+def test_resample_keeps_tone_and_removes_alias(rate):
+    """Test el tono en banda se conserva y lo que supera 8 kHz no se pliega"""
+    resampled = resample_poly(tone(1.0, rate, 1000), 16000, rate)
+    expected = tone(1.0, 16000, 1000)
+
+    assert len(resampled) == 16000
+    assert np.abs(resampled[200:-200] - expected[200:-200]).max() < 5
+    if rate > 16000:
+        assert np.abs(resample_poly(tone(1.0, rate, 10000), 16000, rate)[200:-200]).max() < 5
+
+
+def test_voiced_span_and_zero_copy_view():
+    """Test la puerta de energía y la lectura sin copia del chunk data"""
+    data = wav(padded_voice(16000))
+    samples = wav_samples(data, channels=1)
+
+    assert not samples.flags.owndata
+    assert voiced_span(samples[:, 0], 16000, threshold_dbfs=-45, padding_ms=100) == (14400, 25600)
+    assert voiced_span(np.zeros(16000, np.int16), 16000, threshold_dbfs=-45, padding_ms=100) == (0, 0)
+
+
+def test_normalize_browser_recording():
+    """Test un WAV estéreo de 48 kHz sale a 16 kHz mono y recortado"""
+    stereo = np.stack([padded_voice(48000), padded_voice(48000)], axis=1)
+    data = wav(stereo, 48000)
+
+    normalized = normalize_audio(data, detect_audio_format(data), threshold_dbfs=-45, padding_ms=100)
+
+    assert normalized.audio_format == AudioFormat("wav", "LINEAR16", 16000, 1)
+    assert normalized.original_seconds == pytest.approx(2.5)
+    assert normalized.seconds == pytest.approx(0.7)
+    assert len(normalized.content) == 2 * 11200
+    voice = np.frombuffer(normalized.content, dtype="<i2")
+    assert np.abs(voice).max() == pytest.approx(8000, abs=80)
+
+
+def test_normalize_passthrough_cases():
+    """Test 16 kHz mono sin silencios se envía tal cual y lo comprimido no se toca"""
+    data = wav(tone(1.0, 16000))
+    assert normalize_audio(data, detect_audio_format(data), -45, 100).content is data
+    assert normalize_audio(b"fLaC", AudioFormat("flac", "FLAC", 16000), -45, 100) is None
+
+
+def test_transcribe_skips_silence_and_sends_trimmed_audio():
+    """Test GCPService no llama a Speech sin voz y envía solo la voz a 16 kHz"""
+    service = GCPService.__new__(GCPService)
+    requests = []
+
+    def recognize(config, audio):
+        requests.append((config, audio))
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[SimpleNamespace(transcript="hola")])])
+
+    service.speech_client = SimpleNamespace(recognize=recognize)
+
+    assert service.transcribe_audio(wav(np.zeros(44100), 44100)) == ""
+    assert requests == []
+
+    assert service.transcribe_audio(wav(padded_voice(44100), 44100)) == "hola"
+    config, audio = requests[0]
+    assert (config.sample_rate_hertz, config.audio_channel_count) == (16000, 1)
+    # 0.5 s de voz más el margen por defecto, no los 2.5 s subidos
+    assert len(audio.content) < 2 * 16000 * 1.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
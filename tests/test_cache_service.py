@@ -0,0 +1,236 @@
+"""
+Tests para la caché de respuestas IA
+"""
+import pytest
+
+from src.config import settings
+from src.services.cache_service import (
+    AudioCache, LLMResponseCache, SemanticAnswerCache, TTLCache, normalize_question, question_vector,
+)
+
+
+class FakeClock:
+    """Reloj manual para controlar la expiración"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    """Test las entradas expiran al superar el TTL"""
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl=60, clock=clock)
+    cache.set("k", "v")
+
+    clock.now = 59
+    assert cache.get("k") == "v"
+    clock.now = 61
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test se expulsa la entrada menos usada al llenarse"""
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_make_key_normalizes_prompt():
+    """Test la clave ignora mayúsculas y espacios pero no la configuración del modelo"""
+    base = ("gemini-2.0-flash", 0.7, 1024, "sistema")
+    key = LLMResponseCache.make_key("Qué es  Kubernetes?", *base)
+
+    assert key == LLMResponseCache.make_key("  qué es kubernetes? ", *base)
+    assert key != LLMResponseCache.make_key("Qué es Kubernetes?", "gemini-2.0-flash", 0.2, 1024, "sistema")
+    assert key != LLMResponseCache.make_key("Qué es Kubernetes?", "gemini-2.0-flash", 0.7, 1024, "otro")
+
+
+def test_llm_cache_counts_hits_and_misses():
+    """Test contadores de aciertos y fallos"""
+    cache = LLMResponseCache(TTLCache(max_entries=10, ttl=60))
+    assert cache.get("k") is None
+    cache.set("k", "respuesta")
+    assert cache.get("k") == "respuesta"
+
+    stats = cache.stats()
+    assert stats["backend"] == "memory"
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_audio_cache_promotes_disk_hits(tmp_path):
+    """Test un acierto en disco sobrevive a la expulsión de memoria y se promociona"""
+    cache = AudioCache(memory_bytes=10, disk_bytes=1000, directory=str(tmp_path))
+    cache.set("a", b"x" * 8)
+    cache.set("b", b"y" * 8)  # Expulsa "a" de memoria
+
+    assert "a" not in cache._memory
+    assert cache.get("a") == b"x" * 8
+    assert "a" in cache._memory
+    assert cache.stats()["disk_entries"] == 2
+
+
+def test_audio_cache_evicts_disk_by_size(tmp_path):
+    """Test el nivel en disco expulsa por tamaño los blobs menos usados"""
+    cache = AudioCache(memory_bytes=0, disk_bytes=20, directory=str(tmp_path))
+    cache.set("a", b"1" * 8)
+    cache.set("b", b"2" * 8)
+    cache.get("a")
+    cache.set("c", b"3" * 8)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" * 8
+    assert not (tmp_path / "b.mp3").exists()
+
+    # El índice se reconstruye desde disco al reiniciar
+    reloaded = AudioCache(memory_bytes=0, disk_bytes=20, directory=str(tmp_path))
+    assert reloaded.get("c") == b"3" * 8
+
+
+def test_audio_cache_key_depends_on_voice_and_config():
+    """Test la clave cambia con la voz y la configuración de audio"""
+    config = {"audio_encoding": "MP3", "pitch": 0.0, "speaking_rate": 1.0}
+    key = AudioCache.make_key("Hola", "es-ES", "es-ES-Neural2-B", config)
+
+    assert key == AudioCache.make_key("Hola", "es-ES", "es-ES-Neural2-B", dict(config))
+    assert key != AudioCache.make_key("Hola", "es-ES", "es-ES-Neural2-A", config)
+    assert key != AudioCache.make_key("Hola", "es-ES", "es-ES-Neural2-B", {**config, "speaking_rate": 1.2})
+
+
+def test_normalize_question_ignores_accents_punctuation_and_stopwords():
+    """Test normalización de preguntas transcritas"""
+    assert normalize_question("¿Qué es Kubernetes?") == ["que", "kubernetes"]
+    assert normalize_question("que es kubernetes") == ["que", "kubernetes"]
+    assert normalize_question("Explícame, por favor, cómo despliego en GCP") == ["como", "despliego", "gcp"]
+
+
+def test_semantic_cache_matches_paraphrases_only():
+    """Test una paráfrasis reutiliza la respuesta y una pregunta distinta no"""
+    cache = SemanticAnswerCache(max_entries=10, ttl=60, threshold=0.9)
+    cache.set("Qué es Kubernetes?", "Un orquestador de contenedores.")
+    cache.set("cómo despliego en GCP", "Usa gcloud.")
+
+    assert cache.get("que es kubernetes") == "Un orquestador de contenedores."
+    assert cache.get("¿Cómo despliego en gcp?") == "Usa gcloud."
+    assert cache.get("que es terraform") is None
+    assert cache.get("como despliego en aws") is None
+    assert cache.get("cómo instalo kubernetes") is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 3
+
+    cache.set("que es kubernetes", "Respuesta nueva.")
+    assert len(cache) == 2
+    assert cache.get("Qué es Kubernetes") == "Respuesta nueva."
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("¿Qué es Kubernetes?", "explícame kubernetes"),
+    ("¿Qué es Kubernetes?", "para qué sirve kubernetes"),
+    ("¿Qué es Kubernetes?", "que es kubernets"),
+    ("¿Cómo despliego en Cloud Run?", "como despliego en clowd run"),
+    ("¿Cómo despliego en Cloud Run?", "despliegue en cloud run"),
+    ("¿Cómo despliego en Cloud Run?", "en cloud run, cómo despliego"),
+])
+def test_semantic_cache_hits_paraphrases_and_misrecognitions(stored, asked):
+    """Test paráfrasis, orden distinto y errores de reconocimiento reutilizan la respuesta"""
+    cache = SemanticAnswerCache(max_entries=10, ttl=60, threshold=settings.semantic_cache_threshold)
+    cache.set(stored, "respuesta")
+    cache.set("¿Qué es Terraform?", "otra respuesta")
+
+    assert cache.get(asked) == "respuesta"
+
+
+@pytest.mark.parametrize("stored, asked", [
+    (
+        "¿Cómo habilito el versionado de objetos en un bucket de producción?",
+        "¿Cómo deshabilito el versionado de objetos en un bucket de producción?",
+    ),
+    (
+        "¿Qué permisos necesita una cuenta de servicio para leer secretos de Secret Manager en producción?",
+        "¿Qué permisos necesita una cuenta de servicio para escribir secretos de Secret Manager en producción?",
+    ),
+    ("despliega cloud run con 2 instancias", "despliega cloud run con 20 instancias"),
+    ("¿Debo usar roles básicos en producción?", "¿No debo usar roles básicos en producción?"),
+    ("¿Cómo hago público un bucket?", "¿Cómo hago privado un bucket?"),
+    ("¿Qué es Kubernetes?", "¿Qué es Kubernetes en producción?"),
+])
+def test_semantic_cache_rejects_similar_questions_with_different_meaning(stored, asked):
+    """Test preguntas casi iguales que piden algo distinto no comparten ni sobrescriben respuesta"""
+    cache = SemanticAnswerCache(max_entries=10, ttl=60, threshold=settings.semantic_cache_threshold)
+    cache.set(stored, "respuesta original")
+    # El coseno solo no las distingue
+    assert question_vector(stored, cache.dimensions) @ question_vector(asked, cache.dimensions) > cache.threshold
+
+    assert cache.get(asked) is None
+    cache.set(asked, "otra respuesta")
+    assert len(cache) == 2
+    assert cache.get(stored) == "respuesta original"
+    # Plurales, mayúsculas y puntuación siguen siendo la misma pregunta
+    assert cache.get(stored.upper().rstrip("?") + " por favor") == "respuesta original"
+
+
+def test_semantic_cache_evicts_least_recently_used_and_expired():
+    """Test capacidad acotada con expulsión LRU y expiración por TTL"""
+    clock = FakeClock()
+    cache = SemanticAnswerCache(max_entries=2, ttl=60, threshold=0.9, dimensions=1024, clock=clock)
+    cache.set("que es docker", "docker")
+    cache.set("que es helm", "helm")
+    cache.get("que es docker")
+    cache.set("que es terraform", "terraform")
+
+    assert len(cache) == 2
+    assert cache.get("que es helm") is None
+    assert cache.get("que es docker") == "docker"
+    assert cache.get("que es terraform") == "terraform"
+
+    clock.now = 61
+    assert cache.get("que es docker") is None
+
+
+def test_voice_paraphrase_skips_model(monkeypatch):
+    """Test GCPService responde paráfrasis de voz desde la caché semántica"""
+    from types import SimpleNamespace
+
+    from src.services import gcp_service
+    from src.services.model_registry import JSON
+
+    calls = []
+
+    class FakeModels:
+        """Registro de modelos simulado que cuenta las generaciones"""
+
+        def profile(self, name):
+            return SimpleNamespace(model_name="m", temperature=0.0, max_output_tokens=10, system_instruction=name)
+
+        def get(self, name):
+            return self
+
+        def generate_content(self, prompt, stream=False):
+            calls.append(prompt)
+            return SimpleNamespace(text=f"respuesta {len(calls)}")
+
+    semantic = SemanticAnswerCache(max_entries=10, ttl=60, threshold=0.9)
+    monkeypatch.setattr(gcp_service, "get_semantic_cache", lambda: semantic)
+    monkeypatch.setattr(gcp_service, "get_llm_cache", lambda: LLMResponseCache(TTLCache(10, 60)))
+    service = gcp_service.GCPService.__new__(gcp_service.GCPService)
+    service.models = FakeModels()
+
+    assert service.get_ai_recommendation("Qué es Kubernetes?") == "respuesta 1"
+    assert "".join(service.get_ai_recommendation("que es kubernetes", stream=True)) == "respuesta 1"
+    assert service.get_ai_recommendation("que es kubernetes", profile=JSON) == "respuesta 2"
+    assert len(calls) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
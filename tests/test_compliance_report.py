@@ -0,0 +1,204 @@
+"""
+Tests para el reporte de cumplimiento de flota
+"""
+import asyncio
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.services import compliance_report
+from src.services.compliance_report import iter_ndjson, stream_compliance_report
+from src.services.governance_incremental import IncrementalGovernanceAnalyzer
+
+SECURE_BUCKET = {
+    "encryption_enabled": True,
+    "versioning_enabled": True,
+    "lifecycle_policy": {"rules": []},
+    "is_public": False,
+    "audit_logging_enabled": True,
+}
+PUBLIC_BUCKET = {**SECURE_BUCKET, "is_public": True}
+
+
+def fleet(size):
+    """Inventario alternando buckets seguros y públicos"""
+    return [
+        {
+            "resource_type": "storage",
+            "resource_id": f"bucket-{i}",
+            "resource_data": PUBLIC_BUCKET if i % 2 else SECURE_BUCKET,
+        }
+        for i in range(size)
+    ]
+
+
+async def aiter_list(items):
+    for item in items:
+        yield item
+
+
+def collect(resources, **kwargs):
+    async def run():
+        return [record async for record in stream_compliance_report(aiter_list(resources), **kwargs)]
+    return asyncio.run(run())
+
+
+def test_stream_emits_results_aggregates_and_summary():
+    """Test un registro por recurso, agregados por bloque y resumen final"""
+    records = collect(fleet(10), chunk_size=4)
+
+    results = [r for r in records if r["type"] == "result"]
+    aggregates = [r for r in records if r["type"] == "aggregate"]
+    summary = records[-1]
+
+    assert [r["index"] for r in results] == list(range(10))
+    assert results[1]["resource_id"] == "bucket-1"
+    assert len(aggregates) == 3
+    assert aggregates[0]["total_resources"] == 4
+    assert summary["type"] == "summary"
+    assert summary["total_resources"] == 10
+    assert summary["by_risk_level"]["crítico"] == 5
+    assert summary["by_risk_level"]["bajo"] == 5
+    assert summary["overall_risk_level"] == "crítico"
+    assert summary["overall_compliance_score"] == 92
+
+
+def test_stream_reports_invalid_resources_as_errors():
+    """Test recursos no soportados o mal formados no detienen el reporte"""
+    resources = [
+        {"resource_type": "storage", "resource_data": SECURE_BUCKET},
+        {"resource_type": "desconocido", "resource_data": {}},
+        {"resource_data": {}},
+    ]
+    records = collect(resources, chunk_size=2)
+
+    errors = [r for r in records if r["type"] == "error"]
+    assert [e["index"] for e in errors] == [1, 2]
+    assert records[-1]["total_resources"] == 1
+    assert records[-1]["errors"] == 2
+
+
+def test_stream_uses_process_pool_above_threshold():
+    """Test bloques grandes se evalúan en un pool de procesos conservando el orden"""
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        records = collect(fleet(50), chunk_size=5, executor=pool, parallel_threshold=10, max_in_flight=3)
+
+    results = [r for r in records if r["type"] == "result"]
+    assert [r["index"] for r in results] == list(range(50))
+    assert records[-1]["total_resources"] == 50
+
+
+def test_stream_small_reports_do_not_block_event_loop(monkeypatch):
+    """Test por debajo del umbral los bloques se evalúan fuera del hilo del event loop"""
+    evaluate_chunk = compliance_report.evaluate_chunk
+    threads = []
+
+    def recording_evaluate(chunk):
+        threads.append(threading.current_thread())
+        return evaluate_chunk(chunk)
+
+    monkeypatch.setattr(compliance_report, "evaluate_chunk", recording_evaluate)
+    monkeypatch.setattr(compliance_report.settings, "governance_incremental_enabled", False)
+    records = collect(fleet(10), chunk_size=4)
+
+    assert records[-1]["total_resources"] == 10
+    assert len(threads) == 3
+    assert threading.current_thread() not in threads
+
+
+def test_stream_keeps_parse_errors_in_index_order():
+    """Test las líneas inválidas se emiten en su posición, no antes de los bloques pendientes"""
+    resources = fleet(6)
+    resources[3:3] = [{"_parse_error": "JSON inválido"}]
+    records = collect(resources, chunk_size=2, max_in_flight=4)
+
+    per_resource = [r for r in records if r["type"] in ("result", "error")]
+    assert [r["index"] for r in per_resource] == list(range(7))
+    assert per_resource[3]["type"] == "error"
+    assert records[-1]["errors"] == 1
+
+
+@pytest.mark.parametrize("pooled", [False, True])
+def test_stream_fingerprints_off_event_loop(pooled):
+    """Test las huellas del análisis incremental se calculan fuera del hilo del event loop"""
+    analyzer = IncrementalGovernanceAnalyzer(max_entries=100, max_changes=100)
+    cached = analyzer.cached
+    threads = []
+
+    def recording_cached(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return cached(*args, **kwargs)
+
+    analyzer.cached = recording_cached
+    resources = [{**r, "resource_data": {**r["resource_data"], "name": r["resource_id"]}} for r in fleet(10)]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        options = {"executor": pool, "parallel_threshold": 0} if pooled else {}
+        first = collect(resources, chunk_size=4, analyzer=analyzer, **options)
+        second = collect(resources, chunk_size=4, analyzer=analyzer, **options)
+
+    assert first[-1] == second[-1]
+    assert analyzer.hits == 10
+    assert len(threads) == 20
+    assert threading.current_thread() not in threads
+
+
+def test_process_pool_uses_spawn():
+    """Test el pool de procesos no hace fork del proceso con hilos activos"""
+    compliance_report.shutdown_process_pool()
+    try:
+        pool = compliance_report.get_process_pool()
+        assert pool._mp_context.get_start_method() == "spawn"
+    finally:
+        compliance_report.shutdown_process_pool()
+
+
+def test_iter_ndjson_splits_lines_across_chunks():
+    """Test parseo NDJSON con líneas partidas entre trozos"""
+    payload = b'{"a": 1}\n{"b"' + b': 2}\n\nnot-json\n{"c": 3}'
+
+    async def run():
+        chunks = aiter_list([payload[:5], payload[5:17], payload[17:]])
+        return [item async for item in iter_ndjson(chunks)]
+
+    items = asyncio.run(run())
+    assert items[0] == {"a": 1}
+    assert items[1] == {"b": 2}
+    assert "_parse_error" in items[2]
+    assert items[3] == {"c": 3}
+
+
+@pytest.mark.parametrize("as_ndjson", [False, True])
+def test_compliance_report_stream_endpoint(as_ndjson):
+    """Test endpoint acepta lista JSON o NDJSON y responde NDJSON"""
+    client = TestClient(app)
+    resources = fleet(6)
+    if as_ndjson:
+        response = client.post(
+            "/api/v1/governance/compliance-report/stream",
+            content="\n".join(json.dumps(r) for r in resources),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    else:
+        response = client.post("/api/v1/governance/compliance-report/stream", json=resources)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert sum(r["type"] == "result" for r in records) == 6
+    assert records[-1]["type"] == "summary"
+    assert records[-1]["total_resources"] == 6
+
+
+def test_compliance_report_stream_rejects_non_list():
+    """Test cuerpo JSON que no es lista"""
+    client = TestClient(app)
+    response = client.post("/api/v1/governance/compliance-report/stream", json={"storage": {}})
+    assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
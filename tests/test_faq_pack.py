@@ -0,0 +1,169 @@
+"""
+Tests para el paquete de respuestas frecuentes precalculadas
+"""
+import base64
+import json
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.config import settings
+from src.main import app
+from src.routers import voice
+from src.services import faq_pack
+from src.services.faq_pack import FAQPack, FAQPackStore, build_pack, read_questions, write_pack
+from tests.test_voice import FakeAsyncGCPService, FakeUploadQueue, wav_bytes
+
+ENTRIES = [
+    ("Qué es Kubernetes", "Kubernetes orquesta contenedores.", b"ID3-kubernetes"),
+    ("Cómo despliego en Cloud Run", "Ejecuta gcloud run deploy.", b"ID3-cloud-run"),
+]
+
+
+@pytest.fixture
+def pack_path(tmp_path):
+    path = str(tmp_path / "faq.pack")
+    write_pack(path, ENTRIES, {"language_code": "es-ES"})
+    return path
+
+
+def test_pack_lookup_exact_and_paraphrase(pack_path):
+    """Test búsqueda por clave normalizada y por similitud"""
+    pack = FAQPack(pack_path)
+
+    exact = pack.lookup("¿Qué es Kubernetes?", threshold=0.9)
+    assert exact.answer == "Kubernetes orquesta contenedores."
+    assert exact.audio == b"ID3-kubernetes"
+    assert pack.lookup("como despliego en cloud run", threshold=0.9).audio == b"ID3-cloud-run"
+    assert pack.lookup("qué es terraform", threshold=0.9) is None
+    assert pack.lookup("en cloud run, cómo despliego", threshold=0.9).audio == b"ID3-cloud-run"
+    # Casi la misma frase pero otra pregunta: no se responde con el audio precalculado
+    assert pack.lookup("cómo despliego en cloud run 2", threshold=0.9) is None
+
+
+def test_pack_lookup_shares_semantic_cache_matching(pack_path):
+    """Test el paquete acepta paráfrasis y erratas y rechaza preguntas con otro significado"""
+    pack = FAQPack(pack_path)
+    threshold = settings.faq_pack_threshold
+
+    for question in ("explícame kubernetes", "que es kubernets", "como despliego en clowd run"):
+        assert pack.lookup(question, threshold) is not None, question
+    for question in ("¿qué no es kubernetes?", "cómo borro en cloud run", "qué es kubernetes en producción"):
+        assert pack.lookup(question, threshold) is None, question
+    assert pack.summary()["entries"] == 2
+
+
+def test_invalid_pack_is_rejected(tmp_path):
+    """Test un archivo que no es un paquete se rechaza"""
+    path = tmp_path / "otro.bin"
+    path.write_bytes(b"no es un paquete FAQ")
+
+    with pytest.raises(ValueError):
+        FAQPack(str(path))
+
+
+def test_store_hot_swaps_rebuilt_pack(pack_path, monkeypatch):
+    """Test el almacén recarga el paquete reconstruido y conserva el anterior si el nuevo es inválido"""
+    store = FAQPackStore(pack_path, threshold=0.9, check_interval=30)
+    assert store.lookup("qué es kubernetes", "es-ES") is None
+    store.reload()
+    assert store.lookup("qué es kubernetes", "es-ES").audio == b"ID3-kubernetes"
+    assert store.lookup("qué es kubernetes", "en-US") is None
+
+    write_pack(pack_path, [("Qué es Kubernetes", "Nueva respuesta.", b"ID3-v2")], {"language_code": "es-ES"})
+    os.utime(pack_path, ns=(1, 1))
+    # La búsqueda nunca toca el disco: solo la revisión periódica recarga
+    monkeypatch.setattr(faq_pack.os, "stat", lambda path: pytest.fail("lookup no debe leer el disco"))
+    assert store.lookup("qué es kubernetes", "es-ES").answer == "Kubernetes orquesta contenedores."
+    monkeypatch.undo()
+    store.reload()
+    assert store.lookup("qué es kubernetes", "es-ES").audio == b"ID3-v2"
+
+    with open(pack_path, "wb") as f:
+        f.write(b"corrupto")
+    store.reload()
+    assert store.lookup("qué es kubernetes", "es-ES").answer == "Nueva respuesta."
+    assert (store.stats()["hits"], store.stats()["misses"]) == (4, 1)
+
+
+def test_store_watcher_reloads_in_background(pack_path):
+    """Test el hilo de revisión publica el paquete reconstruido"""
+    store = FAQPackStore(pack_path, threshold=0.9, check_interval=0.01)
+    store.reload()
+    store.start()
+    try:
+        write_pack(pack_path, [("Qué es Kubernetes", "Nueva respuesta.", b"ID3-v2")], {"language_code": "es-ES"})
+        os.utime(pack_path, ns=(1, 1))
+        deadline = time.monotonic() + 5
+        while store.lookup("qué es kubernetes", "es-ES").audio != b"ID3-v2":
+            assert time.monotonic() < deadline, "el paquete no se recargó"
+            time.sleep(0.01)
+    finally:
+        store.stop()
+
+
+def test_build_pack_from_question_list(tmp_path):
+    """Test el build genera solo las respuestas no curadas y sintetiza todas"""
+    questions_path = tmp_path / "preguntas.txt"
+    questions_path.write_text(
+        "# comentario\nQué es Helm\n¿qué es helm?\n\nQué es GKE | GKE es Kubernetes gestionado.\n",
+        encoding="utf-8",
+    )
+    calls = []
+
+    class FakeService:
+        def get_ai_recommendation(self, prompt):
+            calls.append(("llm", prompt))
+            return f"Respuesta a {prompt}"
+
+        def synthesize_speech(self, text, language_code):
+            calls.append(("tts", text))
+            return f"ID3-{text}".encode("utf-8")
+
+    questions = read_questions(str(questions_path))
+    index = build_pack(questions, str(tmp_path / "faq.pack"), service=FakeService())
+
+    assert questions == [("Qué es Helm", None), ("Qué es GKE", "GKE es Kubernetes gestionado.")]
+    assert [kind for kind, _ in calls] == ["llm", "tts", "tts"]
+    assert index["language_code"] == "es-ES"
+    assert FAQPack(str(tmp_path / "faq.pack")).lookup("que es gke", 0.9).audio == b"ID3-GKE es Kubernetes gestionado."
+
+
+def test_voice_endpoints_answer_from_pack(pack_path, monkeypatch):
+    """Test /query, /query/stream y /converse responden desde el paquete sin llamar a GCP"""
+    fake = FakeAsyncGCPService()
+    fake.uploads = FakeUploadQueue()
+    store = FAQPackStore(pack_path, threshold=0.9)
+    store.reload()
+    monkeypatch.setattr(voice, "get_async_gcp_service", lambda: fake)
+    monkeypatch.setattr(voice, "get_upload_queue", lambda: fake.uploads)
+    monkeypatch.setattr(voice, "get_faq_pack_store", lambda: store)
+    client = TestClient(app)
+
+    data = client.post("/api/v1/voice/query", json={"query": "qué es kubernetes?"}).json()
+    assert data["source"] == "faq"
+    assert base64.b64decode(data["audio_base64"]) == b"ID3-kubernetes"
+
+    binary = client.post("/api/v1/voice/query", json={"query": "Qué es Kubernetes"}, headers={"Accept": "audio/mpeg"})
+    assert binary.content == b"ID3-kubernetes"
+    assert binary.headers["X-Source"] == "faq"
+
+    events = [json.loads(line) for line in client.post(
+        "/api/v1/voice/query/stream", json={"query": "Qué es Kubernetes"}
+    ).text.splitlines()]
+    assert [e["type"] for e in events] == ["sentence", "done"]
+
+    converse = client.post(
+        "/api/v1/voice/converse",
+        files={"file": ("audio.wav", wav_bytes(), "audio/wav")},
+        headers={"Accept": "audio/mpeg"},
+    )
+    assert converse.content == b"ID3-kubernetes"
+    assert "X-Storage-Path" not in converse.headers
+    assert fake.calls == ["transcribe"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
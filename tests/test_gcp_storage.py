@@ -0,0 +1,129 @@
+"""
+Tests para las lecturas por fragmentos y rangos de Cloud Storage
+"""
+import io
+
+import pytest
+
+from src.services import gcp_service
+from src.services.gcp_service import GCPService
+
+DATA = bytes(range(256)) * 40  # 10 KB
+
+
+class FakeBlob:
+    """Blob simulado que registra los rangos pedidos"""
+
+    def __init__(self, data):
+        self.data = data
+        self.size = len(data)
+        self.content_type = "audio/mpeg"
+        self.generation = 3
+        self.ranges = []
+
+    def download_as_bytes(self, start=None, end=None, if_generation_match=None):
+        assert if_generation_match in (None, self.generation)
+        self.ranges.append((start, end))
+        start = start or 0
+        return self.data[start:None if end is None else end + 1]
+
+    def open(self, mode, chunk_size=None, if_generation_match=None):
+        assert mode == "rb" and chunk_size
+        return io.BufferedReader(io.BytesIO(self.data), buffer_size=chunk_size)
+
+
+class FakeBucket:
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+    def get_blob(self, path):
+        return self.blobs.get(path)
+
+    def blob(self, path):
+        return self.blobs[path]
+
+
+class FakeStorageClient:
+    def __init__(self, blobs):
+        self._bucket = FakeBucket(blobs)
+
+    def bucket(self, name):
+        return self._bucket
+
+
+@pytest.fixture
+def blob():
+    return FakeBlob(DATA)
+
+
+@pytest.fixture
+def service(blob):
+    service = GCPService.__new__(GCPService)
+    service.storage_client = FakeStorageClient({"audios/a.mp3": blob})
+    return service
+
+
+def test_iter_download_range_is_chunked(service, blob):
+    """Test un rango se descarga en fragmentos de tamaño acotado"""
+    chunks = list(service.iter_download("b", "audios/a.mp3", chunk_size=1000, start=500, end=3100))
+
+    assert b"".join(chunks) == DATA[500:3100]
+    assert max(len(c) for c in chunks) == 1000
+    assert blob.ranges == [(500, 1499), (1500, 2499), (2500, 3099)]
+
+
+def test_iter_download_clamps_end_and_missing_object(service):
+    """Test el rango se recorta al tamaño del objeto y los objetos inexistentes fallan"""
+    assert b"".join(service.iter_download("b", "audios/a.mp3", chunk_size=4096, start=10_000, end=99_999)) == DATA[10_000:]
+
+    with pytest.raises(FileNotFoundError):
+        list(service.iter_download("b", "audios/no.mp3"))
+
+
+def test_download_from_storage_range(service):
+    """Test la descarga completa acepta un rango opcional con fin exclusivo"""
+    assert service.download_from_storage("b", "audios/a.mp3") == DATA
+    assert service.download_from_storage("b", "audios/a.mp3", start=5, end=10) == DATA[5:10]
+
+
+def test_open_download_is_seekable(service):
+    """Test el lector tipo archivo permite seek y lecturas parciales"""
+    with service.open_download("b", "audios/a.mp3", chunk_size=512) as reader:
+        reader.seek(1024)
+        assert reader.read(16) == DATA[1024:1040]
+
+
+def test_download_to_mmap_random_access(service, blob):
+    """Test el rango se vuelca a un archivo temporal mapeado en memoria"""
+    mapped = service.download_to_mmap("b", "audios/a.mp3", start=100, end=4200, chunk_size=1024)
+    try:
+        assert len(mapped) == 4100
+        assert mapped[:4] == DATA[100:104]
+        assert mapped[-3:] == DATA[4197:4200]
+    finally:
+        mapped.close()
+    assert len(blob.ranges) == 5
+
+    with pytest.raises(ValueError):
+        service.download_to_mmap("b", "audios/a.mp3", start=20_000)
+
+
+def test_upload_many_reports_errors_per_object(monkeypatch):
+    """Test la subida por lotes usa hilos y devuelve el error de cada objeto en orden"""
+    ok, failing = FakeBlob(b""), FakeBlob(b"")
+    service = GCPService.__new__(GCPService)
+    service.storage_client = FakeStorageClient({"audios/ok.mp3": ok, "audios/falla.mp3": failing})
+    error = ConnectionError("storage no disponible")
+
+    def upload_many(pairs, raise_exception, worker_type, max_workers):
+        assert worker_type == gcp_service.transfer_manager.THREAD and not raise_exception
+        assert [(f.read(), b) for f, b in pairs] == [(b"mp3", ok), (b"wav", failing)]
+        return [None, error]
+
+    monkeypatch.setattr(gcp_service.transfer_manager, "upload_many", upload_many)
+
+    assert service.upload_many_to_storage([("b", "audios/ok.mp3", b"mp3"), ("b", "audios/falla.mp3", b"wav")]) == [None, error]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
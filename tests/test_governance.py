@@ -58,6 +58,113 @@ def test_analyze_gke_governance_secure():
     assert len(result["findings"]) == 0
 
 
+def test_risk_level_uses_severity_order():
+    """Test el nivel de riesgo se ordena por severidad y no alfabéticamente"""
+    storage_data = {
+        "encryption_enabled": True,
+        "versioning_enabled": False,  # medium
+        "lifecycle_policy": {"rules": []},
+        "is_public": False,
+        "audit_logging_enabled": False,  # high
+    }
+
+    result = GovernanceService.analyze_storage_governance(storage_data)
+
+    assert result["risk_level"] == RiskLevel.HIGH
+    assert result["compliance_score"] == 70
+
+
+def test_analyze_many_matches_single_analysis():
+    """Test el análisis por lotes coincide con el análisis individual"""
+    clusters = [
+        {"rbac_enabled": True, "network_policy_enabled": True},
+        {"rbac_enabled": False, "audit_logging_enabled": True},
+        {},
+    ]
+
+    results = GovernanceService.analyze_many("gke", clusters)
+
+    assert results == [GovernanceService.analyze_gke_governance(c) for c in clusters]
+    assert results[1]["risk_level"] == RiskLevel.CRITICAL
+
+
+def test_excessive_permissions_finding_references_index_ids():
+    """Test el hallazgo de menor privilegio referencia IDs del índice IAM en lugar de copiar roles"""
+    result = GovernanceService.analyze_iam_governance({
+        "bindings": {"a@example.com": ["r1"], "b@example.com": [f"r{i}" for i in range(6)]},
+        "uses_custom_roles": True,
+        "audit_logging_enabled": True,
+    })
+
+    finding = result["findings"][0]
+    assert finding["severity"] == "high"
+    assert finding["principal_ids"] == [1]
+    assert finding["count"] == 1
+    assert "roles" not in finding
+    assert finding["index_id"] == result["iam_index"]["index_id"]
+    assert result["iam_index"]["principals"] == 2
+    assert result["iam_index"]["bindings"] == 7
+
+
+def test_analyze_compute_fleet_findings_and_aggregates():
+    """Test análisis por columnas de una flota de Compute Engine"""
+    compliant = {
+        "name": "vm-ok",
+        "managed_image": True,
+        "monitoring_enabled": True,
+        "labels": {"env": "prod"},
+        "startup_script": "#!/bin/sh",
+        "shutdown_script": "#!/bin/sh",
+    }
+    dev_unmonitored = {**compliant, "name": "vm-dev", "labels": {"env": "dev"}, "monitoring_enabled": False}
+    bare = {"name": "vm-bare"}
+
+    result = GovernanceService.analyze("compute", {"instances": [compliant, dev_unmonitored, bare]})
+
+    assert result["resource_type"] == "compute"
+    assert result["risk_level"] == RiskLevel.HIGH
+    assert result["fleet"]["total_instances"] == 3
+    assert result["fleet"]["compliant_instances"] == 1
+    assert result["fleet"]["violations_by_rule"]["compute.monitoring"] == 2
+    assert result["fleet"]["violations_by_rule"]["compute.preemptible_dev"] == 1
+    assert [i["instance"] for i in result["instances"]] == ["vm-dev", "vm-bare"]
+    assert result["instances"][0]["findings"] == ["compute.monitoring", "compute.preemptible_dev"]
+    assert result["instances"][0]["compliance_score"] == 80
+    assert result["instances"][1]["compliance_score"] == 60
+    assert result["compliance_score"] == 80
+    assert {f["rule"] for f in result["findings"]} == {
+        "compute.managed_images",
+        "compute.monitoring",
+        "compute.labels",
+        "compute.preemptible_dev",
+        "compute.startup_shutdown_scripts",
+    }
+
+
+def test_analyze_compute_single_instance():
+    """Test una sola instancia se analiza como flota de uno"""
+    result = GovernanceService.analyze_compute_governance({
+        "managed_image": True,
+        "monitoring_enabled": True,
+        "labels": {"env": "dev"},
+        "preemptible": True,
+        "startup_script": "a",
+        "shutdown_script": "b",
+    })
+
+    assert "compute" in GovernanceService.supported_resource_types()
+    assert result["risk_level"] == RiskLevel.LOW
+    assert result["findings"] == []
+    assert result["instances"] == []
+    assert result["compliance_score"] == 100
+
+
+def test_analyze_unsupported_type():
+    """Test tipo de recurso no soportado"""
+    with pytest.raises(ValueError):
+        GovernanceService.analyze("desconocido", {})
+
+
 def test_get_best_practices():
     """Test obtener recomendaciones de buenas prácticas"""
     practices = GovernanceService.get_best_practices_recommendations("iam")
@@ -0,0 +1,146 @@
+"""
+Tests para la revisión de gobernanza con IA por lotes
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.services import async_gcp_service
+from src.services.gcp_service import GCPService
+from src.services.governance_ai import needs_review, pack_batches, review_governance
+from src.services.governance_service import RiskLevel
+
+SECURE_BUCKET = {
+    "encryption_enabled": True,
+    "versioning_enabled": True,
+    "lifecycle_policy": {"rules": []},
+    "is_public": False,
+    "audit_logging_enabled": True,
+}
+
+
+class FakeBatchService:
+    """Fachada simulada que responde a cada lote por id"""
+
+    def __init__(self, fail_on=None, omit=()):
+        self.batches = []
+        self.fail_on = fail_on
+        self.omit = set(omit)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_governance_analysis_batch(self, resource_lines):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            resources = [json.loads(line) for line in resource_lines]
+            self.batches.append([r["id"] for r in resources])
+            if self.fail_on is not None and self.fail_on in self.batches[-1]:
+                raise RuntimeError("cuota agotada")
+            return {
+                r["id"]: {"nivel_riesgo": "Alto", "tipo": r["tipo"], "hallazgos": len(r["hallazgos"])}
+                for r in resources
+                if r["id"] not in self.omit
+            }
+        finally:
+            self.in_flight -= 1
+
+
+def inventory(secure=10, public=20):
+    resources = [
+        {"resource_type": "storage", "resource_id": f"ok-{i}", "resource_data": {**SECURE_BUCKET, "n": i}}
+        for i in range(secure)
+    ]
+    resources += [
+        {"resource_type": "storage", "resource_id": f"public-{i}", "resource_data": {**SECURE_BUCKET, "is_public": True, "n": i}}
+        for i in range(public)
+    ]
+    return resources
+
+
+def test_needs_review_and_packing():
+    """Test selección por severidad/riesgo y empaquetado bajo presupuesto"""
+    assert not needs_review({"risk_level": RiskLevel.LOW, "findings": [{"severity": "medium"}]})
+    assert needs_review({"risk_level": RiskLevel.MEDIUM, "findings": []})
+    assert needs_review({"risk_level": RiskLevel.LOW, "findings": [{"severity": "critical"}]})
+
+    lines = [(f"r{i}", "x" * 40) for i in range(10)]  # ~11 tokens cada una
+    assert [len(b) for b in pack_batches(lines, token_budget=35, max_resources=10)] == [3, 3, 3, 1]
+    assert [len(b) for b in pack_batches(lines, token_budget=1000, max_resources=4)] == [4, 4, 2]
+    assert [len(b) for b in pack_batches([("r0", "x" * 400)], token_budget=10, max_resources=4)] == [1]
+
+
+def test_only_flagged_resources_reach_the_model():
+    """Test las reglas filtran y los lotes agrupan varios recursos por llamada"""
+    service = FakeBatchService()
+    report = asyncio.run(review_governance(inventory(), service=service, max_resources=8, max_concurrency=2))
+
+    assert report["total"] == 30
+    assert report["reviewed"] == 20
+    assert report["llm_calls"] == len(service.batches) == 3
+    assert service.max_in_flight <= 2
+    results = report["results"]
+    assert [r["index"] for r in results] == list(range(30))
+    assert all(r["ai_review"] is None for r in results[:10])
+    for result in results[10:]:
+        assert result["risk_level"] == RiskLevel.CRITICAL
+        assert result["ai_review"] == {"nivel_riesgo": "Alto", "tipo": "storage", "hallazgos": len(result["findings"])}
+    assert "_data" not in results[0]
+
+
+def test_failed_batches_and_missing_ids_are_reported_per_resource():
+    """Test un lote fallido o un id omitido no afectan al resto"""
+    service = FakeBatchService(fail_on="r0", omit={"r5"})
+    resources = inventory(secure=0, public=6) + [{"resource_type": "pubsub", "resource_data": {}}]
+    report = asyncio.run(review_governance(resources, service=service, max_resources=3))
+
+    reviews = [r.get("ai_review") for r in report["results"]]
+    assert reviews[0] == reviews[2] == {"error": "cuota agotada"}
+    assert reviews[3]["nivel_riesgo"] == "Alto"
+    assert "error" in reviews[5]
+    assert report["results"][6]["error"] == "Tipo de recurso no soportado: pubsub"
+
+
+def test_batch_reply_parsing(monkeypatch):
+    """Test GCPService acepta la lista de recursos o un objeto por id"""
+    service = GCPService.__new__(GCPService)
+    replies = iter([
+        json.dumps({"resources": [{"id": "r1", "nivel_riesgo": "Bajo"}, {"sin_id": True}]}),
+        json.dumps({"r2": {"nivel_riesgo": "Medio"}}),
+        "no es json",
+    ])
+    prompts = []
+
+    def fake_recommendation(prompt, profile=None):
+        prompts.append(prompt)
+        return next(replies)
+
+    monkeypatch.setattr(service, "get_ai_recommendation", fake_recommendation)
+
+    assert service.get_governance_analysis_batch(['{"id":"r1"}']) == {"r1": {"nivel_riesgo": "Bajo"}}
+    assert service.get_governance_analysis_batch(['{"id":"r2"}']) == {"r2": {"nivel_riesgo": "Medio"}}
+    assert service.get_governance_analysis_batch(['{"id":"r3"}']) == {}
+    assert prompts[0].endswith('{"id":"r1"}')
+
+
+def test_ai_review_endpoint(monkeypatch):
+    """Test endpoint de revisión con la fachada simulada"""
+    service = FakeBatchService()
+    monkeypatch.setattr(async_gcp_service, "get_async_gcp_service", lambda: service)
+    client = TestClient(app)
+
+    response = client.post("/api/v1/governance/ai-review", json={"resources": inventory(secure=2, public=3)})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["reviewed"] == 3
+    assert body["llm_calls"] == 1
+    assert body["results"][4]["ai_review"]["nivel_riesgo"] == "Alto"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
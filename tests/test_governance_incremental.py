@@ -0,0 +1,120 @@
+"""
+Tests para el análisis de gobernanza incremental
+"""
+import asyncio
+
+import pytest
+
+from src.services import governance_incremental
+from src.services.compliance_report import stream_compliance_report
+from src.services.governance_incremental import IncrementalGovernanceAnalyzer
+from src.services.governance_service import GovernanceService, RiskLevel
+
+SECURE_BUCKET = {
+    "encryption_enabled": True,
+    "versioning_enabled": True,
+    "lifecycle_policy": {"rules": []},
+    "is_public": False,
+    "audit_logging_enabled": True,
+}
+
+
+@pytest.fixture
+def analyzer():
+    return IncrementalGovernanceAnalyzer(max_entries=100, max_changes=10)
+
+
+@pytest.fixture
+def evaluations(monkeypatch):
+    """Cuenta las evaluaciones reales del motor de reglas"""
+    calls = []
+    analyze = GovernanceService.analyze
+
+    def counting_analyze(resource_type, resource_data):
+        calls.append(resource_type)
+        return analyze(resource_type, resource_data)
+
+    monkeypatch.setattr(governance_incremental.GovernanceService, "analyze", staticmethod(counting_analyze))
+    return calls
+
+
+def test_unchanged_resources_are_not_reevaluated(analyzer, evaluations):
+    """Test un recurso con la misma huella se sirve desde la caché"""
+    first = analyzer.analyze("storage", SECURE_BUCKET)
+    reordered = dict(reversed(list(SECURE_BUCKET.items())))
+    second = analyzer.analyze("storage", reordered)
+
+    assert evaluations == ["storage"]
+    assert first == second
+    assert analyzer.stats()["hits"] == 1
+
+
+def test_fingerprint_includes_rule_set_version(analyzer):
+    """Test cambiar la versión de las reglas invalida las huellas"""
+    other = IncrementalGovernanceAnalyzer(max_entries=10, max_changes=10, rule_set_version="otra")
+
+    assert analyzer.fingerprint("storage", SECURE_BUCKET) != other.fingerprint("storage", SECURE_BUCKET)
+    assert analyzer.fingerprint("storage", SECURE_BUCKET) != analyzer.fingerprint("gke", SECURE_BUCKET)
+
+
+def test_changes_since_reports_findings_diff(analyzer):
+    """Test historial de cambios de hallazgos por recurso identificado"""
+    public_bucket = {**SECURE_BUCKET, "is_public": True}
+
+    analyzer.analyze("storage", public_bucket, resource_id="bucket-1")
+    analyzer.analyze("storage", public_bucket, resource_id="bucket-1")  # sin cambios
+    analyzer.analyze("storage", SECURE_BUCKET, resource_id="bucket-2")  # nuevo sin hallazgos
+    analyzer.analyze("storage", SECURE_BUCKET, resource_id="bucket-1")  # corregido
+
+    changes = analyzer.changes_since(0)
+    assert changes["revision"] == 2
+    assert [c["status"] for c in changes["changes"]] == ["new", "changed"]
+    assert changes["changes"][0]["added"] == ["Bucket público detectado"]
+    fixed = changes["changes"][1]
+    assert fixed["resource_id"] == "bucket-1"
+    assert fixed["resolved"] == ["Bucket público detectado"]
+    assert fixed["previous_risk_level"] == RiskLevel.CRITICAL
+    assert fixed["risk_level"] == RiskLevel.LOW
+
+    assert [c["revision"] for c in analyzer.changes_since(1)["changes"]] == [2]
+    assert analyzer.changes_since(2)["changes"] == []
+    assert not analyzer.changes_since(0)["truncated"]
+
+
+def test_changes_history_is_bounded(analyzer):
+    """Test el historial se trunca al superar su capacidad"""
+    for i in range(15):
+        analyzer.analyze("gke", {"rbac_enabled": bool(i % 2)}, resource_id="cluster")
+
+    changes = analyzer.changes_since(0)
+    assert len(changes["changes"]) == 10
+    assert changes["truncated"]
+
+
+def test_compliance_report_only_evaluates_changed_resources(analyzer, evaluations):
+    """Test el reporte de flota reevalúa solo los recursos cuya huella cambió"""
+    inventory = [
+        {"resource_type": "storage", "resource_id": f"bucket-{i}", "resource_data": {**SECURE_BUCKET, "n": i}}
+        for i in range(20)
+    ]
+
+    async def run(resources):
+        async def source():
+            for resource in resources:
+                yield resource
+        return [r async for r in stream_compliance_report(source(), chunk_size=8, analyzer=analyzer)]
+
+    first = asyncio.run(run(inventory))
+    inventory[3] = {**inventory[3], "resource_data": {**SECURE_BUCKET, "is_public": True}}
+    second = asyncio.run(run(inventory))
+
+    assert len(evaluations) == 21
+    results = [r for r in second if r["type"] == "result"]
+    assert [r["index"] for r in results] == list(range(20))
+    assert results[3]["risk_level"] == RiskLevel.CRITICAL
+    assert first[-1]["total_resources"] == second[-1]["total_resources"] == 20
+    assert [c["resource_id"] for c in analyzer.changes_since(0)["changes"]] == ["bucket-3"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,81 @@
+"""
+Tests para los health checks
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.services import gcp_service
+
+
+class FakeGCPService:
+    """Servicio GCP simulado con precalentamiento instantáneo"""
+
+    def __init__(self, fail: bool = False, failures: int = 0):
+        self.fail = fail
+        self.failures = failures
+        self.warmed = 0
+
+    def warm_up(self):
+        if self.fail:
+            raise RuntimeError("sin credenciales")
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("servidor de metadatos no disponible")
+        self.warmed += 1
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def reset_warmup(monkeypatch):
+    monkeypatch.setattr(gcp_service, "_warmup_state", {"status": "pending", "error": None})
+
+
+def test_ready_waits_for_warm_up(client, monkeypatch):
+    """Test /ready responde 503 hasta que termina el precalentamiento"""
+    fake = FakeGCPService()
+    monkeypatch.setattr(gcp_service, "_gcp_service", fake)
+
+    assert client.get("/ready").status_code == 503
+
+    gcp_service.warm_up_gcp_service()
+
+    res = client.get("/ready")
+    assert res.status_code == 200
+    assert res.json()["status"] == "ready"
+    assert fake.warmed == 1
+
+
+def test_ready_reports_failed_warm_up(client, monkeypatch):
+    """Test /ready informa el error si falla la inicialización"""
+    monkeypatch.setattr(gcp_service, "_gcp_service", FakeGCPService(fail=True))
+
+    gcp_service.warm_up_gcp_service(max_attempts=1)
+
+    res = client.get("/ready")
+    assert res.status_code == 503
+    assert res.json()["warmup"] == {"status": "failed", "error": "sin credenciales"}
+
+
+def test_warm_up_retries_transient_failures(client, monkeypatch):
+    """Test un fallo transitorio al arrancar se reintenta hasta que /ready responde 200"""
+    fake = FakeGCPService(failures=2)
+    monkeypatch.setattr(gcp_service, "_gcp_service", fake)
+
+    gcp_service.warm_up_gcp_service(backoff=0.01)
+
+    assert client.get("/ready").status_code == 200
+    assert (fake.failures, fake.warmed) == (0, 1)
+
+
+def test_health_does_not_wait_for_warm_up(client):
+    """Test /health responde aunque el precalentamiento no haya terminado"""
+    assert client.get("/health").status_code == 200
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,169 @@
+"""
+Tests para el índice de políticas IAM
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.services import iam_index
+from src.services.compliance_report import stream_compliance_report
+from src.services.governance_incremental import IncrementalGovernanceAnalyzer
+from src.services.governance_service import GovernanceService
+from src.services.iam_index import IAMIndexRegistry, IAMPolicyIndex, get_iam_index_registry
+
+BINDINGS = {
+    "user:a@example.com": ["roles/owner", "roles/viewer", "roles/viewer"],
+    "serviceAccount:ci@p.iam.gserviceaccount.com": ["roles/editor"],
+    "user:b@example.com": ["roles/viewer"],
+}
+
+API_BINDINGS = [
+    {"role": "roles/owner", "members": ["user:a@example.com"]},
+    {"role": "roles/viewer", "members": ["user:a@example.com", "user:b@example.com"]},
+    {"role": "roles/editor", "members": ["serviceAccount:ci@p.iam.gserviceaccount.com"]},
+]
+
+
+def test_index_formats_are_equivalent_and_deduplicated():
+    """Test ambos formatos de bindings producen el mismo índice sin duplicados"""
+    for bindings in (BINDINGS, API_BINDINGS):
+        index = IAMPolicyIndex(bindings)
+        a = index.principal_ids["user:a@example.com"]
+
+        assert index.binding_count == 4
+        assert index.role_counts[a] == 2
+        assert sorted(index.roles[r] for r in index.roles_of(a)) == ["roles/owner", "roles/viewer"]
+        assert index.service_account_ids.tolist() == [index.principal_ids["serviceAccount:ci@p.iam.gserviceaccount.com"]]
+        assert sorted(index.principals_with(index.role_ids["roles/viewer"]).tolist()) == sorted(
+            [a, index.principal_ids["user:b@example.com"]]
+        )
+
+
+def test_index_queries():
+    """Test búsquedas por conteo de roles y por roles concretos"""
+    index = IAMPolicyIndex(BINDINGS)
+
+    assert index.principals_over(1).tolist() == [0]
+    role_ids, holders = index.principals_holding(["roles/owner", "roles/editor", "roles/inexistente"])
+    assert [index.roles[r] for r in role_ids] == ["roles/owner", "roles/editor"]
+    assert holders.tolist() == [0, 1]
+    assert index.principal_counts[index.role_ids["roles/viewer"]] == 2
+    assert index.describe([1, 99]) == [
+        {"id": 1, "principal": "serviceAccount:ci@p.iam.gserviceaccount.com", "role_count": 1, "roles": ["roles/editor"]}
+    ]
+
+
+def test_registry_reuses_index_for_same_policy():
+    """Test la misma política (en cualquier orden) reutiliza el índice"""
+    registry = IAMIndexRegistry(max_entries=4)
+    first = registry.get_or_build(BINDINGS)
+    second = registry.get_or_build(dict(reversed(list(BINDINGS.items()))))
+
+    assert first is second
+    assert registry.get(first.index_id) is first
+    assert registry.get("otro") is None
+
+
+def test_primitive_roles_finding_references_index():
+    """Test el hallazgo de roles básicos referencia IDs del índice"""
+    result = GovernanceService.analyze_iam_governance({"bindings": BINDINGS, "uses_custom_roles": True})
+
+    finding = next(f for f in result["findings"] if f["issue"] == "Roles básicos (Owner/Editor) asignados")
+    index = get_iam_index_registry().get(finding["index_id"])
+    assert finding["count"] == 2
+    assert [index.principals[p] for p in finding["principal_ids"]] == [
+        "user:a@example.com",
+        "serviceAccount:ci@p.iam.gserviceaccount.com",
+    ]
+    assert [index.roles[r] for r in finding["role_ids"]] == ["roles/owner", "roles/editor"]
+
+
+def test_resolve_principals_endpoint():
+    """Test endpoint que resuelve IDs de principales de un hallazgo"""
+    client = TestClient(app)
+    index = get_iam_index_registry().get_or_build(BINDINGS)
+
+    response = client.get(f"/api/v1/governance/iam-index/{index.index_id}/principals", params={"ids": "0,2"})
+    assert response.status_code == 200
+    assert [p["principal"] for p in response.json()["principals"]] == ["user:a@example.com", "user:b@example.com"]
+
+    assert client.get("/api/v1/governance/iam-index/desconocido/principals", params={"ids": "0"}).status_code == 404
+    bad = client.get(f"/api/v1/governance/iam-index/{index.index_id}/principals", params={"ids": "a,b"})
+    assert bad.status_code == 400
+
+
+def owner_policy(i):
+    """Política con un principal Owner distinto por índice"""
+    return {"bindings": {f"user:owner{i}@example.com": ["roles/owner"]}, "uses_custom_roles": True}
+
+
+def primitive_finding(analysis):
+    return next(f for f in analysis["findings"] if f["issue"] == "Roles básicos (Owner/Editor) asignados")
+
+
+def test_cached_analysis_keeps_index_resolvable(monkeypatch):
+    """Test un análisis cacheado vuelve a registrar su índice aunque haya expirado del registro"""
+    monkeypatch.setattr(iam_index, "_iam_index_registry", IAMIndexRegistry(max_entries=2))
+    analyzer = IncrementalGovernanceAnalyzer(max_entries=100, max_changes=10)
+    client = TestClient(app)
+
+    first = primitive_finding(analyzer.analyze("iam", owner_policy(0)))
+    for i in range(1, 5):
+        analyzer.analyze("iam", owner_policy(i))
+    assert get_iam_index_registry().get(first["index_id"]) is None
+
+    again = primitive_finding(analyzer.analyze("iam", owner_policy(0)))
+    assert analyzer.hits == 1
+    assert again["index_id"] == first["index_id"]
+    response = client.get(f"/api/v1/governance/iam-index/{again['index_id']}/principals", params={"ids": "0"})
+    assert response.status_code == 200
+    assert response.json()["principals"][0]["principal"] == "user:owner0@example.com"
+
+
+def test_cache_hit_with_live_index_skips_fingerprint(monkeypatch):
+    """Test un acierto de caché cuyo índice sigue registrado no vuelve a serializar los bindings"""
+    monkeypatch.setattr(iam_index, "_iam_index_registry", IAMIndexRegistry())
+    analyzer = IncrementalGovernanceAnalyzer(max_entries=100, max_changes=10)
+    analyzer.analyze("iam", owner_policy(50))
+
+    calls = []
+    fingerprint = iam_index.policy_fingerprint
+    monkeypatch.setattr(iam_index, "policy_fingerprint", lambda bindings: calls.append(1) or fingerprint(bindings))
+    analyzer.analyze("iam", owner_policy(50))
+
+    assert analyzer.hits == 1
+    assert calls == []
+
+
+def test_pooled_report_registers_indexes_in_parent(monkeypatch):
+    """Test los índices construidos en el pool de procesos se registran en el proceso principal"""
+    monkeypatch.setattr(iam_index, "_iam_index_registry", IAMIndexRegistry())
+    resources = [{"resource_type": "iam", "resource_data": owner_policy(100 + i)} for i in range(6)]
+
+    async def run(pool):
+        async def source():
+            for resource in resources:
+                yield resource
+        return [
+            record
+            async for record in stream_compliance_report(
+                source(), chunk_size=2, executor=pool, parallel_threshold=0,
+                analyzer=IncrementalGovernanceAnalyzer(max_entries=100, max_changes=10),
+            )
+        ]
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        records = asyncio.run(run(pool))
+
+    results = [r for r in records if r["type"] == "result"]
+    assert len(results) == 6
+    for i, result in enumerate(results):
+        index = get_iam_index_registry().get(primitive_finding(result)["index_id"])
+        assert index.describe([0])[0]["principal"] == f"user:owner{100 + i}@example.com"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,52 @@
+"""
+Tests para el registro de modelos generativos
+"""
+import pytest
+from src.services import model_registry
+from src.services.model_registry import JSON, VOICE, ModelRegistry
+
+
+class FakeGenerativeModel:
+    """GenerativeModel simulado que cuenta las construcciones"""
+    created = 0
+
+    def __init__(self, model_name, generation_config=None, system_instruction=None):
+        FakeGenerativeModel.created += 1
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.system_instruction = system_instruction
+
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    FakeGenerativeModel.created = 0
+    monkeypatch.setattr(model_registry, "GenerativeModel", FakeGenerativeModel)
+
+
+def test_models_are_built_once_per_profile():
+    """Test cada perfil construye su modelo una sola vez"""
+    registry = ModelRegistry()
+
+    voice = registry.get(VOICE)
+    assert registry.get(VOICE) is voice
+    assert registry.get(JSON) is not voice
+    assert FakeGenerativeModel.created == 2
+
+
+def test_json_profile_does_not_use_voice_persona():
+    """Test el perfil JSON no envía la instrucción de voz"""
+    registry = ModelRegistry()
+
+    json_model = registry.get(JSON)
+    assert json_model.system_instruction != model_registry.VOICE_SYSTEM_INSTRUCTION
+    assert registry.profile(JSON).response_mime_type == "application/json"
+
+
+def test_unknown_profile():
+    """Test perfil desconocido"""
+    with pytest.raises(ValueError):
+        ModelRegistry().get("desconocido")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,128 @@
+"""
+Tests para la cola de subidas en segundo plano
+"""
+import threading
+
+import pytest
+from src.services.upload_queue import DROP, SPILL, UploadQueue
+
+
+class FlakyUploader:
+    """Uploader simulado que falla las primeras N llamadas"""
+
+    def __init__(self, failures: int = 0, block: threading.Event = None):
+        self.failures = failures
+        self.block = block
+        self.uploaded = []
+        self._lock = threading.Lock()
+
+    def __call__(self, bucket_name, file_path, data):
+        if self.block is not None:
+            self.block.wait()
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("storage no disponible")
+            self.uploaded.append((bucket_name, file_path, data))
+
+
+def test_uploads_with_retries():
+    """Test los errores transitorios se reintentan con backoff"""
+    uploader = FlakyUploader(failures=2)
+    uploads = UploadQueue(uploader, workers=2, max_retries=3, backoff_base=0.001, overflow_policy=DROP)
+    done = threading.Event()
+
+    assert uploads.enqueue("bucket", "audios/a.wav", b"a", on_success=done.set)
+    assert uploads.drain(timeout=2)
+
+    assert done.is_set()
+    assert uploader.uploaded == [("bucket", "audios/a.wav", b"a")]
+    stats = uploads.stats()
+    assert stats["uploaded"] == 1
+    assert stats["retries"] == 2
+    assert stats["depth"] == 0
+
+
+def test_full_queue_drops_without_blocking():
+    """Test con la cola llena se descarta sin bloquear la petición"""
+    release = threading.Event()
+    uploads = UploadQueue(FlakyUploader(block=release), maxsize=1, workers=1, overflow_policy=DROP)
+
+    results = [uploads.enqueue("bucket", f"audios/{i}.wav", b"x") for i in range(5)]
+    release.set()
+    uploads.drain(timeout=2)
+
+    assert results[0] is True
+    assert results.count(False) >= 3
+    assert uploads.stats()["dropped"] == results.count(False)
+
+
+def test_failed_uploads_spill_and_recover(tmp_path):
+    """Test lo que no se puede subir se guarda en disco y se reintenta al arrancar"""
+    failing = UploadQueue(
+        FlakyUploader(failures=100), workers=1, max_retries=0,
+        overflow_policy=SPILL, spill_dir=str(tmp_path),
+    )
+    failing.enqueue("bucket", "audios/input/a.wav", b"audio")
+    failing.drain(timeout=2)
+
+    assert (tmp_path / "bucket" / "audios" / "input" / "a.wav").read_bytes() == b"audio"
+    assert failing.stats()["spilled"] == 1
+
+    uploader = FlakyUploader()
+    recovered = UploadQueue(uploader, workers=1, overflow_policy=SPILL, spill_dir=str(tmp_path))
+    recovered.start()
+    recovered.drain(timeout=2)
+
+    assert uploader.uploaded == [("bucket", "audios/input/a.wav", b"audio")]
+    assert not (tmp_path / "bucket" / "audios" / "input" / "a.wav").exists()
+
+
+def test_workers_upload_queued_objects_in_batches():
+    """Test cada worker sube juntos los objetos ya encolados y reintenta solo los fallidos"""
+    release = threading.Event()
+    batches = []
+
+    def batch_uploader(objects):
+        batches.append([path for _, path, _ in objects])
+        # Falla el primer objeto del primer lote
+        return [ConnectionError("storage no disponible") if len(batches) == 1 and i == 0 else None
+                for i in range(len(objects))]
+
+    uploads = UploadQueue(
+        FlakyUploader(block=release), workers=1, batch_size=4, batch_uploader=batch_uploader,
+        backoff_base=0.001, overflow_policy=DROP,
+    )
+    for i in range(6):
+        uploads.enqueue("bucket", f"audios/{i}.wav", b"x")
+    release.set()
+    assert uploads.drain(timeout=2)
+
+    # El worker queda bloqueado con el primer objeto; el resto llega en lotes
+    assert batches
+    assert all(2 <= len(batch) <= 4 for batch in batches)
+    stats = uploads.stats()
+    assert stats["uploaded"] == 6
+    assert stats["retries"] == 1
+    assert stats["dropped"] == 0
+
+
+def test_drain_timeout_spills_in_flight_uploads(tmp_path):
+    """Test lo que se está subiendo cuando vence el drenaje se guarda en disco"""
+    release = threading.Event()
+    uploads = UploadQueue(FlakyUploader(block=release), workers=1, overflow_policy=SPILL, spill_dir=str(tmp_path))
+
+    uploads.enqueue("bucket", "audios/lento.wav", b"audio")
+    uploads.enqueue("bucket", "audios/encolado.wav", b"audio")
+    try:
+        assert not uploads.drain(timeout=0.2)
+    finally:
+        release.set()
+
+    assert (tmp_path / "bucket" / "audios" / "lento.wav").read_bytes() == b"audio"
+    assert (tmp_path / "bucket" / "audios" / "encolado.wav").read_bytes() == b"audio"
+    assert uploads.stats()["spilled"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
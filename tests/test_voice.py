@@ -0,0 +1,274 @@
+"""
+Tests para el router de voz
+"""
+import base64
+import io
+import json
+import wave
+from urllib.parse import unquote
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.routers import voice
+from src.utils.sentences import iter_sentences
+from src.utils.transcription import clean_transcription
+
+
+def wav_bytes(sample_rate=16000, seconds=0.1):
+    """WAV PCM16 mono de silencio"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(bytes(int(sample_rate * seconds) * 2))
+    return buffer.getvalue()
+
+
+class FakeAsyncGCPService:
+    """Fachada GCP simulada que registra las llamadas"""
+
+    def __init__(self, transcript: str = "qué es kubernetes"):
+        self.transcript = transcript
+        self.calls = []
+
+    async def upload_to_storage(self, bucket_name, file_path, data):
+        self.calls.append("upload")
+        return f"gs://{bucket_name}/{file_path}"
+
+    async def transcribe_audio(self, audio_data, language_code="es-ES", audio_format=None):
+        self.calls.append("transcribe")
+        self.audio_format = audio_format
+        return self.transcript
+
+    async def get_ai_recommendation(self, prompt):
+        self.calls.append("llm")
+        return f"Respuesta a {prompt}"
+
+    async def synthesize_speech(self, text, language_code="es-ES"):
+        self.calls.append("tts")
+        return b"ID3-mp3"
+
+    async def synthesize_and_archive(self, text, language_code, bucket_name):
+        audio = await self.synthesize_speech(text, language_code)
+        return {"audio": audio, "storage_path": f"gs://{bucket_name}/audios/synthesized/x.mp3", "cached": False}
+
+    async def stream_ai_recommendation(self, prompt):
+        self.calls.append("llm-stream")
+        for sentence in ["Kubernetes orquesta contenedores.", "Automatiza el despliegue y escalado."]:
+            yield sentence
+
+    async def streaming_transcribe(self, frames, language_code="es-ES", sample_rate=16000):
+        self.calls.append("stream")
+        received = 0
+        async for frame in frames:
+            received += len(frame)
+            yield {"type": "interim", "transcript": "qué es"}
+            if received >= 8:
+                break
+        yield {"type": "end_of_speech"}
+        yield {"type": "final", "transcript": self.transcript}
+
+    archived = {"audios/synthesized/x.mp3": bytes(range(100))}
+
+    async def get_storage_object_info(self, bucket_name, file_path):
+        if file_path not in self.archived:
+            raise FileNotFoundError(file_path)
+        return {"size": len(self.archived[file_path]), "content_type": "audio/mpeg", "generation": 1}
+
+    async def iter_download(self, bucket_name, file_path, chunk_size=None, start=0, end=None):
+        self.calls.append("download")
+        data = self.archived[file_path][start:end]
+        for offset in range(0, len(data), 16):
+            yield data[offset:offset + 16]
+
+
+class FakeUploadQueue:
+    """Cola de subidas simulada"""
+
+    def __init__(self):
+        self.paths = []
+
+    def enqueue(self, bucket_name, file_path, data, on_success=None):
+        self.paths.append(file_path)
+        return True
+
+
+@pytest.fixture
+def fake_gcp(monkeypatch):
+    fake = FakeAsyncGCPService()
+    fake.uploads = FakeUploadQueue()
+    monkeypatch.setattr(voice, "get_async_gcp_service", lambda: fake)
+    monkeypatch.setattr(voice, "get_upload_queue", lambda: fake.uploads)
+    return fake
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_converse_single_round_trip(client, fake_gcp):
+    """Test /converse devuelve transcripción, respuesta y audio en una petición"""
+    res = client.post(
+        "/api/v1/voice/converse",
+        files={"file": ("audio.wav", wav_bytes(), "audio/wav")},
+    )
+
+    assert res.status_code == 200
+    data = res.json()
+    assert data["transcript"] == "Qué es kubernetes?"
+    assert data["response"] == "Respuesta a Qué es kubernetes?"
+    assert base64.b64decode(data["audio_base64"]) == b"ID3-mp3"
+    assert fake_gcp.calls.count("llm") == 1
+    assert fake_gcp.calls.count("tts") == 1
+    assert fake_gcp.uploads.paths[0].startswith("audios/input/")
+
+
+def test_converse_binary_audio(client, fake_gcp):
+    """Test /converse con Accept: audio/mpeg retorna bytes crudos y metadatos en headers"""
+    res = client.post(
+        "/api/v1/voice/converse",
+        files={"file": ("audio.wav", wav_bytes(), "audio/wav")},
+        headers={"Accept": "audio/mpeg"},
+    )
+
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "audio/mpeg"
+    assert res.content == b"ID3-mp3"
+    assert unquote(res.headers["x-transcript"]) == "Qué es kubernetes?"
+    assert unquote(res.headers["x-response-text"]) == "Respuesta a Qué es kubernetes?"
+    assert "x-response-text-truncated" not in res.headers
+
+
+def test_query_binary_audio_caps_long_response_header(client, fake_gcp):
+    """Test una respuesta larga se recorta en el header y queda completa en JSON"""
+    query = "¿Cómo configuro IAM? " * 200
+    res = client.post("/api/v1/voice/query", json={"query": query}, headers={"Accept": "audio/mpeg"})
+
+    assert res.status_code == 200
+    assert res.headers["x-response-text-truncated"] == "true"
+    assert len(res.headers["x-response-text"]) <= voice.MAX_HEADER_VALUE
+    assert f"Respuesta a {query}".startswith(unquote(res.headers["x-response-text"]))
+    full = client.post("/api/v1/voice/query", json={"query": query}).json()
+    assert full["response"] == f"Respuesta a {query}"
+
+
+def test_archived_audio_supports_ranges(client, fake_gcp, monkeypatch):
+    """Test /archive transmite el audio completo o solo el rango pedido"""
+    url = "/api/v1/voice/archive/audios/synthesized/x.mp3"
+    audio = FakeAsyncGCPService.archived["audios/synthesized/x.mp3"]
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == audio
+    assert full.headers["accept-ranges"] == "bytes"
+
+    partial = client.get(url, headers={"Range": "bytes=10-39"})
+    assert partial.status_code == 206
+    assert partial.content == audio[10:40]
+    assert partial.headers["content-range"] == "bytes 10-39/100"
+
+    suffix = client.get(url, headers={"Range": "bytes=-5"})
+    assert suffix.content == audio[-5:]
+
+    assert client.get(url, headers={"Range": "bytes=200-"}).status_code == 416
+    assert client.get("/api/v1/voice/archive/audios/otro.mp3").status_code == 404
+    # Las grabaciones de los usuarios y las respuestas no se sirven aunque existan
+    for private in ("audios/input/20240101_120000_input.wav", "audios/responses/20240101_120000_response.mp3"):
+        monkeypatch.setitem(FakeAsyncGCPService.archived, private, audio)
+        assert client.get(f"/api/v1/voice/archive/{private}").status_code == 404
+    assert client.get("/api/v1/voice/archive/config/secret.json").status_code == 404
+
+
+def test_query_content_negotiation(client, fake_gcp):
+    """Test /query mantiene JSON por defecto y respeta las preferencias de Accept"""
+    body = {"query": "Qué es Kubernetes?"}
+
+    default = client.post("/api/v1/voice/query", json=body)
+    assert default.headers["content-type"] == "application/json"
+    assert "audio_base64" in default.json()
+
+    prefers_json = client.post(
+        "/api/v1/voice/query", json=body,
+        headers={"Accept": "audio/mpeg;q=0.5, application/json"},
+    )
+    assert prefers_json.headers["content-type"] == "application/json"
+
+    binary = client.post("/api/v1/voice/query", json=body, headers={"Accept": "audio/mpeg"})
+    assert binary.headers["content-type"] == "audio/mpeg"
+    assert binary.content == b"ID3-mp3"
+
+
+def test_converse_without_speech_skips_ai(client, fake_gcp):
+    """Test /converse no consulta la IA si no se reconoce voz"""
+    fake_gcp.transcript = ""
+    res = client.post(
+        "/api/v1/voice/converse",
+        files={"file": ("audio.wav", wav_bytes(), "audio/wav")},
+    )
+
+    assert res.status_code == 200
+    assert res.json()["response"] == ""
+    assert res.json()["audio_base64"] is None
+    assert "llm" not in fake_gcp.calls
+
+
+def test_converse_empty_file(client, fake_gcp):
+    """Test /converse rechaza archivos vacíos"""
+    res = client.post(
+        "/api/v1/voice/converse",
+        files={"file": ("audio.wav", b"", "audio/wav")},
+    )
+
+    assert res.status_code == 400
+
+
+def test_stream_transcription_websocket(client, fake_gcp):
+    """Test WebSocket de streaming: parciales, fin de frase y transcripción final"""
+    with client.websocket_connect("/api/v1/voice/stream?sample_rate=16000") as ws:
+        ws.send_bytes(b"\x00" * 4)
+        assert ws.receive_json() == {"type": "interim", "transcript": "qué es"}
+        ws.send_bytes(b"\x00" * 4)
+        events = [ws.receive_json() for _ in range(4)]
+
+    types = [e["type"] for e in events]
+    assert types == ["interim", "end_of_speech", "final", "done"]
+    assert events[-1]["transcript"] == "Qué es kubernetes?"
+
+
+def test_query_stream_sentence_pipeline(client, fake_gcp):
+    """Test /query/stream emite una línea NDJSON con audio por oración"""
+    res = client.post("/api/v1/voice/query/stream", json={"query": "Qué es Kubernetes?"})
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in res.text.splitlines()]
+    assert [e["type"] for e in events] == ["sentence", "sentence", "done"]
+    assert events[0]["text"] == "Kubernetes orquesta contenedores."
+    assert base64.b64decode(events[1]["audio_base64"]) == b"ID3-mp3"
+    assert events[-1]["response"].startswith("Kubernetes orquesta")
+    assert fake_gcp.calls.count("tts") == 2
+
+
+def test_iter_sentences_cuts_streamed_text():
+    """Test segmentación de texto en streaming por oraciones"""
+    chunks = ["Kubernetes es un orquest", "ador de contenedores. Lo usa", "s en producción. Sí. Ok"]
+    assert list(iter_sentences(chunks)) == [
+        "Kubernetes es un orquestador de contenedores.",
+        "Lo usas en producción.",
+        "Sí. Ok",
+    ]
+
+
+def test_clean_transcription():
+    """Test normalización de transcripciones"""
+    assert clean_transcription("  cómo despliego en gcp ") == "Cómo despliego en gcp?"
+    assert clean_transcription("despliega el cluster") == "Despliega el cluster."
+    assert clean_transcription("") == ""
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
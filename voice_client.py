@@ -4,195 +4,536 @@ Cliente de voz para interactuar con el asistente DevOps
 Con escucha continua y respuesta en paralelo
 """
 import sounddevice as sd
-import soundfile as sf
 import requests
 import json
 import base64
+import collections
+import io
 import os
 import sys
 import threading
 import queue
 import numpy as np
 import time
+import wave
+from urllib.parse import unquote
+
+# Dependencias de requirements-client.txt
+try:
+    from websockets.sync.client import connect as ws_connect
+except ImportError:  # Sin websockets se usa el modo por lotes (/converse)
+    ws_connect = None
+
+try:
+    import soundfile as sf
+except ImportError:  # Sin soundfile la respuesta no se puede decodificar: main() no arranca
+    sf = None
 
 API = "http://localhost:8000/api/v1/voice"
+WS_API = API.replace("http://", "ws://", 1)
+# Códec de subida de las frases: opus (~10x menos bytes que WAV), flac (~2x, sin pérdida) o wav
+UPLOAD_FORMAT = os.getenv("VOICE_UPLOAD_FORMAT", "opus")
+UPLOAD_FORMATS = {
+    "opus": ("OGG", "OPUS", "utterance.ogg", "audio/ogg"),
+    "flac": ("FLAC", "PCM_16", "utterance.flac", "audio/flac"),
+}
 response_queue = queue.Queue()
-processing_done = threading.Event()  # Señal para esperar fin de procesamiento
-
-def record_audio_continuous(sample_rate=16000, silence_threshold=0.012, silence_duration=2.5):
-    """Grabar audio continuamente con detección inteligente de silencio"""
-    frames = []
-    silence_count = 0
-    max_silence_count = int(silence_duration * sample_rate / 2048)
-    has_audio = False
-    sustained_sound = 0  # Detectar si hay sonido sostenido
-    
-    def callback(indata, frames_count, time_info, status):
-        nonlocal silence_count, has_audio, sustained_sound
-        frames.append(indata.copy())
-        
-        # Detectar volumen promedio
-        volume = np.abs(indata).mean()
-        
-        if volume < silence_threshold:
-            silence_count += 1
+
+class UtteranceRecorder:
+    """
+    Captura de una frase sobre un ring buffer preasignado
+
+    El callback de audio copia cada bloque al buffer circular (int16, tamaño
+    fijo para la duración máxima más el pre-roll) y decide el inicio y el fin
+    de la frase; el hilo principal solo espera un Event. Mientras no hay voz
+    el buffer se sobrescribe en círculo y conserva el pre-roll, de modo que la
+    primera sílaba no se pierde. La frase se codifica en memoria (Opus, FLAC
+    o WAV) directamente desde el buffer, sin archivos temporales.
+    """
+
+    def __init__(self, sample_rate=16000, max_duration=20, pre_roll=0.4, blocksize=1024,
+                 silence_threshold=0.012, silence_duration=2.5, min_voiced=1.25, tail=0.3, gate=None):
+        self.config = dict(sample_rate=sample_rate, max_duration=max_duration,
+                           silence_threshold=silence_threshold, silence_duration=silence_duration)
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.silence_threshold = silence_threshold
+        self.max_samples = int(max_duration * sample_rate)
+        self.pre_roll = int(pre_roll * sample_rate)
+        self.silence_samples = int(silence_duration * sample_rate)
+        self.min_voiced = int(min_voiced * sample_rate)
+        self.tail = int(tail * sample_rate)
+        # Memoria fija: la frase más larga posible más el pre-roll y un bloque de margen
+        self.capacity = self.max_samples + self.pre_roll + blocksize
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._levels = np.zeros(blocksize, dtype=np.float32)
+        self.gate = gate  # BargeInGate opcional mientras suena la respuesta
+        self.done = threading.Event()
+        self.reset()
+
+    def reset(self):
+        """Preparar una nueva captura reutilizando el buffer"""
+        self.written = 0  # Muestras escritas desde el inicio (posición absoluta)
+        self.start = None  # Inicio de la frase (incluye el pre-roll)
+        self.last_voiced = 0  # Fin del último bloque con voz
+        self.voiced = 0  # Muestras con voz acumuladas
+        self.end = None
+        self.done.clear()
+
+    def _write(self, block):
+        n = len(block)
+        offset = self.written % self.capacity
+        first = min(n, self.capacity - offset)
+        self.buffer[offset:offset + first] = block[:first]
+        self.buffer[:n - first] = block[first:]
+        self.written += n
+
+    def callback(self, indata, frames_count, time_info, status):
+        if self.done.is_set():
+            return
+        block = indata[:, 0]
+        self._write(block)
+
+        # Volumen medio normalizado a [0, 1] sin asignar memoria
+        levels = self._levels[:len(block)]
+        if len(levels) < len(block):
+            levels = np.empty(len(block), dtype=np.float32)
+        np.abs(block, out=levels, dtype=np.float32, casting="unsafe")
+        volume = levels.mean() / 32768.0
+        if self.gate is not None and not self.gate.accept(volume, len(block)):
+            volume = 0.0  # Eco de la respuesta: cuenta como silencio, pero queda en el pre-roll
+
+        if volume >= self.silence_threshold:
+            if self.start is None:
+                self.start = max(0, self.written - len(block) - self.pre_roll)
+            self.voiced += len(block)
+            self.last_voiced = self.written
+        elif (self.voiced >= self.min_voiced
+              and self.written - self.last_voiced >= self.silence_samples):
+            # Fin de la frase: se descarta el silencio final salvo una cola breve
+            self.end = min(self.written, self.last_voiced + self.tail)
+            self.done.set()
+            return
+
+        if self.start is None:
+            # Sin voz: se escucha como mucho la duración máxima y se reinicia
+            if self.written >= self.max_samples:
+                self.done.set()
+        elif self.written - self.start >= self.max_samples:
+            if self.voiced >= self.min_voiced:
+                self.end = self.written
+            self.done.set()
+
+    def segments(self):
+        """Uno o dos tramos contiguos del ring buffer con la frase (vacío si no hubo voz suficiente)"""
+        if self.end is None or self.start is None:
+            return []
+        start = max(self.start, self.end - self.capacity)
+        first, last = start % self.capacity, self.end % self.capacity
+        if first < last or self.end - start == 0:
+            return [self.buffer[first:last]]
+        return [self.buffer[first:], self.buffer[:last]]
+
+    def utterance_wav(self):
+        """WAV PCM16 en memoria de la frase capturada (None si no hubo voz suficiente)"""
+        segments = self.segments()
+        if not segments:
+            return None
+        wav = io.BytesIO()
+        with wave.open(wav, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(self.sample_rate)
+            # Directamente desde el ring buffer, sin concatenar
+            for segment in segments:
+                writer.writeframes(segment.data)
+        return wav.getvalue()
+
+    def utterance_upload(self, upload_format=None):
+        """
+        Frase codificada para subir: (nombre, bytes, content-type) o None
+
+        El servidor detecta el formato por la cabecera, así que se puede
+        comprimir con Opus o FLAC; si soundfile no está o su libsndfile no
+        soporta el códec, se recurre a FLAC y por último a WAV.
+        """
+        segments = self.segments()
+        if not segments:
+            return None
+        upload_format = upload_format or UPLOAD_FORMAT
+        if sf is not None and upload_format in UPLOAD_FORMATS:
+            samples = segments[0] if len(segments) == 1 else np.concatenate(segments)
+            for name in dict.fromkeys((upload_format, "flac")):
+                container, subtype, filename, content_type = UPLOAD_FORMATS[name]
+                encoded = io.BytesIO()
+                try:
+                    sf.write(encoded, samples, self.sample_rate, format=container, subtype=subtype)
+                except Exception as e:
+                    print(f"⚠️ No se pudo codificar en {name}: {e}")
+                    continue
+                return filename, encoded.getvalue(), content_type
+        return "utterance.wav", self.utterance_wav(), "audio/wav"
+
+
+class AudioPlayer:
+    """
+    Reproducción de la respuesta en proceso con sounddevice
+
+    Cada fragmento MP3 (la respuesta completa o una oración del stream) se
+    decodifica en memoria con soundfile y se encola como PCM int16. Un único
+    OutputStream abierto para toda la sesión consume la cola desde su
+    callback, así que el audio empieza con el primer fragmento decodificado,
+    sin archivos ni procesos por turno. `interrupt()` corta la respuesta en
+    el siguiente bloque de salida (barge-in).
+    """
+
+    # Tras el último bloque con audio el micrófono aún puede captar el eco de la sala
+    ECHO_TAIL = 0.3
+
+    def __init__(self, blocksize=1024):
+        self.blocksize = blocksize
+        self.stream = None
+        self.sample_rate = None
+        self.chunks = queue.Queue()
+        self.current = None
+        self.position = 0
+        self.last_audio = 0.0
+        self.closed = True
+        self.lock = threading.Lock()  # Transiciones de turno frente al callback de salida
+        self.idle = threading.Event()
+        self.idle.set()
+        self.interrupted = threading.Event()
+
+    @property
+    def speaking(self):
+        """True mientras la respuesta suena (o su eco puede llegar al micrófono)"""
+        return time.monotonic() - self.last_audio < self.ECHO_TAIL
+
+    def begin(self):
+        """Preparar la respuesta de un turno nuevo"""
+        with self.lock:
+            self.interrupted.clear()
+            self.closed = False
+            self.idle.clear()
+
+    def _ensure_stream(self, sample_rate):
+        if self.stream is not None and self.sample_rate == sample_rate:
+            return
+        if self.stream is not None:
+            self.stream.close()
+        self.sample_rate = sample_rate
+        self.stream = sd.OutputStream(samplerate=sample_rate, channels=1, dtype='int16',
+                                      blocksize=self.blocksize, callback=self.callback)
+        self.stream.start()
+
+    def feed(self, mp3):
+        """Decodificar un fragmento MP3 y encolarlo; False si el turno fue interrumpido"""
+        if self.interrupted.is_set():
+            return False
+        if sf is None:
+            print("❌ Instala soundfile para reproducir la respuesta")
+            return False
+        try:
+            pcm, sample_rate = sf.read(io.BytesIO(mp3), dtype='int16', always_2d=True)
+        except Exception as e:
+            print(f"❌ No se pudo decodificar el audio: {e}")
+            return False
+        if pcm.shape[1] > 1:
+            pcm = pcm.mean(axis=1).astype(np.int16)
         else:
-            silence_count = 0
-            has_audio = True
-            sustained_sound += 1  # Contar frames con sonido
-    
+            pcm = pcm[:, 0]
+        self._ensure_stream(sample_rate)
+        self.chunks.put(pcm)
+        return True
+
+    def finish(self):
+        """No habrá más fragmentos en este turno"""
+        with self.lock:
+            self.closed = True
+            if self.stream is None:
+                self.idle.set()
+
+    def wait(self):
+        """Esperar a que termine de sonar; True si se reprodujo completa"""
+        self.idle.wait()
+        return not self.interrupted.is_set()
+
+    def interrupt(self):
+        """Cortar la respuesta en curso y descartar la pendiente"""
+        with self.lock:
+            self.interrupted.set()
+            self.closed = True
+            if self.stream is None:
+                self.idle.set()
+
+    def callback(self, outdata, frames_count, time_info, status):
+        out = outdata[:, 0]
+        if self.interrupted.is_set():
+            self.current = None
+            while not self.chunks.empty():
+                self.chunks.get_nowait()
+        filled = 0
+        while filled < frames_count:
+            if self.current is None:
+                try:
+                    self.current, self.position = self.chunks.get_nowait(), 0
+                except queue.Empty:
+                    break
+            n = min(frames_count - filled, len(self.current) - self.position)
+            out[filled:filled + n] = self.current[self.position:self.position + n]
+            filled += n
+            self.position += n
+            if self.position >= len(self.current):
+                self.current = None
+        out[filled:] = 0
+        if filled:
+            self.last_audio = time.monotonic()
+            return
+        with self.lock:
+            if self.closed and self.current is None and self.chunks.empty():
+                self.idle.set()
+
+
+class BargeInGate:
+    """
+    Distinguir al usuario del eco de la respuesta mientras suena
+
+    Con la respuesta sonando el micrófono también capta el altavoz, así que
+    solo se acepta voz por encima de un umbral más alto y sostenida un tiempo
+    mínimo; en ese momento se corta la reproducción y la frase del usuario se
+    captura desde el pre-roll. Sin respuesta sonando acepta todo el audio.
+    """
+
+    def __init__(self, player, sample_rate=16000, threshold=0.05, min_duration=0.25):
+        self.player = player
+        self.threshold = threshold
+        self.min_samples = int(min_duration * sample_rate)
+        self.run = 0
+
+    def accept(self, volume, frames_count):
+        """True si el bloque debe tratarse como audio del usuario"""
+        if not self.player.speaking:
+            self.run = 0
+            return True
+        self.run = self.run + frames_count if volume >= self.threshold else 0
+        if self.run < self.min_samples:
+            return False
+        self.run = 0
+        print("\n✋ Interrupción: escuchando...")
+        self.player.interrupt()
+        return True
+
+
+player = AudioPlayer()
+_recorder = None
+
+
+def record_audio_continuous(sample_rate=16000, silence_threshold=0.012, silence_duration=2.5, max_duration=20):
+    """Grabar una frase con detección de silencio y devolverla codificada en memoria (ver utterance_upload)"""
+    global _recorder
+    config = dict(sample_rate=sample_rate, max_duration=max_duration,
+                  silence_threshold=silence_threshold, silence_duration=silence_duration)
+    # El buffer se reserva una vez y se reutiliza entre frases
+    if _recorder is None or _recorder.config != config:
+        _recorder = UtteranceRecorder(**config, gate=BargeInGate(player, sample_rate))
+    recorder = _recorder
+    recorder.reset()
+
     try:
         print("🎤 Grabando... habla ahora")
-        stream = sd.InputStream(samplerate=sample_rate, channels=1, callback=callback, dtype='float32', blocksize=2048)
+        stream = sd.InputStream(samplerate=sample_rate, channels=1, callback=recorder.callback,
+                                dtype='int16', blocksize=recorder.blocksize)
         with stream:
-            start_time = time.time()
-            # Escuchar hasta 20 segundos máximo
-            while time.time() - start_time < 20:
-                time.sleep(0.05)
-                
-                # Necesita al menos 0.5s de sonido sostenido
-                if sustained_sound > 10:
-                    # Detectó sonido, ahora espera silencio
-                    if silence_count > max_silence_count:
-                        print("✋ Fin de solicitud detectado")
-                        audio = np.concatenate(frames, axis=0)
-                        sf.write("temp.wav", audio, sample_rate)
-                        return "temp.wav"
-        
-        # Si pasó el tiempo máximo con audio, guarda
-        if has_audio and frames and sustained_sound > 10:
-            print("⏱️ Tiempo máximo alcanzado")
-            audio = np.concatenate(frames, axis=0)
-            sf.write("temp.wav", audio, sample_rate)
-            return "temp.wav"
-        
-        return None
+            # El callback señala el fin; el timeout solo cubre un dispositivo que deja de enviar audio
+            recorder.done.wait(timeout=2 * max_duration + 1)
+
+        upload = recorder.utterance_upload()
+        if upload is not None:
+            print("✋ Fin de solicitud detectado" if recorder.end < recorder.written else "⏱️ Tiempo máximo alcanzado")
+        return upload
     except Exception as e:
         print(f"❌ Error al grabar: {e}")
         return None
 
-def transcribe(wav_file):
-    """Transcribir audio"""
+def stream_utterance(sample_rate=16000, max_duration=20):
+    """Transmitir el micrófono por WebSocket; el servidor detecta el fin de la frase"""
+    audio_queue = queue.Queue()
+    stop_capture = threading.Event()
+    gate = BargeInGate(player, sample_rate)
+    # Bloques retenidos mientras suena la respuesta; se envían si resulta ser el usuario
+    held = collections.deque(maxlen=4)
+
+    def callback(indata, frames_count, time_info, status):
+        if stop_capture.is_set():
+            return
+        volume = np.abs(indata[:, 0], dtype=np.float32).mean() / 32768.0
+        if not gate.accept(volume, frames_count):
+            # Al servidor le llega silencio para que la sesión de Speech siga viva
+            held.append(bytes(indata))
+            audio_queue.put(bytes(indata.nbytes))
+            return
+        while held:
+            audio_queue.put(held.popleft())
+        audio_queue.put(bytes(indata))
+
     try:
-        with open(wav_file, "rb") as f:
-            res = requests.post(f"{API}/transcribe", files={"file": f}, timeout=15)
-        if res.status_code == 200:
-            return res.json()["transcript"]
-        else:
-            return None
+        with ws_connect(f"{WS_API}/stream?language_code=es-ES&sample_rate={sample_rate}") as ws:
+            def sender():
+                try:
+                    while not stop_capture.is_set():
+                        try:
+                            ws.send(audio_queue.get(timeout=0.1))
+                        except queue.Empty:
+                            continue
+                    ws.send("EOS")
+                except Exception:
+                    pass  # El servidor ya cerró el stream
+
+            threading.Thread(target=sender, daemon=True).start()
+            print("🎤 Grabando... habla ahora")
+            stream = sd.InputStream(samplerate=sample_rate, channels=1, callback=callback, dtype='int16', blocksize=2048)
+            with stream:
+                deadline = time.time() + max_duration
+                while True:
+                    try:
+                        event = json.loads(ws.recv(timeout=max(0.1, deadline - time.time())))
+                    except TimeoutError:
+                        if stop_capture.is_set():
+                            return None
+                        # Escuchar hasta 20 segundos máximo
+                        print("\n⏱️ Tiempo máximo alcanzado")
+                        stop_capture.set()
+                        deadline = time.time() + 5
+                        continue
+
+                    if event["type"] == "interim":
+                        print(f"\r💬 {event['transcript']}", end="", flush=True)
+                    elif event["type"] == "end_of_speech":
+                        print("\n✋ Fin de solicitud detectado")
+                        stop_capture.set()
+                    elif event["type"] == "done":
+                        stop_capture.set()
+                        return event["transcript"]
     except Exception as e:
-        print(f"❌ Error transcripción: {e}")
+        print(f"❌ Error en streaming de voz: {e}")
         return None
+    finally:
+        stop_capture.set()
 
-def clean_transcription(text):
-    """Limpiar y normalizar transcripción con detección inteligente de intención"""
-    text = text.strip()
-    if not text:
-        return ""
-    
-    # Palabras clave DevOps para mejor contexto
-    question_starters = [
-        'qué', 'como', 'cómo', 'cuándo', 'cuando', 'dónde', 'donde', 
-        'cuál', 'cual', 'por qué', 'por que', 'quién', 'quien',
-        'puedo', 'podés', 'podemos', 'necesito', 'necesitamos',
-        'cómo se', 'como se', 'cuál es', 'cual es'
-    ]
-    
-    # Palabras que indican comandos/acciones
-    command_verbs = [
-        'instala', 'instalar', 'crea', 'crear', 'despliega', 'desplegar',
-        'configura', 'configurar', 'ejecuta', 'ejecutar', 'elimina', 'eliminar',
-        'monitorea', 'monitorear', 'actualiza', 'actualizar'
-    ]
-    
-    # Capitalizar primera letra
-    text = text[0].upper() + text[1:] if len(text) > 1 else text.upper()
-    
-    # Detectar tipo de frase
-    text_lower = text.lower()
-    first_word = text_lower.split()[0] if text_lower.split() else ""
-    
-    is_question = (
-        any(text_lower.startswith(q) for q in question_starters) or
-        "?" in text or
-        text_lower.startswith("ayuda") or
-        text_lower.startswith("help")
-    )
-    
-    is_command = any(v in text_lower for v in command_verbs)
-    
-    # Agregar puntuación inteligente si no la tiene
-    if not text.endswith(('.', '?', '!', ',')):
-        if is_question:
-            text += '?'
-        elif is_command:
-            text += '.'
-        else:
-            text += '.'
-    
-    return text
-
-def query_ai(text):
-    """Consultar IA + obtener respuesta de voz"""
-    # Limpiar transcripción
-    text = clean_transcription(text)
+def query_ai_stream(text):
+    """Consultar IA en streaming y reproducir cada oración en cuanto llega"""
+    sentences = []
     try:
-        res = requests.post(f"{API}/query", json={
+        with requests.post(f"{API}/query/stream", json={
             "query": text,
             "language_code": "es-ES"
-        }, timeout=30)
-        if res.status_code == 200:
-            data = res.json()
-            audio_bytes = base64.b64decode(data["audio_base64"])
-            with open("response.mp3", "wb") as f:
-                f.write(audio_bytes)
-            return data["response"]
-        else:
-            return None
+        }, stream=True, timeout=30) as res:
+            if res.status_code != 200:
+                return None
+            print("🗣️ Asistente: ", end="", flush=True)
+            for line in res.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "sentence":
+                    # Cada oración suena en cuanto se decodifica, mientras llegan las siguientes
+                    if not player.feed(base64.b64decode(event["audio_base64"])):
+                        break  # Interrumpida por el usuario: no seguir leyendo la respuesta
+                    sentences.append(event["text"])
+                    print(event["text"], end=" ", flush=True)
+                elif event["type"] == "error":
+                    print(f"\n❌ Error IA: {event['detail']}")
+                    break
+            print("\n")
+        return " ".join(sentences) or None
     except Exception as e:
         print(f"❌ Error IA: {e}")
         return None
 
+def converse(upload):
+    """
+    Enviar la frase codificada (nombre, bytes, content-type) y obtener en una sola
+    petición (transcripción, respuesta, MP3 en memoria)
+    """
+    try:
+        res = requests.post(
+            f"{API}/converse",
+            files={"file": upload},
+            data={"language_code": "es-ES"},
+            headers={"Accept": "audio/mpeg"},  # MP3 crudo, sin base64
+            timeout=45,
+        )
+        if res.status_code != 200:
+            return None, None, None
+        if res.headers.get("content-type", "").startswith("audio/mpeg"):
+            response = unquote(res.headers["X-Response-Text"])
+            if res.headers.get("X-Response-Text-Truncated"):
+                # El header va recortado; el audio contiene la respuesta completa
+                response += "…"
+            return unquote(res.headers["X-Transcript"]), response, res.content
+        # Sin voz reconocida el servidor responde JSON sin audio
+        data = res.json()
+        return data["transcript"], data["response"], None
+    except Exception as e:
+        print(f"❌ Error en conversación: {e}")
+        return None, None, None
+
 def process_audio_thread():
-    """Thread que procesa audio en background"""
-    global processing_done
+    """Thread que procesa cada turno; una frase nueva interrumpe la respuesta en curso"""
     while True:
-        wav_file = response_queue.get()
-        if wav_file is None:
+        item = response_queue.get()
+        if item is None:
             break
-        
-        print("\n📝 Transcribiendo...")
-        text = transcribe(wav_file)
-        if not text or len(text.strip()) < 2:
-            print("🎧 Escuchando...\n")
-            processing_done.set()  # Señalizar que terminó
-            continue
-        
-        print(f"👤 Tú: {text}\n")
-        print("🤖 Procesando...")
-        response = query_ai(text)
+        if not response_queue.empty():
+            continue  # Ya hay una frase más reciente: esta respuesta llegaría tarde
+
+        player.begin()
+        kind, payload = item
+        if kind == "text":
+            # Transcripción ya obtenida por streaming
+            print(f"👤 Tú: {payload}\n")
+            print("🤖 Procesando...")
+            response = query_ai_stream(payload)
+        else:
+            print("\n📝 Procesando...")
+            text, response, audio = converse(payload)
+            if text and len(text.strip()) >= 2:
+                print(f"👤 Tú: {text}\n")
+            if response and audio:
+                print(f"🗣️ Asistente: {response}\n")
+                print("🔊 Reproduciendo audio...")
+                player.feed(audio)
+        player.finish()
+
         if not response:
             print("🎧 Escuchando...\n")
-            processing_done.set()  # Señalizar que terminó
-            continue
-        
-        print(f"🗣️ Asistente: {response}\n")
-        print("🔊 Reproduciendo audio...")
-        os.system("ffplay -nodisp -autoexit response.mp3 2>/dev/null")  # Sin & para esperar
-        print("✅ Respuesta completada\n")
-        processing_done.set()  # Señalizar que terminó la respuesta
+        elif player.wait():
+            print("✅ Respuesta completada\n")
+        else:
+            print("⏹️ Respuesta interrumpida\n")
+
+def check_dependencies():
+    """Salir con un mensaje claro si falta una dependencia obligatoria del cliente"""
+    if sf is None:
+        sys.exit("❌ Falta soundfile (decodifica la voz de la respuesta): pip install -r requirements-client.txt")
+    if ws_connect is None:
+        print("⚠️ websockets no está instalado: se usa el modo por lotes (/converse) en lugar de streaming")
+
 
 def main():
     """Loop principal con escucha continua y respuesta inteligente"""
-    global processing_done
+    check_dependencies()
     print("=" * 60)
     print("✅ Cliente de voz DevOps - v2.0")
     print("Instrucciones:")
     print("1. Habla tu pregunta/solicitud")
-    print("2. La IA espera 2.5s de silencio para entender que terminaste")
+    if ws_connect is not None:
+        print("2. El servidor detecta cuándo terminaste de hablar (streaming)")
+    else:
+        print("2. La IA espera 2.5s de silencio para entender que terminaste")
     print("3. Responde automáticamente con voz")
-    print("4. ESPERA a que termine la respuesta")
-    print("5. Automáticamente vuelve a escuchar")
+    print("4. Habla encima de la respuesta para interrumpirla")
+    print("5. Siempre está escuchando, también mientras responde")
     print("6. Ctrl+C para salir")
     print("=" * 60)
     
@@ -204,15 +545,18 @@ def main():
     
     try:
         while True:
-            wav = record_audio_continuous()
-            if wav:
-                print("⏳ Enviando a procesar...")
-                processing_done.clear()  # Resetear señal
-                response_queue.put(wav)
-                print("⏸️  Esperando respuesta de la IA...")
-                processing_done.wait()  # ESPERAR A QUE TERMINE
-                print("\n🎤 Sistema listo. Habla ahora...\n")
+            if ws_connect is not None:
+                text = stream_utterance()
+                item = ("text", text) if text and len(text.strip()) >= 2 else None
             else:
+                upload = record_audio_continuous()
+                item = ("audio", upload) if upload else None
+            if item:
+                print("⏳ Enviando a procesar...")
+                # La frase nueva reemplaza la respuesta anterior si aún no terminó
+                player.interrupt()
+                response_queue.put(item)
+            elif not player.speaking and player.idle.is_set():
                 print("⚠️ No se detectó audio claro\n")
     except KeyboardInterrupt:
         print("\n👋 Cerrando asistente...")